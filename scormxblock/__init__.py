@@ -1 +1,3 @@
 from .scormxblock import ScormXBlock
+
+default_app_config = 'scormxblock.apps.ScormXBlockConfig'
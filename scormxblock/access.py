@@ -0,0 +1,69 @@
+"""
+Cached course staff checks for staff debug rendering
+
+Instructor access is checked against course roles by course key, without
+loading the course from the modulestore.  The answer is shared by every
+SCORM block rendered in the same request and kept in the Django cache for a
+short time; it is dropped when the user's course roles change, once the app
+is ready (see apps.py).
+"""
+from django.core.cache import cache
+
+from identity import request_data
+
+
+DEFAULT_STAFF_ACCESS_CACHE_TTL = 60
+CACHE_KEY = 'scormxblock.instructor.{}.{}'
+REQUEST_CACHE_KEY = 'scormxblock.instructor_access'
+
+
+def _cache_key(user_id, course_key):
+    return CACHE_KEY.format(user_id, unicode(course_key))
+
+
+def has_instructor_access(user, course_key, ttl=DEFAULT_STAFF_ACCESS_CACHE_TTL):
+    """
+    return True if `user` has instructor access to the course
+    """
+    if user is None or not user.is_authenticated():
+        return False
+    checked = request_data(REQUEST_CACHE_KEY)
+    request_key = (user.id, unicode(course_key))
+    if request_key in checked:
+        return checked[request_key]
+
+    key = _cache_key(user.id, course_key)
+    allowed = cache.get(key) if ttl else None
+    if allowed is None:
+        from courseware.access import has_access
+        # a course key is checked against roles, a course descriptor would need a modulestore load
+        allowed = bool(has_access(user, 'instructor', course_key))
+        if ttl:
+            cache.set(key, allowed, ttl)
+    checked[request_key] = allowed
+    return allowed
+
+
+def invalidate(user_id, course_key):
+    cache.delete(_cache_key(user_id, course_key))
+    request_data(REQUEST_CACHE_KEY).pop((user_id, unicode(course_key)), None)
+
+
+def _invalidate_on_role_change(sender, instance, **kwargs):
+    # org-wide roles have no course id, entries they affect expire with the TTL
+    invalidate(instance.user_id, instance.course_id)
+
+
+def connect_signals():
+    """
+    drop cached answers when a course role is granted or removed, from the app's ready()
+    """
+    try:
+        from student.models import CourseAccessRole
+        from django.db.models.signals import post_delete, post_save
+    except ImportError:
+        return
+    post_save.connect(_invalidate_on_role_change, sender=CourseAccessRole,
+                      dispatch_uid='scormxblock_staff_access_save_invalidation')
+    post_delete.connect(_invalidate_on_role_change, sender=CourseAccessRole,
+                        dispatch_uid='scormxblock_staff_access_delete_invalidation')
@@ -0,0 +1,20 @@
+"""
+Django app configuration, used when `scormxblock` is in INSTALLED_APPS
+
+Models can't be imported while the app registry loads the XBlock module, so
+the signal handlers dropping cached values are connected once it is ready.
+"""
+from django.apps import AppConfig
+
+
+class ScormXBlockConfig(AppConfig):
+    name = 'scormxblock'
+    verbose_name = 'SCORM XBlock'
+
+    def ready(self):
+        import access
+        import identity
+        import settings as settings_mixin
+        access.connect_signals()
+        identity.connect_signals()
+        settings_mixin.connect_signals()
@@ -0,0 +1,161 @@
+"""
+Package storage as a single zip archive
+
+In archive storage mode the uploaded zip is stored as one object and never
+extracted.  At import, the offset of each member's data in the archive is
+read from its local file header and recorded in the package file manifest
+with its compression method and sizes:
+
+    {"a.html": {"sha1": ..., "size": 1200, "offset": 2048, "method": 8,
+                "compress_size": 480, "crc": 3735928559}, ...}
+
+Members are then read with one seek (or one ranged GET on S3) into the
+archive: stored members are copied as they are, deflated members are
+inflated as a stream, or sent as gzip without recompressing.
+"""
+import json
+import struct
+import zipfile
+import zlib
+
+from django.core.files import File
+
+import importer
+
+
+ARCHIVE_FILENAME = 'package.zip'
+STORED = zipfile.ZIP_STORED
+DEFLATED = zipfile.ZIP_DEFLATED
+READ_CHUNK_SIZE = 64 * 1024
+# gzip header with no file name and no timestamp, see RFC 1952
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+GZIP_TRAILER_SIZE = 8
+
+
+def archive_name(dest):
+    return u'{}/{}'.format(dest, ARCHIVE_FILENAME)
+
+
+def is_archive_entry(entry):
+    return entry is not None and 'offset' in entry
+
+
+def gzip_size(entry):
+    return len(GZIP_HEADER) + entry['compress_size'] + GZIP_TRAILER_SIZE
+
+
+class ArchiveImporter(importer.PackageImporter):
+    """
+    store an uploaded package zip as a single object under the package directory
+    and index its members, instead of extracting them.  `upload` is the file the
+    zip is read from
+    """
+    stored_as_archive = True
+
+    def __init__(self, storage, zip_file, upload, dest, encoding, **kwargs):
+        super(ArchiveImporter, self).__init__(storage, zip_file, dest, encoding, **kwargs)
+        self.upload = upload
+
+    def _data_offset(self, info):
+        # the local header's extra field may differ from the central directory's
+        fp = self.zip_file.fp
+        fp.seek(info.header_offset)
+        header = struct.unpack(zipfile.structFileHeader, fp.read(zipfile.sizeFileHeader))
+        return (info.header_offset + zipfile.sizeFileHeader +
+                header[zipfile._FH_FILENAME_LENGTH] + header[zipfile._FH_EXTRA_FIELD_LENGTH])
+
+    def index_members(self, files):
+        """
+        add the archive location of each member to the file manifest `files`
+        """
+        with self._zip_lock:
+            for name, info in self.members:
+                if info.flag_bits & 0x1:
+                    raise importer.PackageImportError('Package file {} is encrypted'.format(name))
+                if info.compress_type not in (STORED, DEFLATED):
+                    raise importer.PackageImportError(
+                        'Package file {} uses an unsupported compression method'.format(name))
+                files[name].update({
+                    'offset': self._data_offset(info),
+                    'method': info.compress_type,
+                    'compress_size': info.compress_size,
+                    'crc': info.CRC,
+                })
+
+    def run(self):
+        """
+        store the archive and its file manifest, return the file manifest
+        """
+        self.check_limits()
+        files = self.hash_members()
+        self.index_members(files)
+        if self.versioned:
+            self.version = importer.package_version_id(files, self.stored_as_archive)
+            self.package_dest = u'{}/{}'.format(self.dest, self.version)
+
+        previous_document = importer.load_file_manifest_document(self.storage, self.package_dest)
+        if importer.is_archive_document(previous_document) and previous_document['files'] == files:
+            # the same archive is stored here already
+            return files
+        # an extracted package or an older archive is replaced as a whole, the
+        # version directories next to an unversioned one are left to _import_package
+        importer.delete_package(self.storage, self.package_dest)
+        with self._zip_lock:
+            self.upload.seek(0)
+            self.storage.save(archive_name(self.package_dest), File(self.upload))
+        self._total = 1
+        self._stored(archive_name(self.package_dest), archive_name(self.package_dest))
+
+        # written last; its presence marks a complete import
+        self.storage.write(importer.file_manifest_name(self.package_dest), json.dumps({
+            'version': 1,
+            'files': files,
+            'archive': ARCHIVE_FILENAME,
+        }))
+        return files
+
+
+def _chunks(fh):
+    try:
+        while True:
+            data = fh.read(READ_CHUNK_SIZE)
+            if not data:
+                return
+            yield data
+    finally:
+        fh.close()
+
+
+def iter_member(storage, dest, entry, start=0, stop=None):
+    """
+    yield the uncompressed bytes `start` to `stop` of an archive member
+    """
+    stop = entry['size'] if stop is None else stop
+    if entry['method'] == STORED:
+        for data in _chunks(storage.open_range(archive_name(dest), entry['offset'] + start, stop - start)):
+            yield data
+        return
+
+    inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+    position = 0
+    for compressed in _chunks(storage.open_range(archive_name(dest), entry['offset'], entry['compress_size'])):
+        data = inflater.decompress(compressed)
+        # skip up to `start`, stop reading compressed data once `stop` is reached
+        if position + len(data) > start:
+            yield data[max(0, start - position):stop - position]
+        position += len(data)
+        if position >= stop:
+            return
+    data = inflater.flush()
+    if data and position < stop:
+        yield data[max(0, start - position):stop - position]
+
+
+def iter_member_gzip(storage, dest, entry):
+    """
+    yield a deflated archive member as a gzip stream, without recompressing it
+    """
+    yield GZIP_HEADER
+    for data in _chunks(storage.open_range(archive_name(dest), entry['offset'], entry['compress_size'])):
+        yield data
+    yield struct.pack('<LL', entry['crc'] & 0xffffffff, entry['size'] & 0xffffffff)
@@ -0,0 +1,200 @@
+"""
+Serving SCORM package files through the LMS
+
+For deployments which can't serve the package storage directory directly
+(no nginx location for it, or a private bucket), package files are served by
+the `package_asset` handler.  Responses carry strong ETags taken from the
+content hashes recorded at import, answer conditional and byte range
+requests, use precompressed variants made at import when the client accepts
+them, and can hand the transfer over to the front-end web server with
+X-Accel-Redirect (nginx) or X-Sendfile.
+"""
+import mimetypes
+import posixpath
+
+from webob import Response
+from webob.static import FileIter
+
+import archive
+import importer
+import precompress
+from ttlcache import TTLCache
+
+
+IMMUTABLE_MAX_AGE = 31536000
+FILE_MANIFEST_CACHE_SIZE = 128
+# seconds an unversioned package's manifest is cached, see FileManifestCache
+DEFAULT_UNVERSIONED_MANIFEST_TTL = 30
+# files the importer writes next to the package content
+INTERNAL_FILES = (importer.FILE_MANIFEST_FILENAME, importer.INDEX_FILENAME)
+
+
+class FileManifestCache(TTLCache):
+    """
+    process-wide cache of package file manifests.  a version directory is named
+    after its content and never rewritten, so its manifest is kept until evicted.
+    an unversioned package is re-imported in place: its manifest is cached per
+    package id for `ttl` seconds, so a published re-upload is picked up at once
+    and one re-imported in Studio ahead of publishing within the TTL
+    """
+    def __init__(self, size=FILE_MANIFEST_CACHE_SIZE):
+        super(FileManifestCache, self).__init__(size)
+
+    def get(self, storage, dest, version, package_id=None, ttl=DEFAULT_UNVERSIONED_MANIFEST_TTL):
+        load = lambda: importer.load_file_manifest(storage, dest)
+        if version:
+            return super(FileManifestCache, self).get((dest, version), load)
+        return super(FileManifestCache, self).get((dest, package_id), load, ttl)
+
+
+file_manifests = FileManifestCache()
+
+
+def _not_found():
+    return Response(status=404)
+
+
+def _not_modified(response):
+    response.status = 304
+    response.content_length = None
+    del response.content_type
+    return response
+
+
+def choose_variant(request, entry):
+    """
+    return the best precompressed variant of a file the client accepts, or None
+    """
+    variants = entry.get('variants') if entry else None
+    # without an Accept-Encoding header webob accepts anything, but clients may not
+    if not variants or not request.headers.get('Accept-Encoding'):
+        return None
+    for encoding in precompress.ENCODINGS:
+        if encoding in variants and encoding in request.accept_encoding:
+            return encoding
+    return None
+
+
+def asset_response(request, storage, dest, path, files=None, immutable=False,
+                   accel_redirect=None, sendfile=False):
+    """
+    return a response for the package file `path` stored under `dest`.
+    `files` is the package file manifest; files missing from it are not served
+    """
+    name = importer.clean_member_name(path or '')
+    if name is None or posixpath.basename(name) in INTERNAL_FILES:
+        return _not_found()
+    stored_name = u'{}/{}'.format(dest, name)
+    entry = files.get(name) if files is not None else None
+    if files is not None and entry is None:
+        return _not_found()
+    if entry is None and not storage.exists(stored_name):
+        return _not_found()
+
+    response = Response(conditional_response=False)
+    response.content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    response.accept_ranges = 'bytes'
+    # authenticated handler responses must not end up in shared caches
+    if immutable:
+        response.cache_control = 'private, max-age={}, immutable'.format(IMMUTABLE_MAX_AGE)
+    else:
+        response.cache_control = 'private, no-cache'
+    if archive.is_archive_entry(entry):
+        return _archive_member_response(request, storage, dest, entry, response)
+
+    # nginx drops the Content-Encoding of a redirected response, gzip_static picks the variant there
+    encoding = choose_variant(request, entry) if not accel_redirect else None
+    if entry is not None and entry.get('variants'):
+        response.vary = ('Accept-Encoding',)
+    if encoding is not None:
+        stored_name = u'{}/{}'.format(dest, precompress.variant_name(name, encoding))
+        response.content_encoding = encoding
+        # each representation needs its own strong validator
+        response.etag = '{}-{}'.format(entry['sha1'], encoding)
+        size = entry['variants'][encoding]['size']
+    elif entry is not None:
+        response.etag = entry['sha1']
+        size = entry['size']
+    else:
+        # packages imported before file manifests were kept have no hashes
+        response.last_modified = storage.modified_time(stored_name)
+        size = storage.size(stored_name)
+
+    if response.etag is not None:
+        if request.if_none_match and response.etag in request.if_none_match:
+            return _not_modified(response)
+    elif request.if_modified_since and response.last_modified and \
+            response.last_modified <= request.if_modified_since:
+        return _not_modified(response)
+
+    if accel_redirect:
+        # nginx serves the file from an internal location, ranges included
+        response.headers['X-Accel-Redirect'] = (u'{}/{}'.format(accel_redirect.rstrip('/'), stored_name)).encode('utf-8')
+        return response
+    local_path = storage.local_path(stored_name) if sendfile else None
+    if local_path:
+        response.headers['X-Sendfile'] = local_path.encode('utf-8')
+        return response
+
+    return _content_response(request, response, size,
+                             lambda start, stop: _file_iter(storage, stored_name, start, stop, size))
+
+
+def _file_iter(storage, name, start, stop, size):
+    """
+    iterate over bytes `start` to `stop` of a stored file; a range is read with
+    open_range, e.g. one ranged GET on S3 instead of downloading the whole object
+    """
+    if start == 0 and stop == size:
+        return FileIter(storage.open(name))
+    return FileIter(storage.open_range(name, start, stop - start))
+
+
+def _content_response(request, response, size, content, ranges=True):
+    """
+    complete `response` with the bytes of a `size` bytes representation, or the
+    requested range of them; `content(start, stop)` iterates over those bytes
+    """
+    byte_range = None
+    if ranges and request.range and (not request.if_range or response in request.if_range):
+        byte_range = request.range.range_for_length(size)
+        if byte_range is None:
+            response.status = 416
+            response.content_range = 'bytes */{}'.format(size)
+            response.content_length = 0
+            return response
+
+    if byte_range is None:
+        response.app_iter = content(0, size)
+        response.content_length = size
+    else:
+        start, stop = byte_range
+        response.status = 206
+        response.app_iter = content(start, stop)
+        response.content_range = (start, stop, size)
+        response.content_length = stop - start
+    return response
+
+
+def _archive_member_response(request, storage, dest, entry, response):
+    """
+    serve a member of a package stored as a single archive, see archive.py.
+    members always stream through here: X-Accel-Redirect and X-Sendfile hand over
+    whole files, not the byte range of the zip holding even a stored member
+    """
+    gzip = (entry['method'] == archive.DEFLATED and request.headers.get('Accept-Encoding') and
+            precompress.GZIP in request.accept_encoding)
+    if entry['method'] == archive.DEFLATED:
+        response.vary = ('Accept-Encoding',)
+    response.etag = '{}-{}'.format(entry['sha1'], precompress.GZIP) if gzip else entry['sha1']
+    if request.if_none_match and response.etag in request.if_none_match:
+        return _not_modified(response)
+
+    if gzip:
+        # the deflated data is sent as it is stored, ranges of it aren't supported
+        response.content_encoding = precompress.GZIP
+        response.accept_ranges = 'none'
+        return _content_response(request, response, archive.gzip_size(entry),
+                                 lambda start, stop: archive.iter_member_gzip(storage, dest, entry), ranges=False)
+    return _content_response(request, response, entry['size'],
+                             lambda start, stop: archive.iter_member(storage, dest, entry, start, stop))
@@ -0,0 +1,37 @@
+"""
+Helpers for the resumable batch jobs of the management commands
+
+`regrade` and `orphans` work through id- or name-ordered items in groups on a
+pool of worker threads, and record the last item fully done in an optional
+JSON checkpoint file so an interrupted run can be resumed.
+"""
+import json
+import os
+from itertools import islice
+
+
+def groups(iterable, size):
+    """
+    yield lists of up to `size` consecutive items
+    """
+    iterator = iter(iterable)
+    while True:
+        group = list(islice(iterator, size))
+        if not group:
+            return
+        yield group
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as checkpoint_file:
+        return json.load(checkpoint_file)
+
+
+def save_checkpoint(path, checkpoint):
+    # write then rename so an interrupted run never leaves a truncated checkpoint
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.rename(tmp_path, path)
@@ -0,0 +1,147 @@
+"""
+Streaming export of learner SCORM status across a course
+
+Learner state is read from courseware StudentModule rows in id-ordered
+batches, so memory use stays flat however many learners a course has.
+"""
+import csv
+import json
+import re
+
+from state import ScormState
+import rollup
+
+
+DEFAULT_BATCH_SIZE = 1000
+# lesson scores are out of 100, see DEFAULT_SCO_MAX_SCORE
+MAX_SCORE = 100
+SCORM_MODULE_TYPE = 'scormxblock'
+CSV_FIELDS = ('username', 'user_id', 'block_id', 'lesson_status', 'lesson_score',
+              'sco_scores', 'total_time', 'modified')
+
+# SCORM 1.2 CMITimespan HHHH:MM:SS.SS and SCORM 2004 ISO 8601 durations
+TIMESPAN_12 = re.compile(r'^(\d+):(\d{1,2}):(\d{1,2}(?:\.\d+)?)$')
+DURATION_2004 = re.compile(r'^P(?:(\d+)Y)?(?:(\d+)M)?(?:(\d+)D)?'
+                           r'(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?)?$')
+TIME_ELEMENTS = ('cmi.core.total_time', 'cmi.total_time')
+
+
+def parse_timespan(value):
+    """
+    return a SCORM time span in seconds, or None if it can't be parsed
+    """
+    value = (value or '').strip()
+    match = TIMESPAN_12.match(value)
+    if match:
+        hours, minutes, seconds = match.groups()
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    match = DURATION_2004.match(value)
+    if match and value not in ('P', 'PT'):
+        years, months, days, hours, minutes, seconds = [float(part or 0) for part in match.groups()]
+        # years and months as in the SCORM 2004 RTE: 365 and 30 days
+        return (((years * 365 + months * 30 + days) * 24 + hours) * 60 + minutes) * 60 + seconds
+    return None
+
+
+def iter_student_modules(course_key, block_keys=None, since=None, until=None, batch_size=DEFAULT_BATCH_SIZE,
+                         after_id=0):
+    """
+    yield StudentModule rows for SCORM blocks in a course, fetched in batches by id,
+    starting after row `after_id`
+    """
+    from courseware.models import StudentModule
+
+    queryset = StudentModule.objects.filter(course_id=course_key, module_type=SCORM_MODULE_TYPE)
+    if block_keys:
+        queryset = queryset.filter(module_state_key__in=block_keys)
+    if since:
+        queryset = queryset.filter(modified__gte=since)
+    if until:
+        queryset = queryset.filter(modified__lt=until)
+    queryset = queryset.select_related('student').order_by('id')
+
+    last_id = after_id
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        for module in batch:
+            yield module
+        last_id = batch[-1].id
+
+
+def module_fields(module):
+    """
+    return the XBlock user state fields stored in a StudentModule row
+    """
+    try:
+        fields = json.loads(module.state or '{}')
+    except ValueError:
+        return {}
+    return fields if isinstance(fields, dict) else {}
+
+
+def graded_score(fields):
+    """
+    return the lesson score of the grade last published for a learner, so the
+    export agrees with the gradebook, or the stored lesson score if none was
+    """
+    value, max_value = fields.get('published_grade_value'), fields.get('published_grade_max')
+    if value is not None and max_value:
+        # rounded off the float noise of value = score / MAX_SCORE * weight
+        return round(float(value) / max_value * MAX_SCORE, 6)
+    return fields.get('lesson_score', 0)
+
+
+def status_row(module):
+    """
+    return the export row for one learner's state in one SCORM block
+    """
+    fields = module_fields(module)
+    status = ScormState(fields.get('raw_scorm_status', '{}'))
+    sco_scores = {}
+    total_time = None
+    for sco_id in status.scos:
+        data = status.sco_data(sco_id)
+        sco_scores[sco_id] = rollup.sco_score(data)
+        for element in TIME_ELEMENTS:
+            seconds = parse_timespan(data.get(element))
+            if seconds is not None:
+                total_time = (total_time or 0) + seconds
+                break
+    return {
+        'username': module.student.username,
+        'user_id': module.student_id,
+        'block_id': unicode(module.module_state_key),
+        'lesson_status': fields.get('lesson_status', 'not attempted'),
+        'lesson_score': graded_score(fields),
+        'sco_scores': sco_scores,
+        'total_time': total_time,
+        'modified': module.modified.isoformat() if module.modified else None,
+    }
+
+
+def status_rows(course_key, **kwargs):
+    for module in iter_student_modules(course_key, **kwargs):
+        yield status_row(module)
+
+
+def write_jsonl(rows, out):
+    for row in rows:
+        out.write(json.dumps(row))
+        out.write('\n')
+
+
+def write_csv(rows, out):
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        row = dict(row, sco_scores=json.dumps(row['sco_scores'], sort_keys=True))
+        writer.writerow(dict((key, unicode(value).encode('utf-8') if value is not None else '')
+                             for key, value in row.items()))
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+}
@@ -0,0 +1,97 @@
+"""
+Learner names sent to SCORM content as cmi.core.student_name
+
+Names are looked up once per request and learner, shared by every SCORM
+block on the page, and kept in the Django cache for a short time so repeat
+page loads don't query the user and profile again.  Cached names are dropped
+when the learner's User or UserProfile is saved, once the app is ready (see
+apps.py).
+"""
+from django.core.cache import cache
+
+
+DEFAULT_IDENTITY_CACHE_TTL = 300
+CACHE_KEY = 'scormxblock.identity.{}'
+REQUEST_CACHE_KEY = 'scormxblock.identities'
+EMPTY_IDENTITY = {'name': u'', 'reversed_name': u''}
+
+
+def request_data(key):
+    """
+    return a dict stored under `key` for the life of the current request
+    """
+    try:
+        from openedx.core.djangoapps.request_cache.middleware import RequestCache
+    except ImportError:
+        try:
+            from request_cache.middleware import RequestCache
+        except ImportError:
+            return {}
+    return RequestCache.get_request_cache().data.setdefault(key, {})
+
+
+def identity_of(student):
+    """
+    return the learner's name in forward and reversed (SCORM) order
+    """
+    try:
+        split_name = student.profile.name.split(' ')
+        first_name = student.first_name if student.first_name else split_name[0]
+        last_name = student.last_name if student.last_name else ' '.join(split_name[1:])
+    except (AttributeError, IndexError):
+        return EMPTY_IDENTITY
+    return {
+        'name': u"{} {}".format(first_name, last_name),
+        'reversed_name': u"{}, {}".format(last_name, first_name),
+    }
+
+
+def get_identity(user_id, get_student, ttl=DEFAULT_IDENTITY_CACHE_TTL):
+    """
+    return the identity of learner `user_id`, calling `get_student()` for the
+    User only if it isn't known to this request or the cache
+    """
+    identities = request_data(REQUEST_CACHE_KEY)
+    if user_id in identities:
+        return identities[user_id]
+
+    key = CACHE_KEY.format(user_id)
+    identity = cache.get(key) if ttl and user_id is not None else None
+    if identity is None:
+        student = get_student()
+        if not student:
+            return EMPTY_IDENTITY
+        identity = identity_of(student)
+        if ttl and user_id is not None:
+            cache.set(key, identity, ttl)
+    identities[user_id] = identity
+    return identity
+
+
+def invalidate(user_id):
+    cache.delete(CACHE_KEY.format(user_id))
+    request_data(REQUEST_CACHE_KEY).pop(user_id, None)
+
+
+def _invalidate_on_user_save(sender, instance, **kwargs):
+    invalidate(instance.id)
+
+
+def _invalidate_on_profile_save(sender, instance, **kwargs):
+    invalidate(instance.user_id)
+
+
+def connect_signals():
+    """
+    drop cached names when a User or UserProfile is saved, from the app's ready()
+    """
+    try:
+        from student.models import UserProfile
+        from django.contrib.auth.models import User
+        from django.db.models.signals import post_save
+    except ImportError:
+        return
+    post_save.connect(_invalidate_on_user_save, sender=User,
+                      dispatch_uid='scormxblock_identity_user_invalidation')
+    post_save.connect(_invalidate_on_profile_save, sender=UserProfile,
+                      dispatch_uid='scormxblock_identity_profile_invalidation')
@@ -0,0 +1,484 @@
+"""
+SCORM package import pipeline
+
+Members are streamed out of the uploaded zip straight into package storage
+through a bounded pool of upload threads, without extracting the archive to
+a temporary directory first.  A manifest of content hashes is stored with
+each package so that re-uploads only write files which changed.
+
+With package versioning, each upload goes to its own immutable directory
+named after its content, and the block only switches to it once complete.
+"""
+import datetime
+import functools
+import hashlib
+import json
+import logging
+import posixpath
+import tempfile
+import threading
+from multiprocessing.pool import ThreadPool
+
+import precompress
+
+
+logger = logging.getLogger(__name__)
+
+# members smaller than this are buffered in memory, larger ones spill to disk
+SPOOL_MAX_MEMORY = 5 * 1024 * 1024
+COPY_CHUNK_SIZE = 64 * 1024
+
+MANIFEST_FILENAME = 'imsmanifest.xml'
+# per-file content hashes of the last import, used to upload only changed files
+FILE_MANIFEST_FILENAME = '.scormxblock-files.json'
+# compact index parsed from imsmanifest.xml, see manifest.py
+INDEX_FILENAME = '.scormxblock-index.json'
+VERSION_ID_LENGTH = 12
+# shared blobs younger than this may belong to an import still in progress
+SHARED_BLOB_MIN_AGE = 24 * 60 * 60
+
+
+class PackageImportError(Exception):
+    pass
+
+
+def decode_member_name(name, encoding):
+    """
+    return a unicode member name; names without the zip UTF-8 flag
+    are decoded with the package's declared text encoding
+    """
+    if isinstance(name, unicode):
+        return name
+    return name.decode(encoding)
+
+
+def clean_member_name(name):
+    """
+    return a safe relative path for a member, or None for members
+    which would land outside the package directory
+    """
+    name = posixpath.normpath(name.replace('\\', '/')).lstrip('/')
+    if name in ('', '.') or name == '..' or name.startswith('../'):
+        return None
+    return name
+
+
+def file_manifest_name(dest):
+    return u'{}/{}'.format(dest, FILE_MANIFEST_FILENAME)
+
+
+def load_file_manifest_document(storage, dest):
+    """
+    return the file manifest document recorded by the last import into `dest`:
+    {'version': 1, 'files': {...}, 'precompress': {...} or None}, or None if there is none
+    """
+    name = file_manifest_name(dest)
+    if not storage.exists(name):
+        return None
+    try:
+        document = json.loads(storage.read(name))
+        document['files']
+    except (ValueError, KeyError, TypeError):
+        logger.warn('SCORM XBlock ignoring unreadable file manifest {}'.format(name))
+        return None
+    return document
+
+
+def load_file_manifest(storage, dest):
+    """
+    return the {name: {'sha1': ..., 'size': ..., 'variants': {...}}} file manifest
+    recorded by the last import into `dest`, or None if there is none
+    """
+    document = load_file_manifest_document(storage, dest)
+    return document['files'] if document is not None else None
+
+
+def shared_blob_name(shared_dir, sha1):
+    return u'{}/{}/{}'.format(shared_dir, sha1[:2], sha1)
+
+
+def referenced_blobs(storage, storage_dir, shared_dir, exclude=()):
+    """
+    return the hashes recorded in the file manifests of all packages under
+    `storage_dir`, leaving out the package directories named in `exclude`
+    """
+    shared_prefix = shared_dir.rstrip('/') + '/'
+    sha1s = set()
+    for name in storage.list_prefix(storage_dir):
+        if posixpath.basename(name) != FILE_MANIFEST_FILENAME or name.startswith(shared_prefix):
+            continue
+        if name[len(storage_dir):].strip('/').split('/', 1)[0] in exclude:
+            continue
+        files = load_file_manifest(storage, posixpath.dirname(name)) or {}
+        sha1s.update(entry['sha1'] for entry in files.values())
+    return sha1s
+
+
+def file_age(modified):
+    """
+    return the seconds since a storage modification time
+    """
+    # aware with USE_TZ and recent storages, naive otherwise
+    if modified.tzinfo is not None:
+        from django.utils import timezone
+        return (timezone.now() - modified).total_seconds()
+    return (datetime.datetime.now() - modified).total_seconds()
+
+
+def unreferenced_blobs(storage, storage_dir, shared_dir, exclude=(), min_age=SHARED_BLOB_MIN_AGE):
+    """
+    yield (name, size) for the shared blobs no stored package refers to any more.
+    blobs are only the source packages' files are copied from, so deleting one never
+    breaks a package; it only means identical content is uploaded again
+    """
+    referenced = referenced_blobs(storage, storage_dir, shared_dir, exclude)
+    for name, size in storage.list_prefix_sizes(shared_dir):
+        if posixpath.basename(name) in referenced:
+            continue
+        modified = storage.modified_time(name)
+        if modified is not None and file_age(modified) < min_age:
+            continue
+        yield name, size
+
+
+def package_version_id(files, stored_as_archive=False):
+    """
+    return a version id derived from a file manifest, so identical
+    content always maps to the same immutable version directory;
+    the same content stored as an archive gets a version of its own
+    """
+    digest = hashlib.sha1()
+    if stored_as_archive:
+        digest.update(b'archive\0')
+    for name in sorted(files):
+        digest.update(u'{}\0{}\0'.format(name, files[name]['sha1']).encode('utf-8'))
+    return digest.hexdigest()[:VERSION_ID_LENGTH]
+
+
+def prune_versions(storage, dest, keep_versions):
+    """
+    delete everything under `dest` which doesn't belong to one of `keep_versions`,
+    including files stored there before package versioning was turned on
+    """
+    keep_prefixes = tuple(u'{}/{}/'.format(dest, version) for version in keep_versions)
+    stale = [name for name in storage.list_prefix(dest) if not name.startswith(keep_prefixes)]
+    storage.delete_many(stale)
+    return len(stale)
+
+
+def delete_package(storage, dest):
+    """
+    delete the package stored directly in `dest`, keeping the package version
+    directories under it (those with a file manifest of their own), which may
+    still be in use by the published block
+    """
+    try:
+        dirs = storage.list_dirs(dest)
+    except OSError:
+        dirs = []
+    keep_prefixes = tuple(u'{}/{}/'.format(dest, name) for name in dirs
+                          if storage.exists(file_manifest_name(u'{}/{}'.format(dest, name))))
+    storage.delete_many([name for name in storage.list_prefix(dest) if not name.startswith(keep_prefixes)])
+
+
+def is_archive_document(document):
+    """
+    return True if a file manifest document describes a package stored as one archive
+    """
+    return document is not None and bool(document.get('archive'))
+
+
+def log_progress(done, total, name):
+    logger.debug('SCORM package import: stored %s (%d/%d)', name, done, total)
+
+
+class PackageImporter(object):
+    """
+    import the members of a SCORM package zip into `storage` under `dest`
+    """
+    stored_as_archive = False
+
+    def __init__(self, storage, zip_file, dest, encoding, concurrency=1,
+                 max_size=None, max_member_size=None, shared_dir=None, versioned=False, base_dest=None,
+                 progress=log_progress, precompressor=None):
+        self.storage = storage
+        self.zip_file = zip_file
+        self.dest = dest
+        self.package_dest = dest
+        self.versioned = versioned
+        self.version = None
+        self.base_dest = base_dest
+        self.encoding = encoding
+        self.concurrency = concurrency
+        self.max_size = max_size
+        self.max_member_size = max_member_size
+        self.shared_dir = shared_dir
+        self.progress = progress
+        self.precompressor = precompressor
+        self._zip_lock = threading.Lock()
+        self._progress_lock = threading.Lock()
+        self._done = 0
+        self._total = 0
+        self.members = self._collect_members()
+
+    def _collect_members(self):
+        members = []
+        for info in self.zip_file.infolist():
+            if info.filename.endswith('/'):
+                continue  # directory entry
+            name = clean_member_name(decode_member_name(info.filename, self.encoding))
+            if name is None:
+                logger.warn('SCORM XBlock skipping unsafe package member {!r}'.format(info.filename))
+                continue
+            members.append((name, info))
+        return members
+
+    @property
+    def total_size(self):
+        return sum(info.file_size for name, info in self.members)
+
+    def check_limits(self):
+        """
+        raise PackageImportError if the package exceeds configured size limits.
+        sizes are taken from the zip central directory before anything is stored;
+        members are never inflated past their declared size, see _member_chunks
+        """
+        if self.max_member_size:
+            for name, info in self.members:
+                if info.file_size > self.max_member_size:
+                    raise PackageImportError(
+                        'Package file {} is larger than the {} byte limit'.format(name, self.max_member_size))
+        if self.max_size and self.total_size > self.max_size:
+            raise PackageImportError(
+                'Package is larger than the {} byte limit when uncompressed'.format(self.max_size))
+
+    def read_member(self, name):
+        """
+        return the contents of a package member by its path in the package
+        """
+        for member_name, info in self.members:
+            if member_name == name:
+                with self._zip_lock:
+                    return b''.join(self._member_chunks(name, info))
+        raise PackageImportError('{} not found at the root of the package'.format(name))
+
+    def _member_chunks(self, name, info):
+        """
+        yield the uncompressed data of a member, failing as soon as it inflates past
+        the size its zip entry declares, which is what the size limits were checked against
+        """
+        src = self.zip_file.open(info)
+        try:
+            size = 0
+            for chunk in iter(functools.partial(src.read, COPY_CHUNK_SIZE), b''):
+                size += len(chunk)
+                if size > info.file_size:
+                    raise PackageImportError('Package file {} is larger than its zip entry declares'.format(name))
+                yield chunk
+        finally:
+            src.close()
+
+    def _open_member(self, info):
+        """
+        copy one member into a spooled temp file; reads from the shared
+        zip file are serialized, uploads of the copies run in parallel
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        with self._zip_lock:
+            for chunk in self._member_chunks(info.filename, info):
+                spool.write(chunk)
+        spool.seek(0)
+        return spool
+
+    def _stored(self, name, stored_name):
+        with self._progress_lock:
+            self._done += 1
+            done = self._done
+        if self.progress is not None:
+            self.progress(done, self._total, name)
+
+    def hash_members(self):
+        """
+        return {name: {'sha1': ..., 'size': ...}} for all members,
+        reading each member once without storing anything
+        """
+        files = {}
+        total = 0
+        for name, info in self.members:
+            sha1 = hashlib.sha1()
+            with self._zip_lock:
+                for chunk in self._member_chunks(name, info):
+                    total += len(chunk)
+                    if self.max_size and total > self.max_size:
+                        raise PackageImportError(
+                            'Package is larger than the {} byte limit when uncompressed'.format(self.max_size))
+                    sha1.update(chunk)
+            files[name] = {'sha1': sha1.hexdigest(), 'size': info.file_size}
+        return files
+
+    def _store_shared_blob(self, item):
+        sha1, info = item
+        blob_name = shared_blob_name(self.shared_dir, sha1)
+        if not self.storage.exists(blob_name):
+            self.storage.save(blob_name, self._open_member(info))
+        return sha1
+
+    def _copy_shared(self, item):
+        name, sha1 = item
+        dest_name = u'{}/{}'.format(self.package_dest, name)
+        self._stored(dest_name, self.storage.copy(shared_blob_name(self.shared_dir, sha1), dest_name))
+
+    def _store_shared(self, changed, files):
+        """
+        store each distinct member once in the shared blob store, then copy it into place;
+        both steps run on the upload thread pool
+        """
+        blobs = {}
+        for name, info in changed:
+            blobs.setdefault(files[name]['sha1'], info)
+        pool = ThreadPool(max(1, self.concurrency))
+        try:
+            pool.map(self._store_shared_blob, blobs.items())
+            pool.map(self._copy_shared, [(name, files[name]['sha1']) for name, info in changed])
+        finally:
+            pool.close()
+            pool.join()
+
+    def _copy_unchanged(self, unchanged):
+        """
+        copy files identical to the base version instead of uploading them again
+        """
+        for name in unchanged:
+            dest_name = u'{}/{}'.format(self.package_dest, name)
+            self._stored(dest_name, self.storage.copy(u'{}/{}'.format(self.base_dest, name), dest_name))
+
+    def run(self):
+        """
+        store new and changed package members and remove members which
+        disappeared since the previous import, return the package file manifest.
+
+        when versioned, the package is stored under `<dest>/<version>` where the
+        version is derived from the file hashes, and files unchanged from the
+        `base_dest` version are copied within storage rather than uploaded
+        """
+        self.check_limits()
+        files = self.hash_members()
+        if self.versioned:
+            self.version = package_version_id(files)
+            self.package_dest = u'{}/{}'.format(self.dest, self.version)
+        previous_document = load_file_manifest_document(self.storage, self.package_dest)
+        if is_archive_document(previous_document):
+            # none of the archive's members were extracted, nothing can be kept
+            delete_package(self.storage, self.package_dest)
+            previous_document = None
+        previous = previous_document['files'] if previous_document is not None else None
+        if previous is None:
+            # first import, or a package stored before file manifests existed
+            if self.storage.exists(u'{}/{}'.format(self.package_dest, MANIFEST_FILENAME)):
+                delete_package(self.storage, self.package_dest)
+            else:
+                # files left by an interrupted import, which saves must not rename around
+                member_names = set(u'{}/{}'.format(self.package_dest, name) for name, info in self.members)
+                self.storage.delete_many([name for name in self.storage.list_prefix(self.package_dest)
+                                          if name in member_names])
+            changed = [(name, info) for name, info in self.members]
+        else:
+            changed = [(name, info) for name, info in self.members
+                       if previous.get(name, {}).get('sha1') != files[name]['sha1']]
+            stale = [name for name, entry in previous.items()
+                     if name not in files or files[name]['sha1'] != entry.get('sha1')]
+            if changed or stale:
+                # the old manifest no longer describes what is stored once files are
+                # touched; without it an interrupted import is redone in full next time
+                self.storage.delete(file_manifest_name(self.package_dest))
+            self.storage.delete_many([u'{}/{}'.format(self.package_dest, name) for name in stale])
+            logger.info('SCORM package import: %d of %d files changed, %d removed',
+                        len(changed), len(files), len(set(previous) - set(files)))
+
+        unchanged = []
+        base_document = None
+        if self.base_dest and self.base_dest != self.package_dest:
+            base_document = load_file_manifest_document(self.storage, self.base_dest)
+            if is_archive_document(base_document):
+                base_document = None  # there are no extracted files to copy
+            base = base_document['files'] if base_document is not None else {}
+            unchanged = set(name for name, info in changed
+                            if base.get(name, {}).get('sha1') == files[name]['sha1'])
+            changed = [(name, info) for name, info in changed if name not in unchanged]
+
+        self._total = len(changed) + len(unchanged)
+        self._copy_unchanged(unchanged)
+        if self.shared_dir:
+            self._store_shared(changed, files)
+        else:
+            items = [(u'{}/{}'.format(self.package_dest, name), functools.partial(self._open_member, info))
+                     for name, info in changed]
+            self.storage.save_many(items, self.concurrency, on_saved=self._stored)
+
+        self._precompress(files, previous_document, base_document, unchanged)
+
+        # written last; its presence marks a complete import
+        self.storage.write(file_manifest_name(self.package_dest), json.dumps({
+            'version': 1,
+            'files': files,
+            'precompress': self.precompressor.to_dict() if self.precompressor else None,
+        }))
+        return files
+
+    def _variant_names(self, dest, files):
+        return set(u'{}/{}'.format(dest, precompress.variant_name(name, encoding))
+                   for name, entry in files.items() for encoding in entry.get('variants', {}))
+
+    def _compress_member(self, item):
+        name, info = item
+        with self._zip_lock:
+            data = b''.join(self._member_chunks(name, info))
+        variants = {}
+        for encoding, compressed in self.precompressor.compress(data).items():
+            self.storage.write(u'{}/{}'.format(self.package_dest, precompress.variant_name(name, encoding)), compressed)
+            variants[encoding] = {'size': len(compressed)}
+        return name, variants
+
+    def _precompress(self, files, previous_document, base_document, copied):
+        """
+        store precompressed variants of compressible members and record them in `files`.
+        variants made with the same settings are kept for files unchanged since the
+        previous import, and copied along with files unchanged from the base version
+        """
+        settings = self.precompressor.to_dict() if self.precompressor else None
+        previous = previous_document['files'] if previous_document else {}
+        reusable = previous if previous_document and previous_document.get('precompress') == settings else {}
+        base = (base_document['files'] if base_document and base_document.get('precompress') == settings
+                else {})
+
+        to_compress = []
+        if self.precompressor:
+            names = set(files)
+            for name, info in self.members:
+                entry = files[name]
+                if not self.precompressor.wants(name, entry['size'], names):
+                    continue
+                if reusable.get(name, {}).get('sha1') == entry['sha1']:
+                    entry['variants'] = reusable[name].get('variants', {})
+                elif name in copied and base.get(name, {}).get('sha1') == entry['sha1']:
+                    entry['variants'] = base[name].get('variants', {})
+                    for encoding in entry['variants']:
+                        variant = precompress.variant_name(name, encoding)
+                        self.storage.copy(u'{}/{}'.format(self.base_dest, variant),
+                                          u'{}/{}'.format(self.package_dest, variant))
+                else:
+                    to_compress.append((name, info))
+
+        if to_compress:
+            pool = ThreadPool(max(1, min(self.concurrency, len(to_compress))))
+            try:
+                for name, variants in pool.imap_unordered(self._compress_member, to_compress):
+                    files[name]['variants'] = variants
+            finally:
+                pool.close()
+                pool.join()
+            logger.info('SCORM package import: precompressed %d files', len(to_compress))
+
+        # variants of changed or removed files, or made with other settings
+        stale = self._variant_names(self.package_dest, previous) - self._variant_names(self.package_dest, files)
+        self.storage.delete_many(sorted(stale))
@@ -0,0 +1,226 @@
+"""
+Background SCORM package imports
+
+With SCORM_IMPORT_EXECUTOR set to "celery" or "thread", `studio_submit`
+only validates an uploaded package, stores the zip in package storage and
+enqueues an import job.  The job runs the import in a Celery worker, or in a
+thread of the Studio process, and points the block at the new package only
+once the import has succeeded.
+
+The Studio request saves the block only after `studio_submit` returns, so
+the block records the job id (`import_job_id`).  A job checks once whether
+the stored draft carries it; if not, the job is run again a little later
+instead of waiting in the worker.  When the import is done, only the package
+fields are merged into the latest draft, keeping Studio edits made
+meanwhile.
+
+Job status is kept in the Django cache, where the `import_status` view (see
+views.py) reads it for Studio to poll.  The view loads no block: Studio
+saves a block after each of its handlers, which could write the package
+fields read before the job finished back over the import.
+
+    {"state": "running", "stage": "uploading", "done": 12, "total": 340, "error": null}
+"""
+import logging
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from multiprocessing.pool import ThreadPool
+
+from django.core.cache import cache
+
+import importer
+
+
+logger = logging.getLogger(__name__)
+
+SYNC = 'sync'
+THREAD = 'thread'
+CELERY = 'celery'
+EXECUTORS = (SYNC, THREAD, CELERY)
+
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+EXTRACTING = 'extracting'
+UPLOADING = 'uploading'
+FINALIZING = 'finalizing'
+
+CACHE_KEY = 'scormxblock.import.{}'
+STATUS_TTL = 24 * 60 * 60
+UPLOADS_DIRNAME = '_uploads'
+# an upload is removed when its job ends; one older than the job status outlived
+# a job which died with its process, e.g. a thread job in a restarted Studio
+UPLOAD_MAX_AGE = STATUS_TTL
+# seconds between progress updates written to the cache
+PROGRESS_INTERVAL = 1.0
+# a job not finding the block saved by the Studio request which started it
+# runs again SAVE_RETRY_DELAY seconds later, at most SAVE_RETRIES times
+SAVE_RETRIES = 60
+SAVE_RETRY_DELAY = 1
+IMPORT_THREADS = 2
+SPOOL_MAX_MEMORY = 5 * 1024 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+def upload_name(storage_dir, job_id):
+    """
+    where a package waiting for import is stored
+    """
+    return u'{}/{}/{}.zip'.format(storage_dir, UPLOADS_DIRNAME, job_id)
+
+
+def stale_uploads(storage, storage_dir, max_age=UPLOAD_MAX_AGE):
+    """
+    yield (name, size) for the stored uploads left by jobs which never finished
+    """
+    for name, size in storage.list_prefix_sizes(u'{}/{}'.format(storage_dir, UPLOADS_DIRNAME)):
+        modified = storage.modified_time(name)
+        if modified is not None and importer.file_age(modified) >= max_age:
+            yield name, size
+
+
+def get_status(job_id):
+    return cache.get(CACHE_KEY.format(job_id))
+
+
+def set_status(job_id, state, stage=None, done=0, total=0, error=None):
+    cache.set(CACHE_KEY.format(job_id), {
+        'state': state,
+        'stage': stage,
+        'done': done,
+        'total': total,
+        'error': error,
+    }, STATUS_TTL)
+
+
+class ProgressReporter(object):
+    """
+    importer progress callback recording the stage and upload progress of a job,
+    writing to the cache at most every PROGRESS_INTERVAL seconds
+    """
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last = 0
+
+    def stage(self, stage):
+        set_status(self.job_id, RUNNING, stage)
+
+    def __call__(self, done, total, name):
+        now = time.time()
+        if done == total or now - self._last >= PROGRESS_INTERVAL:
+            self._last = now
+            set_status(self.job_id, RUNNING, UPLOADING, done, total)
+
+
+def open_upload(storage, name):
+    """
+    return a seekable local copy of a stored package zip
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    fh = storage.open(name)
+    try:
+        shutil.copyfileobj(fh, spool)
+    finally:
+        fh.close()
+    spool.seek(0)
+    return spool
+
+
+class ImportJobError(Exception):
+    pass
+
+
+class BlockNotSaved(ImportJobError):
+    pass
+
+
+def saved_block(store, usage_key, job_id):
+    """
+    return the draft block if the Studio request which started the job has saved it
+    """
+    block = store.get_item(usage_key)
+    if block.import_job_id != job_id:
+        raise BlockNotSaved('The block was not saved with this upload, or a later upload replaced it')
+    return block
+
+
+def import_package(store, usage_key, job_id, user_id):
+    """
+    import the package stored for a job into a block and publish the change to `store`
+    """
+    block = saved_block(store, usage_key, job_id)
+    block.run_import_job(job_id, ProgressReporter(job_id))
+    latest = store.get_item(usage_key)
+    if latest.import_job_id != job_id:
+        raise ImportJobError('A later upload replaced this one')
+    latest.merge_imported_package(block)
+    store.update_item(latest, user_id)
+
+
+def _modulestore():
+    from xmodule.modulestore.django import modulestore
+    return modulestore()
+
+
+def run_import(job_id, usage_id, user_id, attempt=0, retry=None):
+    """
+    run an import job in the modulestore.  While the block isn't saved with the
+    job yet, `retry(delay)` is called to run the job again after `delay` seconds
+    """
+    from opaque_keys.edx.keys import UsageKey
+
+    try:
+        import_package(_modulestore(), UsageKey.from_string(usage_id), job_id, user_id)
+    except BlockNotSaved as e:
+        if retry is not None and attempt < SAVE_RETRIES:
+            retry(SAVE_RETRY_DELAY)
+            return
+        logger.warning('SCORM XBlock package import job {} for {} gave up: {}'.format(job_id, usage_id, e))
+        set_status(job_id, FAILED, error=unicode(e))
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception('SCORM XBlock package import job {} for {} failed'.format(job_id, usage_id))
+        set_status(job_id, FAILED, error=unicode(e))
+    else:
+        set_status(job_id, SUCCEEDED)
+
+
+def _run_in_thread(job_id, usage_id, user_id, attempt=0):
+    def retry(delay):
+        # the pool thread is free while the job waits
+        timer = threading.Timer(delay, _thread_pool().apply_async,
+                                (_run_in_thread, (job_id, usage_id, user_id, attempt + 1)))
+        timer.daemon = True
+        timer.start()
+    run_import(job_id, usage_id, user_id, attempt, retry)
+
+
+def _thread_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPool(IMPORT_THREADS)
+        return _pool
+
+
+def enqueue(executor, job_id, usage_id, user_id, queue=None):
+    """
+    start an import job with the given executor
+    """
+    set_status(job_id, PENDING)
+    if executor == CELERY:
+        from tasks import import_package
+        options = {'routing_key': queue} if queue else {}
+        import_package.apply_async(args=(job_id, usage_id, user_id), **options)
+    else:
+        _thread_pool().apply_async(_run_in_thread, (job_id, usage_id, user_id))
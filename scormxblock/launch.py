@@ -0,0 +1,43 @@
+"""
+Cached launch context for student_view
+
+Everything `student_view` needs to launch a package which doesn't depend on
+the learner (the player URL, the parsed player configuration, the handler
+URLs and the iframe data attributes, already escaped) is built once and kept
+per (site domain, block, launch version, authoring).  The launch version is a
+block setting bumped whenever Studio changes the block or imports a package,
+so the LMS picks up a change as soon as the block is published.  Platform or
+Site setting changes (e.g. SCORM_PLAYER_BACKENDS) are picked up after
+SCORM_LAUNCH_CONTEXT_CACHE_TTL seconds.
+"""
+import cgi
+
+from ttlcache import TTLCache
+
+
+DEFAULT_LAUNCH_CONTEXT_CACHE_TTL = 300  # seconds
+LAUNCH_CONTEXT_CACHE_SIZE = 1024
+
+
+def data_attrs(attrs):
+    """
+    render (name, value) pairs as escaped HTML data attributes
+    """
+    return u' '.join(u'data-{}="{}"'.format(name, cgi.escape(unicode(value), quote=True)) for name, value in attrs)
+
+
+class LaunchContextCache(TTLCache):
+    """
+    process-wide cache of launch contexts with a TTL, cleared whenever it grows past `size` entries
+    """
+    def __init__(self, size=LAUNCH_CONTEXT_CACHE_SIZE):
+        super(LaunchContextCache, self).__init__(size)
+
+    def invalidate(self, usage_id=None):
+        """
+        drop cached launch contexts of one block, or all of them
+        """
+        super(LaunchContextCache, self).invalidate(None if usage_id is None else lambda key: key[1] == usage_id)
+
+
+launch_contexts = LaunchContextCache()
@@ -0,0 +1,90 @@
+"""
+Delete stored packages of SCORM blocks which no longer exist
+
+    ./manage.py cms delete_orphaned_scorm_packages --dry-run
+    ./manage.py cms delete_orphaned_scorm_packages --workers 8 --rate 2000 --checkpoint /tmp/orphans.json
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from scormxblock import importer, jobs, orphans, storage as scorm_storage
+from scormxblock.scormxblock import SHARED_STORAGE_DIRNAME
+
+
+class Command(BaseCommand):
+    help = 'Find package directories no SCORM block in the modulestore uses, report their size and delete them.'
+
+    def add_arguments(self, parser):
+        xblock_settings = getattr(settings, 'XBLOCK_SETTINGS', {}).get('ScormXBlock', {})
+        parser.add_argument('--storage-type',
+                            default=xblock_settings.get('SCORM_FILE_STORAGE_TYPE', scorm_storage.DEFAULT_STORAGE_TYPE),
+                            help='storage class path, defaults to SCORM_FILE_STORAGE_TYPE')
+        parser.add_argument('--storage-dir', default=xblock_settings.get('SCORM_PKG_STORAGE_DIR', 'scorms'),
+                            help='package storage directory, defaults to SCORM_PKG_STORAGE_DIR')
+        parser.add_argument('--workers', type=int, default=orphans.DEFAULT_WORKERS)
+        parser.add_argument('--batch-size', type=int, default=orphans.DELETE_BATCH_SIZE,
+                            help='files per delete request')
+        parser.add_argument('--rate', type=int, help='maximum files deleted per second')
+        parser.add_argument('--checkpoint', help='file recording progress, to resume an interrupted run')
+        parser.add_argument('--shared-min-age', type=int, default=importer.SHARED_BLOB_MIN_AGE // 3600,
+                            help='hours after which an unreferenced shared blob may be deleted')
+        parser.add_argument('--skip-shared', action='store_true', default=False,
+                            help='leave the shared content store (SCORM_PKG_SHARED_STORAGE) alone')
+        parser.add_argument('--uploads-max-age', type=int, default=jobs.UPLOAD_MAX_AGE // 3600,
+                            help='hours after which a background import upload left by a job which never '
+                                 'finished is deleted')
+        parser.add_argument('--dry-run', action='store_true', default=False,
+                            help='report orphaned packages and their size without deleting them')
+
+    def handle(self, *args, **options):
+        storage = scorm_storage.get_storage(options['storage_type'])
+        storage_dir = options['storage_dir']
+        # list stored packages before loading live blocks, so a block created meanwhile is kept
+        dirnames = orphans.package_dirs(storage, storage_dir, keep=(SHARED_STORAGE_DIRNAME, jobs.UPLOADS_DIRNAME))
+        live_dirs = orphans.live_package_dirs(storage_dir)
+        if dirnames and not live_dirs:
+            raise CommandError('No SCORM blocks found in the modulestore; refusing to treat every package as orphaned')
+
+        count = total = 0
+        for result in orphans.sweep(
+                storage,
+                storage_dir,
+                live_dirs,
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                rate=options['rate'],
+                dry_run=options['dry_run'],
+                checkpoint_path=options['checkpoint'],
+                dirnames=dirnames):
+            count += 1
+            total += result['bytes']
+            self.stdout.write('{dirname}: {files} files, {bytes} bytes'.format(**result))
+        self.stdout.write('{} orphaned packages, {} bytes {}'.format(
+            count, total, 'reclaimable' if options['dry_run'] else 'deleted'))
+
+        shared_dir = u'{}/{}'.format(storage_dir, SHARED_STORAGE_DIRNAME)
+        if not options['skip_shared'] and SHARED_STORAGE_DIRNAME in orphans.package_dirs(storage, storage_dir):
+            # blobs only referenced by orphaned packages go too, even in a dry run
+            result = orphans.sweep_shared_blobs(
+                storage,
+                storage_dir,
+                shared_dir,
+                exclude=set(dirnames) - live_dirs,
+                min_age=options['shared_min_age'] * 3600,
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                rate=options['rate'],
+                dry_run=options['dry_run'])
+            self.stdout.write('{files} unreferenced shared blobs, {bytes} bytes {action}'.format(
+                action='reclaimable' if options['dry_run'] else 'deleted', **result))
+
+        result = orphans.sweep_stale_uploads(
+            storage,
+            storage_dir,
+            max_age=options['uploads_max_age'] * 3600,
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            rate=options['rate'],
+            dry_run=options['dry_run'])
+        self.stdout.write('{files} stale import uploads, {bytes} bytes {action}'.format(
+            action='reclaimable' if options['dry_run'] else 'deleted', **result))
@@ -0,0 +1,55 @@
+"""
+Export learner SCORM status and scores for a course as CSV or JSON lines
+
+    ./manage.py lms export_scorm_status course-v1:Org+Course+Run --format csv --output scorm.csv
+"""
+import sys
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+
+from scormxblock import export
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise CommandError('Dates must be given as YYYY-MM-DD, got {}'.format(value))
+
+
+class Command(BaseCommand):
+    help = 'Stream lesson status, score, per-SCO scores and time of every learner in every SCORM block of a course.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id')
+        parser.add_argument('--block', action='append', dest='blocks', default=[],
+                            help='usage key of a SCORM block to export; may be repeated')
+        parser.add_argument('--since', help='only learners whose state changed on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--until', help='only learners whose state changed before this date (YYYY-MM-DD)')
+        parser.add_argument('--format', choices=sorted(export.WRITERS), default='csv')
+        parser.add_argument('--output', help='file to write to instead of stdout')
+        parser.add_argument('--batch-size', type=int, default=export.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            course_key = CourseKey.from_string(options['course_id'])
+            block_keys = [UsageKey.from_string(block) for block in options['blocks']]
+        except InvalidKeyError as e:
+            raise CommandError('Invalid key: {}'.format(e))
+
+        rows = export.status_rows(
+            course_key,
+            block_keys=block_keys,
+            since=_date(options['since']) if options['since'] else None,
+            until=_date(options['until']) if options['until'] else None,
+            batch_size=options['batch_size'],
+        )
+        out = open(options['output'], 'wb') if options['output'] else sys.stdout
+        try:
+            export.WRITERS[options['format']](rows, out)
+        finally:
+            if out is not sys.stdout:
+                out.close()
@@ -0,0 +1,55 @@
+"""
+Recompute SCORM grades of a course from stored learner state
+
+    ./manage.py lms recompute_scorm_grades course-v1:Org+Course+Run --policy weighted --dry-run
+    ./manage.py lms recompute_scorm_grades course-v1:Org+Course+Run --policy weighted --checkpoint /tmp/regrade.json
+"""
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+
+from scormxblock import export, regrade, rollup
+
+
+class Command(BaseCommand):
+    help = 'Roll up lesson scores again from stored SCO data and republish grades that changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id')
+        parser.add_argument('--block', action='append', dest='blocks', default=[],
+                            help='usage key of a SCORM block to regrade; may be repeated, defaults to all')
+        parser.add_argument('--policy', choices=rollup.POLICIES,
+                            help='score rollup policy to use instead of SCORM_SCORE_ROLLUP')
+        parser.add_argument('--workers', type=int, default=regrade.DEFAULT_WORKERS)
+        parser.add_argument('--batch-size', type=int, default=export.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--checkpoint', help='file recording progress, to resume an interrupted run')
+        parser.add_argument('--dry-run', action='store_true', default=False,
+                            help='report grades which would change without publishing them')
+
+    def handle(self, *args, **options):
+        from xmodule.modulestore.django import modulestore
+
+        try:
+            course_key = CourseKey.from_string(options['course_id'])
+            block_keys = [UsageKey.from_string(block) for block in options['blocks']]
+        except InvalidKeyError as e:
+            raise CommandError('Invalid key: {}'.format(e))
+
+        store = modulestore()
+        if block_keys:
+            blocks = [store.get_item(block_key) for block_key in block_keys]
+        else:
+            blocks = store.get_items(course_key, qualifiers={'category': export.SCORM_MODULE_TYPE})
+
+        changed = 0
+        for result in regrade.regrade(
+                course_key,
+                blocks,
+                policy=options['policy'],
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+                checkpoint_path=options['checkpoint']):
+            changed += 1
+            self.stdout.write('{block_id} {username}: {old_grade}/{old_max_grade} -> {grade}/{max_grade}'.format(**result))
+        self.stdout.write('{} grades {}'.format(changed, 'would change' if options['dry_run'] else 'republished'))
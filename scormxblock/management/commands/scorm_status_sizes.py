@@ -0,0 +1,44 @@
+"""
+Report the storage used by learner SCORM status in a course, and what compressing it saves
+
+    ./manage.py lms scorm_status_sizes course-v1:Org+Course+Run
+"""
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+
+from scormxblock import export, state
+
+
+class Command(BaseCommand):
+    help = 'Report stored, uncompressed and compressed sizes of raw SCORM status for a course.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id')
+        parser.add_argument('--block', action='append', dest='blocks', default=[],
+                            help='usage key of a SCORM block to report on; may be repeated')
+        parser.add_argument('--batch-size', type=int, default=export.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            course_key = CourseKey.from_string(options['course_id'])
+            block_keys = [UsageKey.from_string(block) for block in options['blocks']]
+        except InvalidKeyError as e:
+            raise CommandError('Invalid key: {}'.format(e))
+
+        rows = compressed_rows = stored_size = json_size = compressed_size = 0
+        for module in export.iter_student_modules(course_key, block_keys=block_keys,
+                                                  batch_size=options['batch_size']):
+            raw = export.module_fields(module).get('raw_scorm_status') or ''
+            stored, plain, compressed = state.sizes(raw)
+            rows += 1
+            compressed_rows += state.is_compressed(raw)
+            stored_size += stored
+            json_size += plain
+            compressed_size += compressed
+
+        self.stdout.write('learner states: {} ({} compressed)'.format(rows, compressed_rows))
+        self.stdout.write('stored: {} bytes'.format(stored_size))
+        self.stdout.write('uncompressed: {} bytes'.format(json_size))
+        self.stdout.write('all compressed: {} bytes ({:.0%} of uncompressed)'.format(
+            compressed_size, float(compressed_size) / json_size if json_size else 1))
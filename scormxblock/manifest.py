@@ -0,0 +1,210 @@
+"""
+imsmanifest.xml parsing
+
+The manifest is parsed once when a package is imported, into a compact
+index stored on the block:
+
+    {
+        "scorm_version": "1.2",
+        "launch": "shared/launchpage.html",
+        "scos": [
+            {"id": "item_1", "title": "Lesson 1", "href": "shared/launchpage.html?content=1",
+             "mastery_score": 80.0, "weight": 1.0},
+            ...
+        ],
+        "asset_count": 120,
+        "asset_size": 1048576
+    }
+"""
+import posixpath
+from collections import OrderedDict
+from xml.etree import cElementTree as ElementTree
+
+
+SCORM_12 = '1.2'
+SCORM_2004 = '2004'
+XML_BASE = '{http://www.w3.org/XML/1998/namespace}base'
+
+
+class ManifestError(Exception):
+    pass
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, basestring) else tag
+
+
+def _attr(element, name, default=None):
+    """
+    return an attribute by local name, whatever namespace prefix the package used
+    """
+    for key, value in element.attrib.items():
+        if _local(key).lower() == name.lower():
+            return value
+    return default
+
+
+def _child(element, name):
+    for child in element:
+        if _local(child.tag) == name:
+            return child
+    return None
+
+
+def _children(element, name):
+    return [child for child in element if _local(child.tag) == name]
+
+
+def _find_path(element, *names):
+    for name in names:
+        if element is None:
+            return None
+        element = _child(element, name)
+    return element
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _scorm_version(root):
+    schema_version = _find_path(root, 'metadata', 'schemaversion')
+    text = (schema_version.text or '').strip() if schema_version is not None else ''
+    if text == '1.2':
+        return SCORM_12
+    if '2004' in text or 'CAM 1.3' in text:
+        return SCORM_2004
+    # fall back on the adlcp namespace declared by the package
+    for element in root.iter():
+        for key in element.attrib:
+            if 'adlcp_rootv1p2' in key:
+                return SCORM_12
+            if 'adlcp_v1p3' in key:
+                return SCORM_2004
+    return SCORM_12
+
+
+def _join_base(*parts):
+    path = ''
+    for part in parts:
+        if part:
+            path = posixpath.join(path, part)
+    return path
+
+
+def _resources(root):
+    """
+    return the resources of a manifest by identifier, in document order
+    """
+    resources = OrderedDict()
+    resources_el = _child(root, 'resources')
+    if resources_el is None:
+        return resources
+    base = _attr(resources_el, 'base', resources_el.get(XML_BASE))
+    for resource in _children(resources_el, 'resource'):
+        href = resource.get('href')
+        resources[resource.get('identifier')] = {
+            'href': _join_base(base, resource.get(XML_BASE), href) if href else None,
+            'sco': (_attr(resource, 'scormtype') or '').lower() == 'sco',
+        }
+    return resources
+
+
+def _mastery_score(item):
+    # SCORM 1.2
+    mastery = _child(item, 'masteryscore')
+    if mastery is not None:
+        return _float(mastery.text)
+    # SCORM 2004: primary objective satisfied by a normalized measure
+    objective = _find_path(item, 'sequencing', 'objectives', 'primaryObjective')
+    if objective is not None and (objective.get('satisfiedByMeasure') or '').lower() == 'true':
+        measure = _child(objective, 'minNormalizedMeasure')
+        value = _float(measure.text) if measure is not None else None
+        return value * 100 if value is not None else None
+    return None
+
+
+def _weight(item):
+    rollup = _find_path(item, 'sequencing', 'rollupRules')
+    weight = _float(rollup.get('objectiveMeasureWeight')) if rollup is not None else None
+    return weight if weight is not None else 1.0
+
+
+def _items(element):
+    for item in _children(element, 'item'):
+        yield item
+        for child in _items(item):
+            yield child
+
+
+def _default_organization(root):
+    organizations = _child(root, 'organizations')
+    if organizations is None:
+        return None
+    orgs = _children(organizations, 'organization')
+    default = organizations.get('default')
+    for org in orgs:
+        if org.get('identifier') == default:
+            return org
+    return orgs[0] if orgs else None
+
+
+def parse_manifest(xml):
+    """
+    return the compact package index for an imsmanifest.xml document,
+    without asset statistics
+    """
+    try:
+        root = ElementTree.fromstring(xml)
+    except SyntaxError as e:  # ParseError is a SyntaxError subclass
+        raise ManifestError('imsmanifest.xml is not valid XML: {}'.format(e))
+    if _local(root.tag) != 'manifest':
+        raise ManifestError('imsmanifest.xml has no <manifest> root element')
+
+    resources = _resources(root)
+    scos = []
+    organization = _default_organization(root)
+    for item in (_items(organization) if organization is not None else []):
+        resource = resources.get(item.get('identifierref'))
+        if resource is None or not resource['href']:
+            continue
+        title = _child(item, 'title')
+        scos.append({
+            'id': item.get('identifier'),
+            'title': (title.text or '').strip() if title is not None else '',
+            'href': resource['href'] + (item.get('parameters') or ''),
+            'sco': resource['sco'],
+            'mastery_score': _mastery_score(item),
+            'weight': _weight(item),
+        })
+
+    # assets only count towards launch and rollup when they communicate with the LMS
+    sco_items = [sco for sco in scos if sco['sco']] or scos
+    for sco in sco_items:
+        del sco['sco']
+
+    if sco_items:
+        launch = sco_items[0]['href']
+    else:
+        # no organization to launch from: the first resource the manifest lists
+        hrefs = [resource['href'] for resource in resources.values() if resource['href']]
+        launch = hrefs[0] if hrefs else None
+
+    return {
+        'scorm_version': _scorm_version(root),
+        'launch': launch,
+        'scos': sco_items,
+    }
+
+
+def asset_stats(files):
+    """
+    return asset statistics for the index from a {name: {'size': ...}} file manifest
+    """
+    return {
+        'asset_count': len(files),
+        'asset_size': sum(entry['size'] for entry in files.values()),
+    }
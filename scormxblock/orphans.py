@@ -0,0 +1,236 @@
+"""
+Garbage collection of orphaned package files
+
+Packages are stored under SCORM_PKG_STORAGE_DIR/<block_id>.  When a block is
+deleted, or a re-upload fails partway, its directory stays behind.  Package
+directories are listed first and then compared with the directories used by
+all SCORM blocks in the modulestore, draft or published, so a block created
+while the sweep runs is never collected.  A block uses its own directory and
+the one its `scorm_file` (and so its `package_versions`) points into.  Those
+differ for duplicated blocks and library content used in a course, which
+keep pointing at the directory of the block they were copied from; course
+re-runs keep block ids and share their source's directory either way.
+
+Orphaned directories are processed in sorted order.  Their files are deleted
+in batches (one multi-object delete each on S3) on a pool of worker threads,
+optionally rate limited.  The last directory fully deleted is written to an
+optional checkpoint file, so an interrupted sweep can be resumed.
+
+Blobs of the shared content store which no package's file manifest refers to
+are deleted afterwards, see importer.unreferenced_blobs, and so are background
+import uploads left by jobs which never finished, see jobs.stale_uploads.
+"""
+import logging
+import time
+import urllib
+import urlparse
+from multiprocessing.pool import ThreadPool
+
+from batching import groups, load_checkpoint, save_checkpoint
+import export
+import importer
+import jobs
+import storage as scorm_storage
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DELETE_BATCH_SIZE = scorm_storage.S3_DELETE_BATCH_SIZE
+
+
+def referenced_dir(scorm_file, storage_dir):
+    """
+    return the package directory under `storage_dir` which a `scorm_file`
+    storage URL points into, or None
+    """
+    if not scorm_file:
+        return None
+    parts = [part for part in urllib.unquote(urlparse.urlparse(scorm_file).path).split('/') if part]
+    prefix = [part for part in storage_dir.split('/') if part]
+    for i in range(len(parts) - len(prefix)):
+        if parts[i:i + len(prefix)] == prefix:
+            return parts[i + len(prefix)]
+    return None
+
+
+def block_package_dirs(block, storage_dir):
+    """
+    return the package directories used by a SCORM block
+    """
+    dirs = set([block.location.block_id])
+    referenced = referenced_dir(block.scorm_file, storage_dir)
+    if referenced is not None:
+        dirs.add(referenced)
+    return dirs
+
+
+def live_package_dirs(storage_dir, store=None):
+    """
+    return the package directories used by SCORM blocks in courses and libraries, drafts included.
+    blocks deleted in Studio but still published are live too, learners still see them
+    """
+    from xmodule.modulestore import ModuleStoreEnum
+    if store is None:
+        from xmodule.modulestore.django import modulestore
+        store = modulestore()
+
+    dirs = set()
+    for branch in (ModuleStoreEnum.Branch.draft_preferred, ModuleStoreEnum.Branch.published_only):
+        with store.branch_setting(branch):
+            keys = [course.id for course in store.get_courses()]
+            if hasattr(store, 'get_libraries'):
+                keys += [library.location.library_key for library in store.get_libraries()]
+            for key in keys:
+                for block in store.get_items(key, qualifiers={'category': export.SCORM_MODULE_TYPE}):
+                    dirs.update(block_package_dirs(block, storage_dir))
+    return dirs
+
+
+def package_dirs(storage, storage_dir, keep=()):
+    """
+    return the sorted names of the package directories under `storage_dir`,
+    leaving out the directories in `keep`
+    """
+    try:
+        dirs = storage.list_dirs(storage_dir)
+    except OSError:  # nothing was ever stored
+        return []
+    return sorted(name for name in dirs if name not in keep)
+
+
+class RateLimiter(object):
+    """
+    sleep as needed to keep under `rate` objects per second; no limit when `rate` is falsy
+    """
+    def __init__(self, rate=None):
+        self.rate = rate
+        self.count = 0
+        self.start = time.time()
+
+    def __call__(self, count):
+        if not self.rate:
+            return
+        self.count += count
+        delay = self.count / float(self.rate) - (time.time() - self.start)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _delete_batches(storage, storage_dir, orphans, batch_size, results):
+    """
+    yield (dirname, names, last) batches of the files of each orphaned directory,
+    adding up their counts and sizes in `results`
+    """
+    for dirname in orphans:
+        result = results[dirname] = {'dirname': dirname, 'files': 0, 'bytes': 0}
+        names = []
+        for name, size in storage.list_prefix_sizes(u'{}/{}'.format(storage_dir, dirname)):
+            names.append(name)
+            result['files'] += 1
+            result['bytes'] += size
+            if len(names) >= batch_size:
+                yield dirname, names, False
+                names = []
+        yield dirname, names, True
+
+
+def _delete_batch(args):
+    storage, names = args
+    storage.delete_many(names)
+
+
+def sweep(storage, storage_dir, live_dirs, keep=(), workers=DEFAULT_WORKERS, batch_size=DELETE_BATCH_SIZE,
+          rate=None, dry_run=False, checkpoint_path=None, dirnames=None):
+    """
+    delete the package directories under `storage_dir` not in `live_dirs`,
+    yielding {'dirname', 'files', 'bytes'} for each one as it's done (or would be).
+    `dirnames` are the package directories, listed before `live_dirs` were loaded
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    done = checkpoint.get(storage_dir, '')
+    if dirnames is None:
+        dirnames = package_dirs(storage, storage_dir, keep)
+    orphans = [name for name in dirnames if name not in live_dirs and name > done]
+
+    results = {}
+    batches = _delete_batches(storage, storage_dir, orphans, batch_size, results)
+    if dry_run:
+        for dirname, names, last in batches:
+            if last:
+                yield results.pop(dirname)
+        return
+
+    limit = RateLimiter(rate)
+    pool = ThreadPool(workers)
+    try:
+        # one batch per worker at a time keeps memory flat; batches are finished
+        # in order, so the checkpoint never skips an unfinished directory
+        for group in groups(batches, workers):
+            limit(sum(len(names) for dirname, names, last in group))
+            pool.map(_delete_batch, [(storage, names) for dirname, names, last in group])
+            for dirname, names, last in group:
+                if not last:
+                    continue
+                # removes directories left empty on a file system
+                storage.delete_prefix(u'{}/{}'.format(storage_dir, dirname))
+                if checkpoint_path:
+                    checkpoint[storage_dir] = dirname
+                    save_checkpoint(checkpoint_path, checkpoint)
+                yield results.pop(dirname)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _delete_files(storage, files, workers=DEFAULT_WORKERS, batch_size=DELETE_BATCH_SIZE, rate=None,
+                  dry_run=False):
+    """
+    delete the (name, size) `files` in batches, return {'files', 'bytes'} deleted (or which would be)
+    """
+    result = {'files': 0, 'bytes': 0}
+
+    def batches():
+        names = []
+        for name, size in files:
+            names.append(name)
+            result['files'] += 1
+            result['bytes'] += size
+            if len(names) >= batch_size:
+                yield names
+                names = []
+        if names:
+            yield names
+
+    if dry_run:
+        for names in batches():
+            pass
+        return result
+
+    limit = RateLimiter(rate)
+    pool = ThreadPool(workers)
+    try:
+        for group in groups(batches(), workers):
+            limit(sum(len(names) for names in group))
+            pool.map(_delete_batch, [(storage, names) for names in group])
+    finally:
+        pool.close()
+        pool.join()
+    return result
+
+
+def sweep_shared_blobs(storage, storage_dir, shared_dir, exclude=(), min_age=importer.SHARED_BLOB_MIN_AGE, **kwargs):
+    """
+    delete the blobs of the shared content store which no package refers to any more,
+    see importer.unreferenced_blobs; return {'files', 'bytes'} deleted (or which would be)
+    """
+    return _delete_files(storage, importer.unreferenced_blobs(storage, storage_dir, shared_dir, exclude, min_age),
+                         **kwargs)
+
+
+def sweep_stale_uploads(storage, storage_dir, max_age=jobs.UPLOAD_MAX_AGE, **kwargs):
+    """
+    delete the background import uploads of jobs which never finished, see
+    jobs.stale_uploads; return {'files', 'bytes'} deleted (or which would be)
+    """
+    return _delete_files(storage, jobs.stale_uploads(storage, storage_dir, max_age), **kwargs)
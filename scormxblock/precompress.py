@@ -0,0 +1,110 @@
+"""
+Precompressed variants of package files
+
+Compressible package members (HTML, JS, CSS, XML, ...) can be stored next to
+the original with gzip and, when the optional `brotli` module is installed,
+brotli variants (`<name>.gz`, `<name>.br`), so they never have to be
+compressed on the fly.  Variants are recorded in the package file manifest,
+where the package_asset handler picks the best one for the request.
+"""
+import gzip
+import io
+import logging
+import posixpath
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+GZIP = 'gzip'
+BROTLI = 'br'
+# best first
+ENCODINGS = (BROTLI, GZIP)
+SUFFIXES = {GZIP: '.gz', BROTLI: '.br'}
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_MAX_RATIO = 0.9
+COMPRESSIBLE_EXTENSIONS = frozenset([
+    '.htm', '.html', '.xhtml', '.js', '.mjs', '.json', '.css', '.xml', '.xsd', '.dtd',
+    '.svg', '.txt', '.csv', '.vtt', '.srt', '.ttf', '.otf', '.eot', '.ico', '.wasm',
+])
+
+
+def _gzip(data):
+    out = io.BytesIO()
+    # no file name or timestamp, so identical content gives identical variants
+    gz = gzip.GzipFile(filename='', mode='wb', fileobj=out, compresslevel=9, mtime=0)
+    try:
+        gz.write(data)
+    finally:
+        gz.close()
+    return out.getvalue()
+
+
+def _brotli(data):
+    return brotli.compress(data)
+
+
+COMPRESSORS = {GZIP: _gzip, BROTLI: _brotli}
+
+
+def variant_name(name, encoding):
+    return name + SUFFIXES[encoding]
+
+
+class Precompressor(object):
+    """
+    decides which members get variants and produces them.  a variant is kept
+    only for members of at least `min_size` bytes compressing to at most
+    `max_ratio` of their size
+    """
+    def __init__(self, encodings, min_size=DEFAULT_MIN_SIZE, max_ratio=DEFAULT_MAX_RATIO):
+        self.encodings = []
+        for encoding in encodings:
+            if encoding not in COMPRESSORS:
+                logger.warn('SCORM XBlock ignoring unknown precompression encoding {}'.format(encoding))
+            elif encoding == BROTLI and brotli is None:
+                logger.warn('SCORM XBlock brotli precompression needs the brotli package')
+            elif encoding not in self.encodings:
+                self.encodings.append(encoding)
+        self.min_size = min_size
+        self.max_ratio = max_ratio
+
+    def __nonzero__(self):
+        return bool(self.encodings)
+
+    def to_dict(self):
+        """
+        the settings variants were made with, recorded in the file manifest
+        """
+        return {'encodings': sorted(self.encodings), 'min_size': self.min_size, 'max_ratio': self.max_ratio}
+
+    def wants(self, name, size, members):
+        """
+        True if member `name` should get variants; `members` are all member names,
+        a member whose variant name is taken by another member gets none
+        """
+        if size < self.min_size:
+            return False
+        if posixpath.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return False
+        return not any(variant_name(name, encoding) in members for encoding in self.encodings)
+
+    def compress(self, data):
+        """
+        return {encoding: compressed data} for the variants worth keeping
+        """
+        variants = {}
+        for encoding in self.encodings:
+            try:
+                compressed = COMPRESSORS[encoding](data)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warn('SCORM XBlock could not {} compress a package file: {}'.format(encoding, e))
+                continue
+            if len(compressed) <= len(data) * self.max_ratio:
+                variants[encoding] = compressed
+        return variants
@@ -0,0 +1,186 @@
+"""
+Batch recompute of SCORM grades from stored learner state
+
+Lesson scores are rolled up again from the per-SCO CMI data kept in each
+learner's `raw_scorm_status`, e.g. after changing SCORM_SCORE_ROLLUP or
+fixing a package's rollup weights.  StudentModule rows are processed in
+id-ordered batches on a pool of worker threads; the last row id finished
+for each block is written to an optional checkpoint file so an interrupted
+run can be resumed.
+"""
+import json
+import logging
+import time
+from multiprocessing.pool import ThreadPool
+
+from batching import groups, load_checkpoint, save_checkpoint
+from state import ScormState
+import export
+import rollup
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+MAX_SCORE = 100
+# published grades closer than this are considered unchanged
+GRADE_TOLERANCE = 1e-6
+
+
+def _score_published():
+    try:
+        from lms.djangoapps.grades.signals.signals import SCORE_PUBLISHED
+    except ImportError:
+        from grades.signals.signals import SCORE_PUBLISHED
+    return SCORE_PUBLISHED
+
+
+class BlockGrading(object):
+    """
+    what is needed to grade learners of one SCORM block, read once from the block
+    """
+    def __init__(self, block, policy=None):
+        self.block = block
+        self.usage_key = block.location
+        self.weight = block.weight
+        self.policy_configured = policy or block.score_rollup_policy
+        self.policy = self.policy_configured or rollup.AVERAGE
+        self.weights = dict((sco['id'], sco.get('weight', 1.0)) for sco in block.package_index.get('scos', []))
+
+    def grade(self, fields):
+        """
+        return (lesson score, rollup, grade value, max grade value) for a learner's
+        state fields; the grade values are None if the learner has no score
+        """
+        status = ScormState(fields.get('raw_scorm_status', '{}'))
+        engine = rollup.ScoreRollup(None, self.policy, self.weights)
+        engine.update_all(dict(
+            (sco_id, rollup.sco_score(status.sco_data(sco_id))) for sco_id in status.scos))
+        score = rollup.choose_score(status.get('score'), engine, self.policy_configured)
+        if score == '' or score is None:
+            return engine.score, engine, None, None
+        return rollup.lesson_score(score, engine), engine, (float(score) / MAX_SCORE) * self.weight, self.weight
+
+
+def _changed(module, value, max_value):
+    if value is None:
+        return False
+    if module.grade is None or module.max_grade is None:
+        return True
+    return (abs(module.grade - value) > GRADE_TOLERANCE or
+            abs(module.max_grade - max_value) > GRADE_TOLERANCE)
+
+
+def _regraded(module, grading):
+    """
+    return (result dict, updated state fields) if a learner's grade changed, else (None, None)
+    """
+    fields = export.module_fields(module)
+    lesson_score, engine, value, max_value = grading.grade(fields)
+    if not _changed(module, value, max_value):
+        return None, None
+    result = {
+        'username': module.student.username,
+        'block_id': unicode(grading.usage_key),
+        'old_grade': module.grade,
+        'old_max_grade': module.max_grade,
+        'grade': value,
+        'max_grade': max_value,
+    }
+    fields.update({
+        'lesson_score': lesson_score,
+        'score_rollup': engine.to_dict(),
+        'published_grade_value': value,
+        'published_grade_max': max_value,
+        'published_grade_time': time.time(),
+        # superseded by the grade published here
+        'held_grade_score': None,
+    })
+    return result, fields
+
+
+def regrade_module(module, grading, dry_run=False):
+    """
+    recompute one learner's grade; return a result dict if it changed, else None
+    """
+    result, fields = _regraded(module, grading)
+    if result is None or dry_run:
+        return result
+
+    from django.db import transaction
+    from courseware.models import StudentModule
+
+    # the learner may be saving meanwhile: grade again from the locked row, so a
+    # commit made since the batch was read is neither overwritten nor graded stale
+    with transaction.atomic():
+        try:
+            locked = StudentModule.objects.select_for_update().get(id=module.id)
+        except StudentModule.DoesNotExist:
+            return None
+        locked.student = module.student
+        result, fields = _regraded(locked, grading)
+        if result is None:
+            return None
+        # only touch the state column, the grade columns are written by the grades app
+        StudentModule.objects.filter(id=module.id).update(state=json.dumps(fields))
+
+    _score_published().send(
+        sender=None,
+        block=grading.block,
+        user=module.student,
+        raw_earned=result['grade'],
+        raw_possible=result['max_grade'],
+        only_if_higher=False,
+        score_deleted=False,
+    )
+    return result
+
+
+def _regrade_batch(args):
+    batch, grading, dry_run = args
+    from django.db import connection
+
+    results = []
+    try:
+        for module in batch:
+            try:
+                result = regrade_module(module, grading, dry_run)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Failed to regrade SCORM state {} of {}'.format(module.id, grading.usage_key))
+                continue
+            if result:
+                results.append(result)
+    finally:
+        # worker threads each hold their own database connection
+        connection.close()
+    return batch[-1].id, results
+
+
+def regrade(course_key, blocks, policy=None, workers=DEFAULT_WORKERS,
+            batch_size=export.DEFAULT_BATCH_SIZE, dry_run=False, checkpoint_path=None):
+    """
+    recompute grades of all learners in the given SCORM blocks, yielding a
+    result dict for every learner whose grade changed (or would change)
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    pool = ThreadPool(workers)
+    try:
+        for block in blocks:
+            grading = BlockGrading(block, policy)
+            block_id = unicode(grading.usage_key)
+            modules = export.iter_student_modules(
+                course_key, block_keys=[grading.usage_key], batch_size=batch_size,
+                after_id=checkpoint.get(block_id, 0))
+            # one batch per worker at a time keeps memory flat; results come back in
+            # batch order, so the checkpoint never skips an unfinished batch
+            for batches in groups(groups(modules, batch_size), workers):
+                tasks = [(batch, grading, dry_run) for batch in batches]
+                for last_id, results in pool.map(_regrade_batch, tasks):
+                    for result in results:
+                        yield result
+                    if checkpoint_path and not dry_run:
+                        checkpoint[block_id] = last_id
+                        save_checkpoint(checkpoint_path, checkpoint)
+    finally:
+        pool.close()
+        pool.join()
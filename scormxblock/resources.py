@@ -0,0 +1,86 @@
+"""
+Process-wide cache of static resources and compiled Mako templates
+shipped with the SCORM XBlock package
+"""
+import logging
+import threading
+
+import pkg_resources
+from mako.template import Template as MakoTemplate
+
+
+logger = logging.getLogger(__name__)
+
+DISTRIBUTION_NAME = 'scormxblock-xblock'
+
+_resource_cache = {}
+_template_cache = {}
+_cache_lock = threading.Lock()
+
+
+def package_version():
+    """
+    return the installed version of this package, used to key cached
+    resources so that an upgrade never serves stale templates
+    """
+    # plain dict lookup on the working set; cheap enough to do per render
+    dist = pkg_resources.working_set.by_key.get(DISTRIBUTION_NAME)
+    return dist.version if dist is not None else None
+
+
+def _cache_key(path):
+    return (package_version(), path)
+
+
+def _load_resource(path):
+    data = pkg_resources.resource_string(__name__, path)
+    return data.decode("utf8")
+
+
+def resource_string(path, use_cache=True):
+    """
+    return the decoded contents of a resource in our kit,
+    read once per process unless `use_cache` is False
+    """
+    if not use_cache:
+        return _load_resource(path)
+    key = _cache_key(path)
+    try:
+        return _resource_cache[key]
+    except KeyError:
+        pass
+    data = _load_resource(path)
+    with _cache_lock:
+        _resource_cache.setdefault(key, data)
+    return data
+
+
+def get_template(path, use_cache=True):
+    """
+    return a compiled Mako template for a resource in our kit,
+    compiled once per process unless `use_cache` is False
+    """
+    if not use_cache:
+        return MakoTemplate(text=_load_resource(path))
+    key = _cache_key(path)
+    try:
+        return _template_cache[key]
+    except KeyError:
+        pass
+    template = MakoTemplate(text=resource_string(path))
+    with _cache_lock:
+        template = _template_cache.setdefault(key, template)
+    return template
+
+
+def render_template(path, use_cache=True, **context):
+    return get_template(path, use_cache=use_cache).render_unicode(**context)
+
+
+def clear_cache():
+    """
+    drop all cached resources and templates
+    """
+    with _cache_lock:
+        _resource_cache.clear()
+        _template_cache.clear()
@@ -0,0 +1,153 @@
+"""
+Lesson score rollup from per-SCO scores
+
+Per-SCO scores and running totals are kept between requests, so that a
+change to one SCO's score updates the lesson score without revisiting
+every other SCO.  Policies:
+
+- "average": every SCO counts equally, unscored SCOs count as 0
+- "weighted": as average, weighted by the rollup weights declared in imsmanifest.xml
+- "min": the lowest SCO score, 0 while any SCO is unscored
+- "best": the highest SCO score
+"""
+AVERAGE = 'average'
+WEIGHTED = 'weighted'
+MIN = 'min'
+BEST = 'best'
+POLICIES = (AVERAGE, WEIGHTED, MIN, BEST)
+
+# CMI elements holding a SCO's score, SCORM 1.2 then SCORM 2004
+SCORE_ELEMENTS = ('cmi.core.score.raw', 'cmi.score.raw')
+SCALED_SCORE_ELEMENT = 'cmi.score.scaled'
+
+
+def sco_score(data):
+    """
+    return the score (0-100) recorded in a SCO's CMI data, or None if unscored
+    """
+    for element in SCORE_ELEMENTS:
+        try:
+            return float(data[element])
+        except (KeyError, TypeError, ValueError):
+            pass
+    try:
+        return float(data[SCALED_SCORE_ELEMENT]) * 100
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def choose_score(player_score, engine, policy_configured):
+    """
+    return the lesson score to grade: the player's own rollup is used
+    unless a rollup policy is configured or the player reports none
+    """
+    if policy_configured or player_score in ('', None):
+        return engine.score if engine.scores else player_score
+    return player_score
+
+
+def lesson_score(score, engine):
+    """
+    return the lesson score kept for a score chosen by `choose_score`,
+    the rollup's if there is nothing to grade
+    """
+    if score == '' or score is None:
+        return engine.score
+    return float(score)
+
+
+class ScoreRollup(object):
+    """
+    running lesson score for one learner.  `weights` maps SCO ids declared in
+    the package to their rollup weight; SCOs not declared there weigh 1
+    """
+    def __init__(self, data=None, policy=AVERAGE, weights=None):
+        if policy not in POLICIES:
+            raise ValueError('Unknown score rollup policy {!r}'.format(policy))
+        self.policy = policy
+        self.weights = dict(weights or {})
+        data = data or {}
+        self.scores = dict(data.get('scores', {}))
+        if data.get('policy') != policy or data.get('weights') != self.weights:
+            # totals were kept for another policy or package version
+            self._rebuild()
+        else:
+            self.total = data['total']
+            self.weight = data['weight']
+            self.known = data['known']
+            self.extreme = data.get('extreme')
+
+    def _weight_of(self, sco_id):
+        if self.policy == WEIGHTED:
+            return float(self.weights.get(sco_id, 1.0))
+        return 1.0
+
+    def _rebuild(self):
+        known = set(self.weights) | set(self.scores)
+        self.known = len(known)
+        self.weight = sum(self._weight_of(sco_id) for sco_id in known)
+        self.total = sum(self._weight_of(sco_id) * score for sco_id, score in self.scores.items())
+        self._rebuild_extreme()
+
+    def _rebuild_extreme(self):
+        pick = min if self.policy == MIN else max
+        self.extreme = pick(self.scores.values()) if self.scores else None
+
+    def update(self, sco_id, score):
+        """
+        record a new score (or None) for one SCO; O(1) except when the current
+        min/best SCO gets worse, which needs one pass over the SCO scores
+        """
+        old = self.scores.get(sco_id)
+        if old == score:
+            return
+        weight = self._weight_of(sco_id)
+        if old is None and sco_id not in self.scores and sco_id not in self.weights:
+            self.known += 1
+            self.weight += weight
+        if old is not None:
+            self.total -= weight * old
+        if score is None:
+            self.scores.pop(sco_id, None)
+            if old is not None and sco_id not in self.weights:
+                # forget SCOs the package doesn't declare once they are unscored
+                self.known -= 1
+                self.weight -= weight
+        else:
+            self.scores[sco_id] = score
+            self.total += weight * score
+
+        if self.policy in (MIN, BEST):
+            better = (lambda a, b: a < b) if self.policy == MIN else (lambda a, b: a > b)
+            if score is not None and (self.extreme is None or not better(self.extreme, score)):
+                self.extreme = score
+            elif old is not None and old == self.extreme:
+                self._rebuild_extreme()
+
+    def update_all(self, scores):
+        """
+        record scores for many SCOs, e.g. from a full status snapshot
+        """
+        for sco_id, score in scores.items():
+            self.update(sco_id, score)
+
+    @property
+    def score(self):
+        if self.policy in (AVERAGE, WEIGHTED):
+            return self.total / self.weight if self.weight else 0.0
+        if self.policy == MIN:
+            if self.extreme is None or len(self.scores) < self.known:
+                return 0.0
+            return self.extreme
+        return self.extreme if self.extreme is not None else 0.0
+
+    def to_dict(self):
+        return {
+            'policy': self.policy,
+            'weights': self.weights,
+            'scores': self.scores,
+            'total': self.total,
+            'weight': self.weight,
+            'known': self.known,
+            'extreme': self.extreme,
+        }
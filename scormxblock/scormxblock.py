@@ -1,19 +1,17 @@
-import importlib
 import json
 import os
-import pkg_resources
 import zipfile
-import shutil
-import tempfile
 import logging
 import encodings
+import time
 
 from django.conf import settings
-from django.utils import encoding
+from django.core.files import File
+from django.core.urlresolvers import NoReverseMatch, reverse
 from webob import Response
 
 from xblock.core import XBlock, UNSET
-from xblock.fields import Scope, String, Integer, Boolean, Float
+from xblock.fields import Scope, String, Integer, Boolean, Float, List, Dict
 from xblock.fragment import Fragment
 
 from openedx.core.lib.xblock_utils import add_staff_markup
@@ -23,9 +21,21 @@ except ImportError:
     from django.contrib.sites.shortcuts import get_current_site
     from request_cache.middleware import RequestCache
 
-from mako.template import Template as MakoTemplate
-
+import access
+import archive
+import assets
+import identity
+import importer
+import jobs
+import launch
+import manifest
+import precompress
+import resources
+import rollup
 import settings as settings_mixin
+import state as scorm_state
+import storage as scorm_storage
+import uploads
 
 
 # Make '_' a no-op so we can scrape strings
@@ -34,7 +44,7 @@ _ = lambda text: text
 logger = logging.getLogger(__name__)
 
 
-DEFAULT_STORAGE_TYPE = "django.core.files.storage.default_storage"
+DEFAULT_STORAGE_TYPE = scorm_storage.DEFAULT_STORAGE_TYPE
 SCORM_PKG_INTERNAL = {"value": "SCORM_PKG_INTERNAL", "display_name": "Internal Player: index.html in SCORM package"}
 DEFAULT_SCO_MAX_SCORE = 100
 DEFAULT_IFRAME_WIDTH = 800
@@ -43,6 +53,14 @@ SCORM_COMPLETE_STATUSES = (u'completed', u'passed', u'failed')
 
 AVAIL_ENCODINGS = encodings.aliases.aliases
 DEFAULT_SITE_DOMAIN = "example.com"
+SHARED_STORAGE_DIRNAME = "_shared"
+INTERNAL_SCO_ID = "sco"
+DEFAULT_PKG_VERSIONS_TO_KEEP = 3
+PKG_STORAGE_EXTRACT = "extract"
+PKG_STORAGE_ARCHIVE = "archive"
+PKG_STORAGE_MODES = (PKG_STORAGE_EXTRACT, PKG_STORAGE_ARCHIVE)
+# settings fields a background import sets, see run_import_job
+PACKAGE_FIELDS = ('scorm_file', 'package_version', 'package_versions', 'package_index')
 
 
 class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
@@ -67,6 +85,31 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
         help=_('Upload a new SCORM package.'),
         scope=Scope.settings
     )
+    # with SCORM_USE_PACKAGE_VERSIONING, the version scorm_file points to and the
+    # versions still kept in storage, oldest first
+    package_version = String(
+        default='',
+        scope=Scope.settings
+    )
+    package_versions = List(
+        default=[],
+        scope=Scope.settings
+    )
+    # compact index parsed from imsmanifest.xml at import, see manifest.py
+    package_index = Dict(
+        default={},
+        scope=Scope.settings
+    )
+    # the background import started by the last package upload, see jobs.py
+    import_job_id = String(
+        default='',
+        scope=Scope.settings
+    )
+    # bumped when Studio changes the block, keys the cached launch context, see launch.py
+    launch_version = Integer(
+        default=0,
+        scope=Scope.settings
+    )
     scorm_player = String(
         values=[SCORM_PKG_INTERNAL, ], # defer addition of other possible values until XBlock instantiation
         # [{"value": key, "display_name": defined_players[key]['name']} for key in defined_players.keys()] + [SCORM_PKG_INTERNAL, ],
@@ -79,6 +122,11 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
         scope=Scope.user_state,
         default='{}'
     )
+    # incremented on every save of raw_scorm_status, to detect concurrent writers
+    raw_scorm_status_version = Integer(
+        scope=Scope.user_state,
+        default=0
+    )
     scorm_initialized = Boolean(
         scope=Scope.user_state,
         default=False
@@ -91,6 +139,30 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
         scope=Scope.user_state,
         default=0
     )
+    # per-SCO scores and running totals of the lesson score rollup, see rollup.py
+    score_rollup = Dict(
+        scope=Scope.user_state,
+        default={}
+    )
+    # last grade published to the LMS for this learner, to skip identical publishes
+    published_grade_value = Float(
+        scope=Scope.user_state,
+        default=None
+    )
+    published_grade_max = Float(
+        scope=Scope.user_state,
+        default=None
+    )
+    published_grade_time = Float(
+        scope=Scope.user_state,
+        default=0
+    )
+    # the score of a changed grade held back by SCORM_GRADE_PUBLISH_WINDOW,
+    # published on LMSFinish or the next visit
+    held_grade_score = Float(
+        scope=Scope.user_state,
+        default=None
+    )
     weight = Integer(
         default=1,
         help=_('SCORM block\'s problem weight in the course, in points.  If not graded, set to 0'),
@@ -131,23 +203,121 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
 
     @property
     def scorm_players(self):
-        return self.settings.get("SCORM_PLAYER_BACKENDS", [])
+        return self.settings.get("SCORM_PLAYER_BACKENDS", {})
 
     @property
     def scorm_storage_dir(self):
         return self.settings.get("SCORM_PKG_STORAGE_DIR", "scorms")
 
+    @property
+    def use_package_versioning(self):
+        return self.settings.get("SCORM_USE_PACKAGE_VERSIONING", False)
+
+    @property
+    def package_versions_to_keep(self):
+        # at least the live version and the one before it, for learners mid-session
+        return max(self.settings.get("SCORM_PKG_VERSIONS_TO_KEEP", DEFAULT_PKG_VERSIONS_TO_KEEP), 2)
+
+    @property
+    def scorm_shared_storage_dir(self):
+        # content-addressed store for files identical across packages, if enabled
+        if self.settings.get("SCORM_PKG_SHARED_STORAGE", False):
+            return os.path.join(self.scorm_storage_dir, SHARED_STORAGE_DIRNAME)
+        return None
+
     @property
     def scorm_storage(self):
         scorm_file_storage_type = self.settings.get("SCORM_FILE_STORAGE_TYPE", DEFAULT_STORAGE_TYPE)
-        mod, store_class = scorm_file_storage_type.rsplit('.', 1)
-        scorm_storage_module = importlib.import_module(mod)
-        scorm_storage_class = getattr(scorm_storage_module, store_class)
-        if scorm_file_storage_type.endswith('default_storage'):
-            scorm_storage_instance = scorm_storage_class
-        else:
-            scorm_storage_instance = scorm_storage_class()
-        return scorm_storage_instance
+        return scorm_storage.get_storage(scorm_file_storage_type)
+
+    @property
+    def scorm_storage_concurrency(self):
+        return self.settings.get("SCORM_STORAGE_CONCURRENCY", scorm_storage.DEFAULT_SAVE_CONCURRENCY)
+
+    @property
+    def score_rollup_policy(self):
+        # one of rollup.POLICIES; when unset the player's own lesson score is preferred
+        policy = self.settings.get("SCORM_SCORE_ROLLUP")
+        if policy is not None and policy not in rollup.POLICIES:
+            logger.warn('SCORM XBlock ignoring unknown SCORM_SCORE_ROLLUP policy {}'.format(policy))
+            return None
+        return policy
+
+    @property
+    def grade_publish_window(self):
+        # seconds during which changed grades are held back after a publish
+        return self.settings.get("SCORM_GRADE_PUBLISH_WINDOW", 0)
+
+    @property
+    def grade_publish_on_completion_only(self):
+        return self.settings.get("SCORM_GRADE_PUBLISH_ON_COMPLETION_ONLY", False)
+
+    @property
+    def import_executor(self):
+        # "sync" imports packages within studio_submit, "thread" or "celery" in the background
+        executor = self.settings.get("SCORM_IMPORT_EXECUTOR", jobs.SYNC)
+        if executor not in jobs.EXECUTORS:
+            logger.warn('SCORM XBlock ignoring unknown SCORM_IMPORT_EXECUTOR {}'.format(executor))
+            return jobs.SYNC
+        return executor
+
+    @property
+    def upload_dir(self):
+        # spool directory for chunked uploads, shared by the Studio processes handling them
+        return self.settings.get("SCORM_UPLOAD_DIR") or uploads.default_upload_dir()
+
+    @property
+    def upload_chunk_size(self):
+        return self.settings.get("SCORM_UPLOAD_CHUNK_SIZE", uploads.DEFAULT_CHUNK_SIZE)
+
+    @property
+    def package_storage_mode(self):
+        # "extract" stores every package file, "archive" stores the zip as one object
+        mode = self.settings.get("SCORM_PKG_STORAGE_MODE", PKG_STORAGE_EXTRACT)
+        if mode not in PKG_STORAGE_MODES:
+            logger.warn('SCORM XBlock ignoring unknown SCORM_PKG_STORAGE_MODE {}'.format(mode))
+            return PKG_STORAGE_EXTRACT
+        return mode
+
+    @property
+    def precompressor(self):
+        # e.g. ["br", "gzip"]; precompressed variants are stored next to compressible package files
+        return precompress.Precompressor(
+            self.settings.get("SCORM_PRECOMPRESS", []),
+            min_size=self.settings.get("SCORM_PRECOMPRESS_MIN_SIZE", precompress.DEFAULT_MIN_SIZE),
+            max_ratio=self.settings.get("SCORM_PRECOMPRESS_MAX_RATIO", precompress.DEFAULT_MAX_RATIO))
+
+    @property
+    def serve_packages(self):
+        # serve package files through the package_asset handler instead of storage URLs
+        return self.settings.get("SCORM_SERVE_PACKAGES", False)
+
+    @property
+    def compress_status(self):
+        # store raw_scorm_status zlib-compressed, see state.py
+        return self.settings.get("SCORM_COMPRESS_STATUS", False)
+
+    @property
+    def cache_resources(self):
+        # set False in development to pick up template and static file edits without a restart
+        return self.settings.get("SCORM_CACHE_RESOURCES", True)
+
+    @property
+    def staff_access_cache_ttl(self):
+        return self.settings.get("SCORM_STAFF_ACCESS_CACHE_TTL", access.DEFAULT_STAFF_ACCESS_CACHE_TTL)
+
+    @property
+    def identity_cache_ttl(self):
+        return self.settings.get("SCORM_IDENTITY_CACHE_TTL", identity.DEFAULT_IDENTITY_CACHE_TTL)
+
+    @property
+    def launch_context_cache_ttl(self):
+        return self.settings.get("SCORM_LAUNCH_CONTEXT_CACHE_TTL", launch.DEFAULT_LAUNCH_CONTEXT_CACHE_TTL)
+
+    @property
+    def package_manifest_cache_ttl(self):
+        # unversioned packages only, versioned ones are cached until evicted
+        return self.settings.get("SCORM_PACKAGE_MANIFEST_CACHE_TTL", assets.DEFAULT_UNVERSIONED_MANIFEST_TTL)
 
     @property
     def reverse_student_names(self):
@@ -168,23 +338,13 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
     @property
     def student_name(self):
         anon_id = self.runtime.anonymous_student_id
-        student = self.runtime.get_real_user(anon_id) if self.runtime.get_real_user is not None else None
-        if student:
-            try:
-                # reverse should be default and is expected by SCORM API 
-                # but can be overridden via XBLOCK settings
-                reverse = self.reverse_student_names
-                split_name = student.profile.name.split(' ')
-                first_name = student.first_name if student.first_name else split_name[0]
-                last_name = student.last_name if student.last_name else ' '.join(split_name[1:])
-                if reverse:
-                    return u"{}, {}".format(last_name, first_name)
-                else:
-                    return u"{} {}".format(first_name, last_name)
-            except (AttributeError, IndexError):
-                return u""
-        else:
+        if self.runtime.get_real_user is None:
             return u""
+        learner = identity.get_identity(
+            self.student_id, lambda: self.runtime.get_real_user(anon_id), self.identity_cache_ttl)
+        # reverse should be default and is expected by SCORM API
+        # but can be overridden via XBLOCK settings
+        return learner['reversed_name'] if self.reverse_student_names else learner['name']
 
     @property
     def course_id(self):
@@ -204,70 +364,43 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
 
     def resource_string(self, path):
         """Handy helper for getting resources from our kit."""
-        data = pkg_resources.resource_string(__name__, path)
-        return data.decode("utf8")
+        return resources.resource_string(path, use_cache=self.cache_resources)
+
+    def render_template(self, path, **context):
+        """Render a Mako template from our kit, compiled once per process."""
+        return resources.render_template(path, use_cache=self.cache_resources, **context)
 
     def student_view(self, context=None, authoring=False):
-        scheme = 'https' if settings.HTTPS == 'on' else 'http'
-        
+        if not authoring and self._publish_held_grade():
+            self.save()
         try:
             site = get_current_site()  # theming.helpers
         except TypeError:
             site = get_current_site(RequestCache.get_current_request())  # django.contrib.site
-        try:  
-            # guard against unset/default Site domain           
-            lms_base = site.domain if str(site.domain) != DEFAULT_SITE_DOMAIN else settings.ENV_TOKENS.get("LMS_BASE")
-        except AttributeError:
-            lms_base = settings.ENV_TOKENS("LMS_BASE")    
-
-        scorm_player_url = ""
-
-        if self.scorm_player == 'SCORM_PKG_INTERNAL':
-            # TODO: support initial filename other than index.html for internal players
-            scorm_player_url = '{}://{}{}'.format(scheme, lms_base, self.scorm_file)
-        elif self.scorm_player:
-            # SSLA: launch.htm?courseId=1&studentName=Caudill,Brian&studentId=1&courseDirectory=courses/SSLA_tryout
-            player_config = self.scorm_players[self.scorm_player]
-            player  = player_config['location']
-            if '://' in player:
-                scorm_player_url = player
-            else:    
-                scorm_player_url = '{}://{}{}'.format(scheme, lms_base, player)
-                    
-        html = self.resource_string("static/html/scormxblock.html")
-
-        # don't call handlers if student_view is not called from within LMS
-        # (not really a student)
-        if not authoring:
-            get_url = '{}://{}{}'.format(scheme, lms_base, self.runtime.handler_url(self, "get_raw_scorm_status"))
-            set_url = '{}://{}{}'.format(scheme, lms_base, self.runtime.handler_url(self, "set_raw_scorm_status"))
-        # PreviewModuleSystem (runtime Mixin from Studio) won't have a hostname            
-        else:
-            # we don't want to get/set SCORM status from preview
-            get_url = set_url = '#'
+        # the per-learner fields are filled in by the template
+        key = (getattr(site, 'domain', None), unicode(self.location), self.launch_version, authoring)
+        launch_context = launch.launch_contexts.get(key, lambda: self._launch_context(site, authoring),
+                                                    self.launch_context_cache_ttl or 0)
 
         # if display type is popup, don't use the full window width for the host iframe
         iframe_width = self.display_type=='popup' and DEFAULT_IFRAME_WIDTH or self.display_width;
         iframe_height = self.display_type=='popup' and DEFAULT_IFRAME_HEIGHT or self.display_height;
 
-        try:
-            player_config = json.loads(self.player_configuration)
-        except ValueError:
-            player_config = {}
-
         frag = Fragment()
-        frag.add_content(MakoTemplate(text=html.format(self=self, scorm_player_url=scorm_player_url,
-                                                       get_url=get_url, set_url=set_url, 
-                                                       iframe_width=iframe_width, iframe_height=iframe_height,
-                                                       player_config=player_config, 
-                                                       scorm_file=self.scorm_file)
-                                     ).render_unicode())
+        frag.add_content(self.render_template("static/html/scormxblock.html",
+                                              block=self, scorm_player_url=launch_context['player_url'],
+                                              get_url=launch_context['get_url'],
+                                              set_url=launch_context['set_url'],
+                                              patch_url=launch_context['patch_url'],
+                                              iframe_width=iframe_width, iframe_height=iframe_height,
+                                              player_config=launch_context['player_config'],
+                                              scorm_file=launch_context['scorm_file'],
+                                              package_index=self.package_index,
+                                              launch_attrs=launch_context['attrs']))
 
         frag.add_css(self.resource_string("static/css/scormxblock.css"))
         context['block_id'] = self.url_name
-        js = self.resource_string("static/js/src/scormxblock.js")
-        jsfrag = MakoTemplate(js).render_unicode(**context)
-        frag.add_javascript(jsfrag)
+        frag.add_javascript(self.render_template("static/js/src/scormxblock.js", **context))
 
 
         # TODO: this will only work to display staff debug info if 'scormxblock' is one of the
@@ -277,12 +410,9 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
         # like setting the name in the entry point to 'problem'.  Doesn't seem like a good idea.  Better to 
         # have 'staff debuggable' categories configurable in settings or have an XBlock declare itself staff debuggable
         if self.scorm_display_staff_debug_info and not authoring:  # don't show for author preview
-            from courseware.access import has_access
-            from courseware.courses import get_course_by_id
-
-            course = get_course_by_id(self.xmodule_runtime.course_id)
             dj_user = self.xmodule_runtime._services['user']._django_user
-            has_instructor_access = bool(has_access(dj_user, 'instructor', course))
+            has_instructor_access = access.has_instructor_access(
+                dj_user, self.xmodule_runtime.course_id, self.staff_access_cache_ttl)
             if has_instructor_access:
                 disable_staff_debug_info = settings.FEATURES.get('DISPLAY_DEBUG_INFO_TO_STAFF', True) and False or True
                 block = self
@@ -292,19 +422,104 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
         frag.initialize_js('ScormXBlock_{0}'.format(context['block_id']))
         return frag
 
+    def _launch_context(self, site, authoring=False):
+        """
+        resolve the learner-independent part of student_view, see launch.py
+        """
+        scheme = 'https' if settings.HTTPS == 'on' else 'http'
+        try:
+            # guard against unset/default Site domain
+            lms_base = site.domain if str(site.domain) != DEFAULT_SITE_DOMAIN else settings.ENV_TOKENS.get("LMS_BASE")
+        except AttributeError:
+            lms_base = getattr(settings, 'ENV_TOKENS', {}).get("LMS_BASE")
+
+        scorm_player_url = ""
+
+        try:
+            player_config = json.loads(self.player_configuration)
+        except ValueError:
+            player_config = {}
+
+        scorm_file = self.scorm_file
+        serve_package = self.serve_packages or self.package_index.get('storage_mode') == PKG_STORAGE_ARCHIVE
+        if serve_package and scorm_file:
+            # the package's content id in the path gives each version its own URLs
+            scorm_file = self.runtime.handler_url(self, "package_asset", self._package_id() or 'latest')
+
+        if self.scorm_player == 'SCORM_PKG_INTERNAL':
+            # launch file from the package index unless overridden in player configuration
+            launch_file = player_config.get('initial_html') or self.package_index.get('launch')
+            if launch_file:
+                scorm_player_url = '{}://{}{}/{}'.format(scheme, lms_base, scorm_file, launch_file)
+            else:
+                scorm_player_url = '{}://{}{}'.format(scheme, lms_base, scorm_file)
+        elif self.scorm_player:
+            # SSLA: launch.htm?courseId=1&studentName=Caudill,Brian&studentId=1&courseDirectory=courses/SSLA_tryout
+            player_backend = self.scorm_players[self.scorm_player]
+            player  = player_backend['location']
+            if '://' in player:
+                scorm_player_url = player
+            else:    
+                scorm_player_url = '{}://{}{}'.format(scheme, lms_base, player)
+
+        # don't call handlers if student_view is not called from within LMS
+        # (not really a student)
+        if not authoring:
+            get_url = '{}://{}{}'.format(scheme, lms_base, self.runtime.handler_url(self, "get_raw_scorm_status"))
+            set_url = '{}://{}{}'.format(scheme, lms_base, self.runtime.handler_url(self, "set_raw_scorm_status"))
+            patch_url = '{}://{}{}'.format(scheme, lms_base, self.runtime.handler_url(self, "patch_raw_scorm_status"))
+        # PreviewModuleSystem (runtime Mixin from Studio) won't have a hostname            
+        else:
+            # we don't want to get/set SCORM status from preview
+            get_url = set_url = patch_url = '#'
+
+        attrs = launch.data_attrs([
+            ('player_url', scorm_player_url),
+            ('display_type', self.display_type),
+            ('display_width', self.display_width),
+            ('display_height', self.display_height),
+            ('get_url', get_url),
+            ('set_url', set_url),
+            ('patch_url', patch_url),
+            ('course_location', u'{}/'.format(scorm_file or '')),
+            ('course_id', self.course_id),
+            ('scorm_version', self.package_index.get('scorm_version', '')),
+            ('launch', self.package_index.get('launch') or ''),
+            ('scos', json.dumps(self.package_index.get('scos', []))),
+        ] + player_config.items())
+        return {
+            'player_url': scorm_player_url,
+            'player_config': player_config,
+            'scorm_file': scorm_file,
+            'get_url': get_url,
+            'set_url': set_url,
+            'patch_url': patch_url,
+            'attrs': attrs,
+        }
+
+    def _launch_context_changed(self):
+        self.launch_version += 1
+        launch.launch_contexts.invalidate(unicode(self.location))
+
     def author_view(self, context=None):
         return self.student_view(context, authoring=True)
 
     def studio_view(self, context=None):
-        html = self.resource_string("static/html/studio.html")
         frag = Fragment()
-        context = {'block': self}
-        frag.add_content(MakoTemplate(text=html).render_unicode(**context))
+        context = {'block': self, 'import_status_url': self._import_status_url()}
+        frag.add_content(self.render_template("static/html/studio.html", **context))
         frag.add_css(self.resource_string("static/css/scormxblock.css"))
         frag.add_javascript(self.resource_string("static/js/src/studio.js"))
         frag.initialize_js('ScormStudioXBlock')
         return frag
 
+    def _import_status_url(self):
+        # background import status is served by views.py, not a handler, see jobs.py
+        try:
+            return reverse('scormxblock_import_status')
+        except NoReverseMatch:
+            return ''
+
     @XBlock.handler
     def studio_submit(self, request, suffix=''):
         self.display_name = request.params['display_name']
@@ -315,6 +530,7 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
         self.display_type = request.params['display_type']
         self.scorm_player = request.params['scorm_player']
         self.encoding = request.params['encoding']
+        self._launch_context_changed()
 
         if request.params['player_configuration']:
             try:
@@ -323,98 +539,396 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
             except ValueError, e:
                 return Response(json.dumps({'result': 'failure', 'error': 'Invalid JSON in Player Configuration'.format(e)}), content_type='application/json', charset='UTF-8')
 
+        upload = None
+        if request.params.get('upload_id'):
+            # a package sent with upload_init/upload_chunk/upload_finalize
+            try:
+                upload = uploads.ChunkedUpload(self.upload_dir, request.params['upload_id'])
+                file = upload.open()
+            except uploads.UploadError as e:
+                return Response(json.dumps({'result': 'failure', 'error': unicode(e)}), content_type='application/json', charset='UTF-8')
+        elif hasattr(request.params.get('file'), 'file'):
+            file = request.params['file'].file
+        else:
+            file = None
+
+        if file is not None:
+            try:
+                return self._submit_package(file)
+            finally:
+                if upload is not None:
+                    file.close()
+                    upload.delete()
+
+        elif request.params.get('package_version') and request.params['package_version'] != self.package_version:
+            # roll back (or forward) to a version still kept in storage
+            if request.params['package_version'] not in self.package_versions:
+                return Response(json.dumps({'result': 'failure', 'error': 'Unknown package version'}), content_type='application/json', charset='UTF-8')
+            self._set_package_version(request.params['package_version'])
+
+        return Response(json.dumps({'result': 'success'}), content_type='application/json', charset='UTF-8')
+
+    def _submit_package(self, file):
+        """
+        import an uploaded package zip, or store it and start a background import
+        """
         # scorm_file should only point to the path where imsmanifest.xml is located
         # scorm_player will have the index.html, launch.htm, etc. location for the JS player
-        # TODO: the below could fail after deleting all of the contents from the storage. to handle
-        if hasattr(request.params['file'], 'file'):
-            file = request.params['file'].file
-            zip_file = zipfile.ZipFile(file, 'r')
-            storage = self.scorm_storage
-            
-            path_to_file = os.path.join(self.scorm_storage_dir, self.location.block_id)
-
-            if storage.exists(os.path.join(path_to_file, 'imsmanifest.xml')):
-                try:
-                    shutil.rmtree(os.path.join(storage.location, path_to_file))
-                except OSError:
-                    # TODO: for now we are going to assume this means it's stored on S3 if not local
-                    try:
-                        for key in storage.bucket.list(prefix=path_to_file):
-                            key.delete()
-                    except AttributeError:
-                        return Response(json.dumps({'result': 'failure', 'error': 'Unsupported storage. Unable to overwrite old SCORM package contents'}), content_type='application/json', charset='UTF-8')
-
-            tempdir = tempfile.mkdtemp()
-            zip_file.extractall(tempdir)
-
-            to_store = []
-            for (dirpath, dirnames, files) in os.walk(tempdir):
-                for f in files:
-                    to_store.append(os.path.join(os.path.abspath(dirpath), f))
-
-            # TODO: look at optimization of file handling, save
-
-            for f in to_store:
-                # defensive decode/encode from zip
-                f_path = f.decode(self.encoding).encode('utf-8').replace(tempdir, '')
-                with open(f, 'rb+') as fh:
-                    try:
-                        storage.save('{}{}'.format(path_to_file, f_path), fh)
-                    except encoding.DjangoUnicodeDecodeError, e:
-                        logger.warn('SCORM XBlock Couldn\'t store file {} to storage. {}'.format(f, e))
-
-            shutil.rmtree(tempdir)
-
-            # strip querystrings
-            url = storage.url(path_to_file)
-            self.scorm_file = '?' in url and url[:url.find('?')] or url
+        zip_file = zipfile.ZipFile(file, 'r')
+        package = self._package_importer(zip_file, file)
+        try:
+            package_index = self._validate_package(package)
+        except (importer.PackageImportError, manifest.ManifestError) as e:
+            return Response(json.dumps({'result': 'failure', 'error': unicode(e)}), content_type='application/json', charset='UTF-8')
 
+        executor = self.import_executor
+        if executor == jobs.SYNC:
+            self._import_package(package, package_index)
+        else:
+            # import in the background; the block is pointed at the package once that succeeds
+            job_id = jobs.new_job_id()
+            upload_name = jobs.upload_name(self.scorm_storage_dir, job_id)
+            file.seek(0)
+            self.scorm_storage.save(upload_name, File(file))
+            try:
+                jobs.enqueue(executor, job_id, unicode(self.location), self.scope_ids.user_id,
+                             queue=self.settings.get("SCORM_IMPORT_QUEUE"))
+            except Exception as e:  # pylint: disable=broad-except
+                logger.exception('SCORM XBlock couldn\'t start package import job {}'.format(job_id))
+                jobs.set_status(job_id, jobs.FAILED, error=unicode(e))
+                self.scorm_storage.delete(upload_name)
+                return Response(json.dumps({'result': 'failure', 'error': 'Couldn\'t start the package import'}), content_type='application/json', charset='UTF-8')
+            # saved with the block when this request completes; the job runs again until it is
+            self.import_job_id = job_id
+            return Response(json.dumps({'result': 'pending', 'job_id': job_id}), content_type='application/json', charset='UTF-8')
         return Response(json.dumps({'result': 'success'}), content_type='application/json', charset='UTF-8')
 
+    def _package_importer(self, zip_file, upload, progress=importer.log_progress):
+        # scorm_file should only point to the path where imsmanifest.xml is located
+        # scorm_player will have the index.html, launch.htm, etc. location for the JS player
+        path_to_file = os.path.join(self.scorm_storage_dir, self.location.block_id)
+        versioned = self.use_package_versioning
+        import_options = dict(concurrency=self.scorm_storage_concurrency,
+                              max_size=self.settings.get("SCORM_PKG_MAX_SIZE"),
+                              max_member_size=self.settings.get("SCORM_PKG_MAX_FILE_SIZE"),
+                              versioned=versioned,
+                              base_dest=self._package_path(self.package_version) if versioned else None,
+                              progress=progress)
+        if self.package_storage_mode == PKG_STORAGE_ARCHIVE:
+            # the zip is stored as it is and members are served from it, see archive.py
+            return archive.ArchiveImporter(self.scorm_storage, zip_file, upload, path_to_file, self.encoding,
+                                           **import_options)
+        return importer.PackageImporter(self.scorm_storage, zip_file, path_to_file, self.encoding,
+                                        shared_dir=self.scorm_shared_storage_dir,
+                                        precompressor=self.precompressor,
+                                        **import_options)
+
+    def _validate_package(self, package):
+        """
+        check a package before anything is stored, return its index parsed from imsmanifest.xml
+        """
+        package.check_limits()
+        return manifest.parse_manifest(package.read_member(importer.MANIFEST_FILENAME))
+
+    def _import_package(self, package, package_index):
+        """
+        store a validated package and point the block at it
+        """
+        storage = self.scorm_storage
+        # only changed files are written when re-uploading over a previous import
+        files = package.run()
+        package_index.update(manifest.asset_stats(files))
+        package_index['package_id'] = importer.package_version_id(files, package.stored_as_archive)
+        package_index['storage_mode'] = self.package_storage_mode
+        storage.write(os.path.join(package.package_dest, importer.INDEX_FILENAME), json.dumps(package_index))
+        self.package_index = package_index
+
+        if package.versioned:
+            # switch learners to the new version only now that it is complete
+            self._set_package_version(package.version)
+            self._prune_package_versions()
+        else:
+            # learners keep the published version until the block is published again
+            published = self._published_package_version()
+            for version in self._stored_package_versions():
+                if version != published:
+                    storage.delete_prefix(self._package_path(version))
+            self.package_version = ''
+            self.package_versions = []
+            self._set_scorm_file(package.package_dest)
+
+    def run_import_job(self, job_id, progress):
+        """
+        import the package stored by studio_submit for a background job, see jobs.py
+        """
+        storage = self.scorm_storage
+        upload_name = jobs.upload_name(self.scorm_storage_dir, job_id)
+        progress.stage(jobs.EXTRACTING)
+        upload = jobs.open_upload(storage, upload_name)
+        try:
+            package = self._package_importer(zipfile.ZipFile(upload, 'r'), upload, progress)
+            package_index = self._validate_package(package)
+            self._import_package(package, package_index)
+            progress.stage(jobs.FINALIZING)
+        finally:
+            upload.close()
+            storage.delete(upload_name)
+
+    def merge_imported_package(self, block):
+        """
+        take the package a background job imported into `block`, a copy of this
+        block loaded earlier, leaving other fields as Studio last saved them
+        """
+        for name in PACKAGE_FIELDS:
+            setattr(self, name, getattr(block, name))
+        self._launch_context_changed()
+
+    @XBlock.json_handler
+    def upload_init(self, data, suffix=''):
+        """
+        start a chunked package upload, or resume the one given by upload_id, see uploads.py
+        """
+        try:
+            size = int(data.get('size'))
+        except (TypeError, ValueError):
+            return {'result': 'failure', 'error': 'Invalid upload size'}
+        upload = None
+        if data.get('upload_id'):
+            try:
+                upload = uploads.ChunkedUpload(self.upload_dir, data['upload_id'])
+            except uploads.UploadError:
+                pass
+        if upload is None or upload.meta['size'] != size or upload.meta['complete']:
+            try:
+                # a zip is no larger than the files it holds, bar their headers
+                upload = uploads.ChunkedUpload.create(self.upload_dir, size, data.get('filename', ''),
+                                                      max_size=self.settings.get("SCORM_PKG_MAX_SIZE"))
+            except uploads.UploadError as e:
+                return {'result': 'failure', 'error': unicode(e)}
+        return {'result': 'success', 'upload_id': upload.upload_id, 'offset': upload.offset,
+                'chunk_size': self.upload_chunk_size}
+
+    @XBlock.handler
+    def upload_chunk(self, request, suffix=''):
+        """
+        append the request body to a chunked upload at the offset given in the query string
+        """
+        try:
+            upload = uploads.ChunkedUpload(self.upload_dir, request.GET.get('upload_id'))
+            offset = upload.append(int(request.GET['offset']), request.body_file, request.content_length or 0,
+                                   int(request.GET['crc32']))
+        except (KeyError, ValueError):
+            return Response(json.dumps({'error': 'Invalid chunk parameters'}), status=400,
+                            content_type='application/json', charset='UTF-8')
+        except uploads.UploadError as e:
+            return Response(json.dumps({'error': unicode(e), 'offset': e.offset}), status=e.status,
+                            content_type='application/json', charset='UTF-8')
+        return Response(json.dumps({'offset': offset}), content_type='application/json', charset='UTF-8')
+
+    @XBlock.json_handler
+    def upload_finalize(self, data, suffix=''):
+        """
+        verify a chunked upload against the CRC-32 of the whole file; studio_submit then imports it
+        """
+        try:
+            upload = uploads.ChunkedUpload(self.upload_dir, data.get('upload_id'))
+            upload.finalize(int(data.get('crc32')))
+        except (TypeError, ValueError):
+            return {'result': 'failure', 'error': 'Invalid upload checksum'}
+        except uploads.UploadError as e:
+            return {'result': 'failure', 'error': unicode(e), 'offset': e.offset}
+        return {'result': 'success'}
+
+    @XBlock.handler
+    def package_asset(self, request, suffix=''):
+        """
+        serve a file of the current package, see assets.py
+        """
+        # <package id>/<path>, see _launch_context
+        requested_id, _, path = suffix.partition('/')
+        storage = self.scorm_storage
+        dest = self._package_path(self.package_version)
+        files = assets.file_manifests.get(storage, dest, self.package_version, self.package_index.get('package_id'),
+                                          self.package_manifest_cache_ttl)
+        # versioned package directories are named after their content, so never go stale, but
+        # a URL of another version is answered with the current files and must be revalidated
+        return assets.asset_response(request, storage, dest, path, files,
+                                     immutable=bool(self.package_version) and requested_id == self.package_version,
+                                     accel_redirect=self.settings.get("SCORM_ASSET_ACCEL_REDIRECT"),
+                                     sendfile=self.settings.get("SCORM_ASSET_SENDFILE", False))
+
+    def _package_id(self):
+        return self.package_version or self.package_index.get('package_id')
+
+    def _package_path(self, version=''):
+        path = os.path.join(self.scorm_storage_dir, self.location.block_id)
+        return os.path.join(path, version) if version else path
+
+    def _set_scorm_file(self, path):
+        # strip querystrings
+        url = self.scorm_storage.url(path)
+        self.scorm_file = '?' in url and url[:url.find('?')] or url
+
+    def _set_package_version(self, version):
+        self.package_version = version
+        self.package_versions = [v for v in self.package_versions if v != version] + [version]
+        self._set_scorm_file(self._package_path(version))
+        try:
+            self.package_index = json.loads(self.scorm_storage.read(
+                os.path.join(self._package_path(version), importer.INDEX_FILENAME)))
+        except (IOError, OSError, ValueError):
+            logger.warn('SCORM XBlock no package index stored for version {}'.format(version))
+            self.package_index = {}
+
+    def _prune_package_versions(self):
+        """
+        keep only the most recent versions in storage, and the one the published block points at
+        """
+        keep = self.package_versions[-self.package_versions_to_keep:]
+        published = self._published_package_version()
+        if published and published not in keep:
+            keep = [published] + keep
+        if published == '':
+            # the published block still uses a package stored before versioning was turned on
+            for version in self._stored_package_versions() - set(keep):
+                self.scorm_storage.delete_prefix(self._package_path(version))
+        else:
+            importer.prune_versions(self.scorm_storage, self._package_path(), keep)
+        self.package_versions = keep
+
+    def _stored_package_versions(self):
+        """
+        versions stored under the block's package directory, including ones no longer listed
+        """
+        path = self._package_path()
+        try:
+            dirs = self.scorm_storage.list_dirs(path)
+        except OSError:
+            dirs = []
+        return set(self.package_versions) | set(
+            name for name in dirs if self.scorm_storage.exists(importer.file_manifest_name(os.path.join(path, name))))
+
+    def _published_package_version(self):
+        """
+        the package version of the published block ('' for an unversioned package),
+        or None when it isn't published or there is no modulestore to ask
+        """
+        try:
+            from xmodule.modulestore import ModuleStoreEnum
+            from xmodule.modulestore.django import modulestore
+            from xmodule.modulestore.exceptions import ItemNotFoundError
+        except ImportError:
+            return None
+        store = modulestore()
+        try:
+            with store.branch_setting(ModuleStoreEnum.Branch.published_only, self.location.course_key):
+                published = store.get_item(self.location)
+        except ItemNotFoundError:
+            return None
+        return published.package_version if published.scorm_file else None
+
     # if player sends SCORM API JSON directly
     @XBlock.json_handler
     def scorm_get_value(self, data, suffix=''):
         name = data.get('name')
-        if name == 'cmi.core.lesson_status':
-            return {'value': self.lesson_status}
-        return {'value': ''}
+        sco_id = data.get('sco') or self._internal_sco_id()
+        value = self.scorm_state.cmi_value(name, sco_id, None)
+        if value is None and name == 'cmi.core.lesson_status':
+            value = self.lesson_status
+        return {'value': value if value is not None else ''}
 
     # if player sends SCORM API JSON directly
     @XBlock.json_handler
     def scorm_set_value(self, data, suffix=''):
+        return self._commit_cmi_values({data.get('name'): data.get('value')})
+
+    @XBlock.json_handler
+    def scorm_get_values(self, data, suffix=''):
+        """
+        return the whole CMI data model of the internal SCO in one request,
+        used to prime the client-side data model at LMSInitialize
+        """
+        self._publish_held_grade()
+        values = dict(self.scorm_state.sco_data(self._internal_sco_id()))
+        values.update({
+            'cmi.core.student_id': self.student_id,
+            'cmi.core.student_name': self.student_name,
+            'cmi.core.credit': self.weight > 0 and 'credit' or 'no-credit',
+            'cmi.core.lesson_status': self.lesson_status,
+        })
+        return {'values': values}
+
+    @XBlock.json_handler
+    def scorm_commit(self, data, suffix=''):
+        """
+        apply a batch of CMI element values buffered by the client-side data model,
+        sent on LMSCommit/LMSFinish or with a keepalive request when the page unloads.
+        the final commit (LMSFinish, unload) also publishes a held back grade
+        """
+        values = data.get('values')
+        if not isinstance(values, dict):
+            return {'result': 'failure', 'error': 'Expected an object of CMI element values'}
+        context = self._commit_cmi_values(values) if values else {'result': 'success'}
+        if data.get('final'):
+            # LMSFinish or unload: nothing follows to publish a grade held back by the window
+            self._publish_held_grade()
+        return context
+
+    def _internal_sco_id(self):
+        # the internal player launches the first SCO in the package
+        scos = self.package_index.get('scos')
+        return scos[0]['id'] if scos else INTERNAL_SCO_ID
+
+    def _commit_cmi_values(self, values):
+        """
+        store CMI element values for the internal SCO, update lesson status and score
+        and publish the grade, all at most once however many elements are set
+        """
         context = {'result': 'success'}
-        name = data.get('name')
-        if name == 'cmi.core.lesson_status' and data.get('value') != 'completed':
-            self.lesson_status = data.get('value')
-            self._publish_grade()
+        sco_id = self._internal_sco_id()
+        self.scorm_state.set_sco_values(sco_id, values)
+
+        previous_status = self.lesson_status
+        new_status = values.get('cmi.core.lesson_status')
+        if new_status and new_status != 'completed':
+            self.lesson_status = new_status
+        score_set = any(element in values for element in rollup.SCORE_ELEMENTS + (rollup.SCALED_SCORE_ELEMENT,))
+        if score_set:
+            self._set_lesson_score({sco_id: rollup.sco_score(self.scorm_state.sco_data(sco_id))})
+        if new_status or score_set:
+            self._publish_grade(self.lesson_status, self.lesson_score, previous_status)
             context.update({"lesson_score": self.lesson_score})
-        if name == 'cmi.core.score.raw':
-            self._set_lesson_score(data.get('value',0))
+        self.save()
         return context
 
-    def _get_all_scos(self):
-        return json.loads(self.raw_scorm_status).get('scos', None)
-
-    def _status_serialize_key(self, key, val):
+    @property
+    def scorm_state(self):
         """
-        update value in JSON serialized raw_scorm_status
-        passing a string key and a deserialized object
+        parsed raw_scorm_status, shared by all handlers for the life of this block instance
         """
-        status = json.loads(self.raw_scorm_status)
-        status[key] = val
-        self.raw_scorm_status = json.dumps(status)
+        if getattr(self, '_scorm_state', None) is None:
+            self._scorm_state = scorm_state.ScormState(self.raw_scorm_status, self.compress_status)
+        return self._scorm_state
+
+    def save(self):
+        # serialize the status blob once, however many values were changed.
+        # a status read in another encoding is rewritten without bumping its version
+        state = getattr(self, '_scorm_state', None)
+        if state is not None and (state.dirty or state.needs_migration):
+            self.raw_scorm_status = state.stored()
+            if state.dirty:
+                self.raw_scorm_status_version += 1
+            state.saved()
+        super(ScormXBlock, self).save()
+
+    def _get_all_scos(self):
+        return self.scorm_state.scos or None
 
     def _scos_set_values(self, key, val, overwrite=False):
         """
         set a value for a key on all scos
-        return new full raw scorm data
         """
-        scos = self._get_all_scos()
-        if scos:
-            for sco in scos:
-                if not scos[sco].get('key') or (scos[sco].get('key') and overwrite):
-                    scos[sco][key] = val
-            self._status_serialize_key('scos', scos)
+        self.scorm_state.set_all_scos(key, val, overwrite)
 
     def _init_scos(self):
         """
@@ -429,14 +943,29 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
         self._scos_set_values('cmi.core.lesson_status', 'not attempted', True)
         self.scorm_initialized = True
 
+    def _raw_scorm_status_etag(self):
+        return '{}-{}'.format(self.raw_scorm_status_version, self.scorm_state.etag())
+
+    def _raw_scorm_status_response(self, body, status=200):
+        response = Response(body, status=status, content_type='application/json', charset='UTF-8')
+        response.etag = self._raw_scorm_status_etag()
+        response.headers['X-Scorm-Status-Version'] = str(self.raw_scorm_status_version)
+        return response
+
     @XBlock.handler
     def get_raw_scorm_status(self, request, suffix=''):
         """ 
         retrieve JSON SCORM API status as stored by SSLA player (or potentially others)
+        supports conditional requests with If-None-Match
         """
         # TODO: handle errors
         # TODO: this is specific to SSLA player at this point.  evaluate for broader use case
-        return Response(self.raw_scorm_status, content_type='application/json', charset='UTF-8')
+        self._publish_held_grade()
+        if self._raw_scorm_status_etag() in request.if_none_match:
+            response = self._raw_scorm_status_response(None, status=304)
+            del response.content_type
+            return response
+        return self._raw_scorm_status_response(self.scorm_state.serialize())
 
     @XBlock.handler
     def set_raw_scorm_status(self, request, suffix=''):
@@ -447,57 +976,95 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
         data = request.POST['data']
         scorm_data = json.loads(data)
 
-        new_status = scorm_data.get('status', 'not attempted')
-
         if not self.scorm_initialized:
             self._init_scos()
 
-        self.raw_scorm_status = data
-                
-        self.lesson_status = new_status
-
-        score = scorm_data.get('score')
-        self._publish_grade(new_status, score)
-        self.save()
+        self.scorm_state.replace(data, scorm_data)
+        self._raw_scorm_status_updated()
 
         # TODO: handle errors
-        return Response(json.dumps(self.raw_scorm_status), content_type='application/json', charset='UTF-8')
+        return self._raw_scorm_status_response(json.dumps(self.scorm_state.serialize()))
 
-    def _get_value_from_sco(self, sco, key, default):
+    @XBlock.handler
+    def patch_raw_scorm_status(self, request, suffix=''):
         """
-        return a set or default value from a key in a SCO
-        treat blank string values as empty
+        apply a delta to the stored SCORM API status instead of replacing it:
+
+            {"version": 12, "ops": [{"op": "replace", "path": "/scos/sco1/data/cmi.suspend_data", "value": "..."}]}
+
+        `version` is the X-Scorm-Status-Version the client last read or wrote.  If
+        another writer (e.g. a second tab) saved since, nothing is applied and a 409
+        is returned with the current version; the client should then send a full
+        snapshot to set_raw_scorm_status.  a delta with an invalid operation, or leaving
+        `scos` malformed, gets a 400 and none of its operations are applied.
         """
         try:
-            val = sco[key]
-        except (KeyError, ValueError):
-            return default
-        finally:
-            if str(val) == '':
-                return default
-            else:
-                return val
+            delta = json.loads(request.body)
+            version = int(delta['version'])
+            ops = list(delta['ops'])
+        except (ValueError, KeyError, TypeError):
+            return self._raw_scorm_status_response(
+                json.dumps({'result': 'failure', 'error': 'Expected {"version": <int>, "ops": [...]}'}), status=400)
+
+        if version != self.raw_scorm_status_version:
+            logger.info('SCORM XBlock status version conflict for {}: client {}, stored {}'.format(
+                self.location.block_id, version, self.raw_scorm_status_version))
+            return self._raw_scorm_status_response(
+                json.dumps({'result': 'conflict', 'version': self.raw_scorm_status_version}), status=409)
+
+        try:
+            self.scorm_state.patch(ops)
+        except scorm_state.PatchError as e:
+            return self._raw_scorm_status_response(json.dumps({'result': 'failure', 'error': unicode(e)}), status=400)
+        if not self.scorm_initialized:
+            self._init_scos()
+        self._raw_scorm_status_updated(scorm_state.patched_scos(ops))
+
+        return self._raw_scorm_status_response(json.dumps({'result': 'success', 'version': self.raw_scorm_status_version}))
 
-    def _set_lesson_score(self, scos):
+    def _raw_scorm_status_updated(self, changed_scos=None):
         """
-        roll up a total lesson score from an average of SCO scores
+        update lesson status, score and grade from a new raw SCORM status, then save.
+        only the SCOs in `changed_scos` are rolled up again, all of them if None
         """
-        # note SCORM 2004+ supports complex weighting of scores from multiple SCOs
-        # see http://scorm.com/blog/2009/10/score-rollup-in-scorm-1-2-theres-no-silver-bullet/
-        # For now we will weight each SCO equally and take an average
-        # TODO: handle more complex weighting when we support SCORM2004+
-        total_score = 0
-        for sco in scos.keys():
-            sco = scos[sco]['data']
-            total_score += int(self._get_value_from_sco(sco, 'cmi.core.score.raw', 0))
-        score_rollup = float(total_score) / float(len(scos.keys()))
-        self.lesson_score = score_rollup
-        return score_rollup
+        previous_status = self.lesson_status
+        new_status = self.scorm_state.get('status', 'not attempted')
+        self.lesson_status = new_status
 
+        # a full snapshot replaces every SCO, so the rollup starts over: SCOs
+        # missing from it must not keep their old scores
+        rebuild = changed_scos is None
+        if rebuild:
+            changed_scos = self.scorm_state.scos.keys()
+        score = self._set_lesson_score(dict(
+            (sco_id, rollup.sco_score(self.scorm_state.sco_data(sco_id))) for sco_id in changed_scos), rebuild,
+            self.scorm_state.get('score'))
+        self._publish_grade(new_status, score, previous_status)
+        self.save()
+
+    def _rollup_weights(self):
+        return dict((sco['id'], sco.get('weight', 1.0)) for sco in self.package_index.get('scos', []))
 
-    def _publish_grade(self, status, score):
+    def _set_lesson_score(self, scores, rebuild=False, player_score=None):
         """
-        publish the grade in the LMS.
+        roll up a total lesson score from {sco_id: score} for the SCOs whose score changed,
+        or for all SCOs when `rebuild`.  the lesson score is the one graded, the rollup or
+        the player's own `player_score` (see rollup.choose_score), which is returned
+        """
+        # SCORM 2004+ supports complex weighting of scores from multiple SCOs
+        # see http://scorm.com/blog/2009/10/score-rollup-in-scorm-1-2-theres-no-silver-bullet/
+        # by default we weight each SCO equally and take an average, see rollup.py for other policies
+        engine = rollup.ScoreRollup(None if rebuild else self.score_rollup, self.score_rollup_policy or rollup.AVERAGE, self._rollup_weights())
+        engine.update_all(scores)
+        self.score_rollup = engine.to_dict()
+        score = rollup.choose_score(player_score, engine, self.score_rollup_policy)
+        self.lesson_score = rollup.lesson_score(score, engine)
+        return score
+
+    def _publish_grade(self, status, score, previous_status=None, flush=False):
+        """
+        publish the grade in the LMS, unless it is the same as the last grade
+        published for this learner or held back by the publish policy.
         """
         
         # We must do this regardless of the lesson
@@ -511,14 +1078,49 @@ class ScormXBlock(settings_mixin.ConfigurationSettingsMixin, XBlock):
         # in practice, SCOs will almost certainly have a max of 100
         # http://www.ostyn.com/blog/2006/09/scoring-in-scorm.html
         # TODO: handle variable max scores when we support SCORM2004+ or a better KESDEE workaround
-        if score != '':
-            self.runtime.publish(
-                self,
-                'grade',
-                {
-                    'value': (float(score)/float(DEFAULT_SCO_MAX_SCORE)) * self.weight,
-                    'max_value': self.weight,
-                })
+        if score == '' or score is None:
+            return False
+        value = (float(score)/float(DEFAULT_SCO_MAX_SCORE)) * self.weight
+        max_value = self.weight
+
+        # grade recalculation downstream is expensive; skip publishes which change nothing
+        if (value, max_value) == (self.published_grade_value, self.published_grade_max):
+            self.held_grade_score = None
+            return False
+
+        completing = status in SCORM_COMPLETE_STATUSES and previous_status not in SCORM_COMPLETE_STATUSES
+        if self.grade_publish_on_completion_only and status not in SCORM_COMPLETE_STATUSES:
+            return False
+        # coalesce bursts of autosaves: a changed grade within the window is published
+        # by the first save after it, on LMSFinish or the learner's next visit, or right
+        # away when the lesson is completed
+        window = self.grade_publish_window
+        if window and not completing and not flush and time.time() - self.published_grade_time < window:
+            self.held_grade_score = float(score)
+            return False
+
+        self.runtime.publish(
+            self,
+            'grade',
+            {
+                'value': value,
+                'max_value': max_value,
+            })
+        self.published_grade_value = value
+        self.published_grade_max = max_value
+        self.published_grade_time = time.time()
+        self.held_grade_score = None
+        return True
+
+    def _publish_held_grade(self):
+        """
+        publish the grade held back by the publish window, if any
+        """
+        score = self.held_grade_score
+        if score is None:
+            return False
+        self.held_grade_score = None
+        return self._publish_grade(self.lesson_status, score, self.lesson_status, flush=True)
 
     @staticmethod
     def workbench_scenarios():
@@ -1,6 +1,7 @@
 """
 Site-aware SCORM XBlock mixin
 """
+import copy
 import logging
 
 from xblock.core import XBlock
@@ -11,9 +12,77 @@ try:
 except ImportError:
     has_siteconfiguration = False
 
+try:
+    from openedx.core.djangoapps.theming.helpers import get_current_site
+except ImportError:
+    get_current_site = None
+
+from ttlcache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SETTINGS_CACHE_TTL = 300  # seconds
+
+
+class FrozenDict(dict):
+    """
+    read-only dict used for resolved settings shared between requests
+    """
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Resolved ScormXBlock settings are read-only; copy them before modifying.")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _immutable
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self), memo)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((key, _freeze(val)) for key, val in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(val) for val in value)
+    return value
+
+
+class ResolvedSettingsCache(TTLCache):
+    """
+    process-wide cache of merged platform/Site/org settings
+    keyed by (site domain, course org), with a TTL and hit/miss counters
+    """
+    def invalidate(self, domain=None):
+        """
+        drop cached settings for one site domain, or all of them
+        """
+        super(ResolvedSettingsCache, self).invalidate(None if domain is None else lambda key: key[0] == domain)
+
+
+resolved_settings_cache = ResolvedSettingsCache()
+
+
+def _invalidate_on_siteconfiguration_save(sender, instance, **kwargs):
+    # org-based overrides may be defined on any SiteConfiguration, so drop everything
+    logger.debug("SiteConfiguration for %s changed; clearing ScormXBlock settings cache", instance.site)
+    resolved_settings_cache.invalidate()
+
+
+def connect_signals():
+    """
+    clear the cache when a SiteConfiguration is saved, from the app's ready()
+    """
+    if not has_siteconfiguration:
+        return
+    try:
+        from django.db.models.signals import post_save
+        from openedx.core.djangoapps.site_configuration.models import SiteConfiguration
+    except ImportError:
+        return
+    post_save.connect(_invalidate_on_siteconfiguration_save, sender=SiteConfiguration,
+                      dispatch_uid='scormxblock_settings_cache_invalidation')
+
 
 class ConfigurationSettingsMixin(XBlock):
     """
@@ -82,6 +151,11 @@ class ConfigurationSettingsMixin(XBlock):
         - `student_view` executed in LMS will get settings from `lms.env.json`.
         Either context will also get settings overrides from domain/course org match to a SiteConfiguration
 
+        Resolved settings are cached per (site domain, course org) for
+        `SCORM_SETTINGS_CACHE_TTL` seconds (platform-wide setting only) and are
+        read-only.  The cache is cleared whenever a SiteConfiguration is saved
+        (once the app is ready, see apps.py).
+
         Returns:
             dict: Settings from configuration. E.g.
             {
@@ -90,23 +164,52 @@ class ConfigurationSettingsMixin(XBlock):
                 ...
             }
         """
+        base_settings = self._base_settings()
+        ttl = base_settings.get("SCORM_SETTINGS_CACHE_TTL", DEFAULT_SETTINGS_CACHE_TTL)
+        course_org = self.course_org
+        if not ttl:
+            return _freeze(self._resolve_settings(base_settings, course_org))
+        key = (self._site_domain(), course_org)
+        return resolved_settings_cache.get(key, lambda: _freeze(self._resolve_settings(base_settings, course_org)), ttl)
+
+    @staticmethod
+    def _base_settings():
         # in Studio at least can't seem to get any value from xmodule settings service
         # so using direct import approach
         from django.conf import settings as dj_settings
         if not hasattr(dj_settings, 'XBLOCK_SETTINGS'):
-            base_settings = {}
-        else:
-            base_settings = dj_settings.XBLOCK_SETTINGS.get("ScormXBlock", {})
+            return {}
+        return dj_settings.XBLOCK_SETTINGS.get("ScormXBlock", {})
+
+    @staticmethod
+    def _site_domain():
+        if get_current_site is None:
+            return None
+        site = get_current_site()
+        return getattr(site, 'domain', None)
+
+    @staticmethod
+    def _resolve_settings(base_settings, course_org):
+        """
+        merge platform settings with SiteConfiguration overrides into a new dict,
+        leaving the platform XBLOCK_SETTINGS untouched
+        """
+        resolved = copy.deepcopy(base_settings)
         if has_siteconfiguration:
             site_settings_by_domain = configuration_helpers.get_value("XBLOCK_SETTINGS", {}).get("ScormXBlock", {})
-            base_settings.update(site_settings_by_domain)
-            if self.course_org:
-                site_settings_by_org = configuration_helpers.get_value_for_org(self.course_org, "XBLOCK_SETTINGS", {}).get("ScormXBlock")
-                base_settings.update(site_settings_by_org)
-            return base_settings
-        else:
-            return base_settings
+            resolved.update(site_settings_by_domain)
+            if course_org:
+                site_settings_by_org = configuration_helpers.get_value_for_org(course_org, "XBLOCK_SETTINGS", {}).get("ScormXBlock")
+                resolved.update(site_settings_by_org or {})
+        return resolved
 
     @property
     def course_org(self):
         return self.runtime.course_id.org
+
+
+def settings_cache_stats():
+    """
+    return hit/miss counters and current size of the resolved settings cache
+    """
+    return resolved_settings_cache.stats()
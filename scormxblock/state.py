@@ -0,0 +1,302 @@
+"""
+In-memory SCORM status store backing the `raw_scorm_status` user state field
+
+The JSON blob is parsed at most once per block instance (i.e. per request)
+and serialized at most once, when the block is saved.  Values are read and
+written through the parsed object, which tracks whether it needs saving.
+
+Stored structure, as written by the SSLA player and the inline SCORM API:
+
+    {
+        "status": "incomplete",
+        "score": "80",
+        "scos": {
+            "<sco id>": {"data": {"cmi.core.lesson_status": "passed", ...}},
+            ...
+        }
+    }
+
+With compression enabled the field holds the JSON zlib-compressed and
+base64-wrapped behind a version prefix, see `encode`.  Either form is read
+transparently; a status stored in the other form is rewritten on save.
+"""
+import base64
+import binascii
+import copy
+import json
+import zlib
+
+
+COMPRESSED_PREFIX = 'z1:'
+# smaller statuses don't shrink enough to be worth compressing
+MIN_COMPRESS_SIZE = 256
+COMPRESS_LEVEL = 6
+
+
+def is_compressed(stored):
+    return bool(stored) and stored.startswith(COMPRESSED_PREFIX)
+
+
+def encode(text, compress=False):
+    """
+    return the stored form of a JSON status
+    """
+    if not compress or len(text) < MIN_COMPRESS_SIZE:
+        return text
+    if isinstance(text, unicode):
+        text = text.encode('utf-8')
+    return COMPRESSED_PREFIX + base64.b64encode(zlib.compress(text, COMPRESS_LEVEL))
+
+
+def decode(stored):
+    """
+    return the JSON text of a stored status, compressed or not
+    """
+    if not is_compressed(stored):
+        return stored
+    try:
+        return zlib.decompress(base64.b64decode(stored[len(COMPRESSED_PREFIX):])).decode('utf-8')
+    except (TypeError, binascii.Error, zlib.error, UnicodeDecodeError):
+        return '{}'
+
+
+def sizes(stored):
+    """
+    return the (stored, JSON, compressed) sizes in bytes of a stored status
+    """
+    text = decode(stored or '')
+    if isinstance(text, unicode):
+        text = text.encode('utf-8')
+    return len(stored or ''), len(text), len(encode(text, compress=True))
+
+
+class ScormState(object):
+
+    def __init__(self, raw='{}', compress=False):
+        # `raw` is the field value, which may be compressed; `_raw` is always JSON
+        self.compress = compress
+        self._stored = raw
+        self._raw = None if is_compressed(raw) else raw
+        self._data = None
+        self.dirty = False
+
+    @property
+    def data(self):
+        if self._data is None:
+            try:
+                raw = self.serialize()
+                self._data = json.loads(raw) if raw else {}
+            except ValueError:
+                self._data = {}
+            if not isinstance(self._data, dict):
+                self._data = {}
+        return self._data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        # the serialized form no longer matches the parsed data
+        self._raw = None
+        self._stored = None
+        self.dirty = True
+
+    def replace(self, raw, data=None):
+        """
+        replace the whole status with a serialized blob, parsed only if read;
+        pass `data` if the caller has already parsed it
+        """
+        self._raw = raw
+        self._stored = None
+        self._data = data if isinstance(data, dict) else None
+        self.dirty = True
+
+    def serialize(self):
+        """
+        return the status as JSON text
+        """
+        if self._raw is None:
+            if self._stored is not None:
+                self._raw = decode(self._stored)
+            else:
+                self._raw = json.dumps(self.data)
+        return self._raw
+
+    @property
+    def needs_migration(self):
+        """
+        True if the stored status isn't in the configured encoding
+        """
+        if self._stored is None:
+            return False
+        if is_compressed(self._stored):
+            return not self.compress
+        return self.compress and len(self._stored) >= MIN_COMPRESS_SIZE
+
+    def stored(self):
+        """
+        return the status as stored in the field, in the configured encoding
+        """
+        if self._stored is None or self.needs_migration:
+            self._stored = encode(self.serialize(), self.compress)
+        return self._stored
+
+    def saved(self):
+        self.dirty = False
+
+    @property
+    def scos(self):
+        return self.data.get('scos') or {}
+
+    def sco_data(self, sco_id):
+        return self.scos.get(sco_id, {}).get('data', {})
+
+    def set_sco_values(self, sco_id, values):
+        """
+        update CMI element values for one SCO
+        """
+        scos = self.data.setdefault('scos', {})
+        scos.setdefault(sco_id, {}).setdefault('data', {}).update(values)
+        self.mark_dirty()
+
+    def set_all_scos(self, key, value, overwrite=False):
+        """
+        set a value for a key on all scos
+        """
+        scos = self.scos
+        for sco in scos.values():
+            if key not in sco or overwrite:
+                sco[key] = value
+        if scos:
+            self.mark_dirty()
+
+    def patch(self, ops):
+        """
+        apply JSON-Patch style operations, see `apply_patch`.  nothing is applied
+        if an operation is invalid or the patched status isn't, see `validate`
+        """
+        # only operations on /scos, /scos/<id> or /scos/<id>/data can break the
+        # structure; patch a copy then, rather than copying on every delta
+        data = copy.deepcopy(self.data) if patched_scos(ops, depth=3) != set() else self.data
+        apply_patch(data, ops)
+        validate(data)
+        self._data = data
+        self.mark_dirty()
+
+    def etag(self):
+        """
+        strong validator for the serialized status, cheap to compute
+        """
+        raw = self.serialize()
+        if isinstance(raw, unicode):
+            raw = raw.encode('utf-8')
+        return '{:08x}'.format(zlib.crc32(raw) & 0xffffffff)
+
+    def cmi_value(self, name, sco_id, default=''):
+        """
+        return a CMI element value for a SCO; blank values count as unset
+        """
+        value = self.sco_data(sco_id).get(name)
+        if value is None or value == '':
+            return default
+        return value
+
+
+class PatchError(ValueError):
+    pass
+
+
+def _pointer_segments(path):
+    """
+    split a JSON pointer ("/scos/sco1/data/cmi.suspend_data") into keys
+    """
+    if not isinstance(path, basestring) or not path.startswith('/'):
+        raise PatchError('Invalid JSON pointer {!r}'.format(path))
+    return [segment.replace('~1', '/').replace('~0', '~') for segment in path[1:].split('/')]
+
+
+def patched_scos(ops, depth=None):
+    """
+    return the ids of SCOs touched by patch operations, or None if
+    an operation replaced the whole `scos` object.  with `depth`, only
+    operations on paths of at most that many segments count
+    """
+    sco_ids = set()
+    for op in ops:
+        try:
+            segments = _pointer_segments(op['path'])
+        except (KeyError, TypeError):
+            raise PatchError('Patch operations need an "op" and a "path"')
+        if segments[0] != 'scos' or (depth and len(segments) > depth):
+            continue
+        if len(segments) < 2:
+            return None
+        sco_ids.add(segments[1])
+    return sco_ids
+
+
+def validate(data):
+    """
+    raise PatchError unless `scos` is an object of SCO objects, each with an object of `data`
+    """
+    scos = data.get('scos')
+    if scos is None:
+        return
+    if not isinstance(scos, dict):
+        raise PatchError('"scos" must be an object')
+    for sco_id, sco in scos.items():
+        if not isinstance(sco, dict) or not isinstance(sco.get('data', {}), dict):
+            raise PatchError('SCO {!r} must be an object with an object of "data"'.format(sco_id))
+
+
+PATCH_OPS = ('add', 'replace', 'remove')
+
+
+def check_patch(ops):
+    """
+    raise PatchError unless every operation is a supported `op` on a valid
+    `path`, with a `value` where one is needed; return [(kind, segments, op)]
+    """
+    checked = []
+    for op in ops:
+        try:
+            kind, path = op['op'], op['path']
+        except (KeyError, TypeError):
+            raise PatchError('Patch operations need an "op" and a "path"')
+        if kind not in PATCH_OPS:
+            raise PatchError('Unsupported patch operation {!r}'.format(kind))
+        segments = _pointer_segments(path)
+        if kind != 'remove' and 'value' not in op:
+            raise PatchError('"{}" operation on {} has no value'.format(kind, path))
+        checked.append((kind, segments, op))
+    return checked
+
+
+def apply_patch(data, ops):
+    """
+    apply JSON-Patch style `add`, `replace` and `remove` operations to nested
+    objects in place.  missing intermediate objects are created by add/replace.
+    all operations are checked before any is applied, see `check_patch`
+    """
+    for kind, segments, op in check_patch(ops):
+        parent = data
+        for segment in segments[:-1]:
+            if kind == 'remove':
+                parent = parent.get(segment) if isinstance(parent, dict) else None
+                if parent is None:
+                    break
+            else:
+                child = parent.get(segment)
+                if not isinstance(child, dict):
+                    child = parent[segment] = {}
+                parent = child
+        if not isinstance(parent, dict):
+            continue
+        if kind == 'remove':
+            parent.pop(segments[-1], None)
+        else:
+            parent[segments[-1]] = op['value']
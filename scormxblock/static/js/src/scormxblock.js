@@ -1,83 +1,220 @@
 var csrftoken;
 
+// the SCORM API of every block on the page.  this file is included once per
+// block, so the one unload handler for the page is bound by the first copy;
+// it flushes each block's own pending values, once however many unload events fire
+var ScormXBlockAPIs = ScormXBlockAPIs || [];
+
+function ScormXBlockBindUnload() {
+  if (ScormXBlockAPIs.unloadBound) {
+    return;
+  }
+  ScormXBlockAPIs.unloadBound = true;
+  var flushed = false;
+  $(window).on('pagehide beforeunload', function() {
+    if (flushed) {
+      return;
+    }
+    flushed = true;
+    for (var i = 0; i < ScormXBlockAPIs.length; i++) {
+      ScormXBlockAPIs[i].flushOnUnload();
+    }
+    // timers only run if the page stays, e.g. leaving it was cancelled
+    setTimeout(function() {
+      flushed = false;
+    }, 0);
+  });
+  $(window).on('pageshow', function() {
+    flushed = false;
+  });
+}
+
 function ScormXBlock_${block_id}(runtime, element) {
 
   function SCORM_API(){
+    // client-side CMI data model: primed with one request at LMSInitialize,
+    // sets are buffered and sent in one batch on LMSCommit/LMSFinish or page unload
+    var cmi = {};
+    var pending = {};
+    // values sent but not acknowledged yet
+    var inflight = {};
+    // whether values were set since the last final commit, which may publish a held back grade
+    var finished = true;
+    var lastError = "0";
+    var commitUrl = runtime.handlerUrl(element, 'scorm_commit');
+    // browsers limit the body of keepalive requests, in flight together, to 64KB
+    var KEEPALIVE = !!(window.fetch && window.Request && 'keepalive' in Request.prototype);
+    var KEEPALIVE_MAX_SIZE = 60000;
+
+    var errorStrings = {
+      "0": "No error",
+      "101": "General exception",
+      "201": "Invalid argument error",
+      "301": "Not initialized"
+    };
+
+    function send(batch, final) {
+      var payload = JSON.stringify({'values': batch, 'final': !!final});
+      $.extend(inflight, batch);
+      if (final && KEEPALIVE && payload.length < KEEPALIVE_MAX_SIZE) {
+        // delivered by the browser even if the page goes away. unlike a beacon
+        // it carries the CSRF header the LMS handler view requires
+        fetch(commitUrl, {
+          method: 'POST',
+          body: payload,
+          keepalive: true,
+          credentials: 'same-origin',
+          headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrftoken}
+        }).then(function(response) {
+          if (!response.ok) {
+            throw new Error(response.statusText);
+          }
+          return response.json();
+        }).then(function(response) {
+          committed(batch, response);
+        }, function() {
+          failed(batch);
+        });
+        return;
+      }
+      $.ajax({
+        type: "POST",
+        url: commitUrl,
+        data: payload,
+        // without keepalive requests, a final commit has to complete before the page unloads
+        async: !final,
+        success: function(response){
+          committed(batch, response);
+        },
+        error: function(){
+          failed(batch);
+        }
+      });
+    }
+
+    function committed(batch, response) {
+      settled(batch);
+      if (typeof response.lesson_score != "undefined"){
+        $(".lesson_score", element).html(response.lesson_score);
+      }
+    }
+
+    function failed(batch) {
+      settled(batch);
+      // keep the failed values for the next commit, unless set again since
+      for (var key in batch) {
+        if (batch.hasOwnProperty(key) && !pending.hasOwnProperty(key)) {
+          pending[key] = batch[key];
+        }
+      }
+      finished = false;
+    }
+
+    function settled(batch) {
+      for (var key in batch) {
+        if (batch.hasOwnProperty(key) && inflight[key] === batch[key]) {
+          delete inflight[key];
+        }
+      }
+    }
+
+    function flush(final) {
+      // a final flush (LMSFinish, unload) sends again the values of requests still
+      // in flight, which the browser may cancel along with the page
+      var batch = final ? $.extend({}, inflight, pending) : pending;
+      var publish = final && !finished;
+      pending = {};
+      if (final) {
+        // set again if the final commit fails
+        finished = true;
+      }
+      if (!$.isEmptyObject(batch) || publish) {
+        send(batch, final);
+      }
+    }
+
+    function count(prefix) {
+      // number of entries in a CMI collection, e.g. cmi.interactions._count
+      var n = -1;
+      for (var key in cmi) {
+        if (cmi.hasOwnProperty(key) && key.indexOf(prefix) === 0) {
+          n = Math.max(n, parseInt(key.substr(prefix.length), 10));
+        }
+      }
+      return String(n + 1);
+    }
 
     this.LMSInitialize = function(){
-      console.log('LMSInitialize');
-      return true;
+      var response = $.ajax({
+        type: "POST",
+        url: runtime.handlerUrl(element, 'scorm_get_values'),
+        data: JSON.stringify({}),
+        async: false
+      });
+      try {
+        cmi = JSON.parse(response.responseText).values || {};
+      } catch (e) {
+        lastError = "101";
+        return "false";
+      }
+      lastError = "0";
+      return "true";
     };
 
     this.LMSFinish = function() {
-      console.log("LMSFinish");
+      flush(true);
       return "true";
     };
 
     this.LMSGetValue = function(cmi_element) {
-      console.log("Getvalue for " + cmi_element);
-      var handlerUrl = runtime.handlerUrl(element, 'scorm_get_value');
-
-      var response = $.ajax({
-        type: "POST",
-        url: handlerUrl,
-        data: JSON.stringify({'name': cmi_element}),
-        async: false
-      });
-      response = JSON.parse(response.responseText);
-      return response.value
+      lastError = "0";
+      if (/\._count$/.test(cmi_element)) {
+        return count(cmi_element.replace(/_count$/, ''));
+      }
+      var value = cmi[cmi_element];
+      return (value === undefined || value === null) ? "" : String(value);
     };
 
     this.LMSSetValue = function(cmi_element, value) {
-      console.log("LMSSetValue " + cmi_element + " = " + value);
-      var handlerUrl = runtime.handlerUrl( element, 'scorm_set_value');
-
-      if (cmi_element == 'cmi.core.lesson_status'||cmi_element == 'cmi.core.score.raw'){
-
-        $.ajax({
-          type: "POST",
-          url: handlerUrl,
-          data: JSON.stringify({'name': cmi_element, 'value': value}),
-          async: false,
-          success: function(response){
-            if (typeof response.lesson_score != "undefined"){
-              $(".lesson_score", element).html(response.lesson_score);
-            }
-          }
-        });
-
+      if (!cmi_element) {
+        lastError = "201";
+        return "false";
       }
-      return true;
+      lastError = "0";
+      cmi[cmi_element] = String(value);
+      pending[cmi_element] = String(value);
+      finished = false;
+      return "true";
     };
 
-    /*
-    TODO: this is all racoongang stubs
     this.LMSCommit = function() {
-        console.log("LMSCommit");
-        return "true";
+      flush(false);
+      return "true";
     };
 
     this.LMSGetLastError = function() {
-      console.log("GetLastError");
-      return "0";
+      return lastError;
     };
 
     this.LMSGetErrorString = function(errorCode) {
-      console.log("LMSGetErrorString");
-      return "Some Error";
+      return errorStrings[errorCode] || "";
     };
 
     this.LMSGetDiagnostic = function(errorCode) {
-      console.log("LMSGetDiagnostic");
-      return "Some Diagnostice";
-    }
-    */
+      return errorStrings[errorCode || lastError] || "";
+    };
+
+    this.flushOnUnload = function() {
+      flush(true);
+    };
 
   }
 
   $(function ($) {
+    csrftoken = $.cookie('csrftoken');
     API = new SCORM_API();
-    console.log("Initial SCORM data...");
+    ScormXBlockAPIs.push(API);
+    ScormXBlockBindUnload();
 
     //post message with data to player frame
     //player must be in an iframe and not a popup due to limitations in Internet Explorer's postMessage implementation
@@ -1,6 +1,209 @@
 function ScormStudioXBlock(runtime, element) {
 
   var handlerUrl = runtime.handlerUrl(element, 'studio_submit');
+  // a view of its own, see views.py; empty if the CMS URLconf doesn't include it
+  var importStatusUrl = $(element).find('.scorm-import-status').data('import-status-url');
+  var uploadInitUrl = runtime.handlerUrl(element, 'upload_init');
+  var uploadFinalizeUrl = runtime.handlerUrl(element, 'upload_finalize');
+  var POLL_INTERVAL = 2000;
+  var CHUNK_RETRIES = 5;
+  var RETRY_DELAY = 1000;
+  var STAGES = {
+    pending: 'Waiting to import package',
+    extracting: 'Reading package',
+    uploading: 'Uploading package files',
+    finalizing: 'Finishing import'
+  };
+
+  function showImportStatus(text) {
+    $(element).find('.scorm-import-status').text(text).toggle(!!text);
+  }
+
+  function importFailed(error) {
+    showImportStatus('');
+    runtime.notify('error', {title: 'SCORM package import failed', message: error || 'Unknown error'});
+  }
+
+  var CRC_TABLE = (function() {
+    var table = [];
+    for (var n = 0; n < 256; n++) {
+      var c = n;
+      for (var k = 0; k < 8; k++) {
+        c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+      }
+      table[n] = c >>> 0;
+    }
+    return table;
+  })();
+
+  // continues `crc` over `bytes`, like zlib.crc32(bytes, crc)
+  function crc32(bytes, crc) {
+    crc = (crc || 0) ^ -1;
+    for (var i = 0; i < bytes.length; i++) {
+      crc = (crc >>> 8) ^ CRC_TABLE[(crc ^ bytes[i]) & 0xFF];
+    }
+    return (crc ^ -1) >>> 0;
+  }
+
+  function readSlice(file, start, stop, callback) {
+    var reader = new FileReader();
+    reader.onload = function() { callback(new Uint8Array(reader.result)); };
+    reader.onerror = function() { importFailed('Could not read ' + file.name); };
+    reader.readAsArrayBuffer(file.slice(start, stop));
+  }
+
+  function postJSON(url, data, success, error) {
+    $.ajax({url: url, type: 'POST', data: JSON.stringify(data), dataType: 'json', success: success, error: error});
+  }
+
+  function resumeKey(file) {
+    return 'scormxblock-upload:' + uploadInitUrl + ':' + file.name + ':' + file.size + ':' + file.lastModified;
+  }
+
+  function storeUploadId(key, uploadId) {
+    try {
+      if (uploadId) {
+        window.localStorage.setItem(key, uploadId);
+      } else {
+        window.localStorage.removeItem(key);
+      }
+    } catch (e) {}
+  }
+
+  // sends a package in chunks, retrying failed ones and resuming from the offset the
+  // server has, even across page reloads; calls done(upload_id) once it is verified
+  function uploadPackage(file, done) {
+    var key = resumeKey(file);
+    var storedId = null;
+    try {
+      storedId = window.localStorage.getItem(key);
+    } catch (e) {}
+    var uploadId, chunkSize;
+    var attempts = 0;
+    // CRC-32 of the file up to crcOffset
+    var crc = 0, crcOffset = 0;
+
+    function retry(offset, error) {
+      attempts += 1;
+      if (attempts > CHUNK_RETRIES) {
+        importFailed(error || 'Package upload failed');
+      } else {
+        setTimeout(function() { sendChunk(offset); }, RETRY_DELAY * attempts);
+      }
+    }
+
+    // brings crc up to `offset`, when resuming an upload started elsewhere
+    function checksumTo(offset, callback) {
+      if (offset < crcOffset) {
+        crc = crcOffset = 0;
+      }
+      if (offset === crcOffset) {
+        callback();
+        return;
+      }
+      var stop = Math.min(offset, crcOffset + chunkSize);
+      readSlice(file, crcOffset, stop, function(bytes) {
+        crc = crc32(bytes, crc);
+        crcOffset = stop;
+        checksumTo(offset, callback);
+      });
+    }
+
+    function sendChunk(offset) {
+      if (offset >= file.size) {
+        checksumTo(file.size, finalize);
+        return;
+      }
+      showImportStatus('Uploading package (' + Math.floor(100 * offset / file.size) + '%)...');
+      checksumTo(offset, function() {
+        readSlice(file, offset, Math.min(offset + chunkSize, file.size), function(bytes) {
+          var query = $.param({upload_id: uploadId, offset: offset, crc32: crc32(bytes)});
+          $.ajax({
+            url: runtime.handlerUrl(element, 'upload_chunk', '', query),
+            type: 'POST',
+            data: bytes,
+            processData: false,
+            contentType: 'application/octet-stream',
+            dataType: 'json',
+            success: function(result) {
+              attempts = 0;
+              crc = crc32(bytes, crc);
+              crcOffset = offset + bytes.length;
+              sendChunk(result.offset);
+            },
+            error: function(xhr) {
+              var result = xhr.responseJSON || {};
+              if (xhr.status === 409 && typeof result.offset === 'number') {
+                // the server has a different part of the file, continue from there
+                sendChunk(result.offset);
+              } else {
+                retry(offset, result.error);
+              }
+            }
+          });
+        });
+      });
+    }
+
+    function finalize() {
+      postJSON(uploadFinalizeUrl, {upload_id: uploadId, crc32: crc}, function(result) {
+        if (result.result === 'success') {
+          showImportStatus('');
+          done(uploadId);
+        } else if (typeof result.offset === 'number') {
+          sendChunk(result.offset);
+        } else {
+          storeUploadId(key, null);
+          importFailed(result.error);
+        }
+      }, function() { retry(file.size); });
+    }
+
+    postJSON(uploadInitUrl, {upload_id: storedId, size: file.size, filename: file.name}, function(upload) {
+      if (upload.result !== 'success') {
+        importFailed(upload.error);
+        return;
+      }
+      uploadId = upload.upload_id;
+      chunkSize = upload.chunk_size;
+      storeUploadId(key, uploadId);
+      sendChunk(upload.offset);
+    }, function() { importFailed('Could not start the package upload'); });
+  }
+
+  // background imports report their progress until the block points at the new package
+  function pollImport(jobId) {
+    if (!importStatusUrl) {
+      showImportStatus('Importing package in the background, reopen this component to see the new package.');
+      runtime.notify('save', {state: 'end'});
+      return;
+    }
+    $.ajax({
+      url: importStatusUrl,
+      type: 'GET',
+      data: {job_id: jobId},
+      cache: false,
+      dataType: 'json',
+      success: function(status) {
+        if (status.state === 'succeeded') {
+          showImportStatus('');
+          runtime.notify('save', {state: 'end'});
+        } else if (status.state === 'failed' || status.state === 'unknown') {
+          importFailed(status.error);
+        } else {
+          var text = STAGES[status.stage || status.state] || STAGES.pending;
+          if (status.stage === 'uploading' && status.total) {
+            text += ' (' + status.done + '/' + status.total + ')';
+          }
+          showImportStatus(text + '...');
+          setTimeout(function() { pollImport(jobId); }, POLL_INTERVAL);
+        }
+      },
+      error: function() {
+        setTimeout(function() { pollImport(jobId); }, POLL_INTERVAL);
+      }
+    });
+  }
 
   $(element).find('.save-button').bind('click', function() {
     var form_data = new FormData();
@@ -14,7 +217,7 @@ function ScormStudioXBlock(runtime, element) {
     var scorm_player = $(element).find('select[name=scorm_player]').val();
     var encoding = $(element).find('select[name=encoding]').val();
     var player_configuration = $(element).find('textarea[name=player_configuration]').val();
-    form_data.append('file', file_data);
+    var package_version = $(element).find('select[name=package_version]').val() || '';
     form_data.append('display_name', display_name);
     form_data.append('description', description);
     form_data.append('display_width', display_width);
@@ -24,20 +227,47 @@ function ScormStudioXBlock(runtime, element) {
     form_data.append('scorm_player', scorm_player);
     form_data.append('encoding', encoding);
     form_data.append('player_configuration', player_configuration);
+    form_data.append('package_version', package_version);
     runtime.notify('save', {state: 'start'});
 
-    $.ajax({
-      url: handlerUrl,
-      dataType: 'text',
-      cache: false,
-      contentType: false,
-      processData: false,
-      data: form_data,
-      type: "POST",
-      success: function(response){
-        runtime.notify('save', {state: 'end'});
-      }
-    });
+    function submit() {
+      $.ajax({
+        url: handlerUrl,
+        dataType: 'text',
+        cache: false,
+        contentType: false,
+        processData: false,
+        data: form_data,
+        type: "POST",
+        success: function(response){
+          var result = {};
+          try {
+            result = JSON.parse(response);
+          } catch (e) {}
+          if (file_data) {
+            // the upload is consumed by studio_submit either way
+            storeUploadId(resumeKey(file_data), null);
+          }
+          if (result.result === 'pending') {
+            showImportStatus(STAGES.pending + '...');
+            pollImport(result.job_id);
+          } else if (result.result === 'failure') {
+            importFailed(result.error);
+          } else {
+            runtime.notify('save', {state: 'end'});
+          }
+        }
+      });
+    }
+
+    if (file_data) {
+      uploadPackage(file_data, function(uploadId) {
+        form_data.append('upload_id', uploadId);
+        submit();
+      });
+    } else {
+      submit();
+    }
 
   });
 
@@ -0,0 +1,338 @@
+"""
+Storage adapters for SCORM package content
+
+One adapter (wrapping one Django storage instance) is kept per configured
+SCORM_FILE_STORAGE_TYPE, so S3 connections and sessions are reused between
+requests.  Adapters add the bulk operations needed when replacing packages.
+"""
+import functools
+import importlib
+import io
+import logging
+import os
+import shutil
+import threading
+from multiprocessing.pool import ThreadPool
+
+from django.core.files.base import ContentFile
+from django.utils import encoding
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORAGE_TYPE = "django.core.files.storage.default_storage"
+DEFAULT_SAVE_CONCURRENCY = 4
+S3_DELETE_BATCH_SIZE = 1000  # maximum keys per S3 multi-object delete
+
+_adapters = {}
+_adapters_lock = threading.Lock()
+
+
+class LimitedReader(object):
+    """
+    file-like view of the next `length` bytes of an open file
+    """
+    def __init__(self, fh, length):
+        self.fh = fh
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fh.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fh.close()
+
+
+class ScormStorage(object):
+    """
+    generic adapter over any Django storage, using only the Storage API
+    """
+    def __init__(self, storage):
+        self.storage = storage
+
+    def exists(self, name):
+        return self.storage.exists(name)
+
+    def url(self, name):
+        return self.storage.url(name)
+
+    def open(self, name, mode='rb'):
+        return self.storage.open(name, mode)
+
+    def size(self, name):
+        return self.storage.size(name)
+
+    def modified_time(self, name):
+        """
+        return the last modification time of a file, or None if the storage can't tell
+        """
+        get_modified_time = getattr(self.storage, 'get_modified_time', self.storage.modified_time)
+        try:
+            return get_modified_time(name)
+        except NotImplementedError:
+            return None
+
+    def local_path(self, name):
+        """
+        return the path of a file on the local filesystem, or None for remote storages
+        """
+        return None
+
+    def open_range(self, name, start, length):
+        """
+        return a file-like object reading `length` bytes of a file from offset `start`
+        """
+        fh = self.storage.open(name, 'rb')
+        fh.seek(start)
+        return LimitedReader(fh, length)
+
+    def delete(self, name):
+        self.storage.delete(name)
+
+    def save(self, name, content):
+        return self.storage.save(name, content)
+
+    def write(self, name, data):
+        """
+        store `data` at exactly `name`, replacing any existing file
+        """
+        if self.storage.exists(name):
+            self.storage.delete(name)
+        return self.storage.save(name, ContentFile(data))
+
+    def read(self, name):
+        fh = self.storage.open(name, 'rb')
+        try:
+            return fh.read()
+        finally:
+            fh.close()
+
+    def copy(self, src_name, dest_name):
+        """
+        copy a stored file, replacing any existing file at `dest_name`
+        """
+        if self.storage.exists(dest_name):
+            self.storage.delete(dest_name)
+        fh = self.storage.open(src_name, 'rb')
+        try:
+            return self.storage.save(dest_name, fh)
+        finally:
+            fh.close()
+
+    def list_prefix(self, prefix):
+        """
+        yield the names of all files stored under `prefix`
+        """
+        dirs, files = self.storage.listdir(prefix)
+        for f in files:
+            yield '/'.join((prefix, f))
+        for d in dirs:
+            for name in self.list_prefix('/'.join((prefix, d))):
+                yield name
+
+    def list_prefix_sizes(self, prefix):
+        """
+        yield (name, size) for all files stored under `prefix`
+        """
+        for name in self.list_prefix(prefix):
+            yield name, self.size(name)
+
+    def list_dirs(self, prefix):
+        """
+        return the names of the directories directly under `prefix`
+        """
+        return self.storage.listdir(prefix)[0]
+
+    def delete_many(self, names):
+        for name in names:
+            self.storage.delete(name)
+
+    def delete_prefix(self, prefix):
+        self.delete_many(list(self.list_prefix(prefix)))
+
+    def _save_one(self, item, on_saved=None):
+        name, open_content = item
+        fh = open_content()
+        try:
+            stored_name = self.save(name, fh)
+        except encoding.DjangoUnicodeDecodeError as e:
+            logger.warn('SCORM XBlock Couldn\'t store file {} to storage. {}'.format(name, e))
+            stored_name = None
+        finally:
+            fh.close()
+        if on_saved is not None:
+            on_saved(name, stored_name)
+        return stored_name
+
+    def save_many(self, items, concurrency=DEFAULT_SAVE_CONCURRENCY, on_saved=None):
+        """
+        save files concurrently; `items` is an iterable of (name, open_content)
+        where `open_content` is a callable returning a readable file object.
+        `on_saved(name, stored_name)` is called as each file completes.
+        return the list of stored names, None for files which couldn't be stored
+        """
+        save_one = functools.partial(self._save_one, on_saved=on_saved)
+        if concurrency <= 1:
+            return [save_one(item) for item in items]
+        pool = ThreadPool(concurrency)
+        try:
+            return pool.map(save_one, items)
+        finally:
+            pool.close()
+            pool.join()
+
+
+class FileSystemScormStorage(ScormStorage):
+    """
+    adapter for FileSystemStorage and subclasses
+    """
+    def list_prefix(self, prefix):
+        root = self.storage.path(prefix)
+        for (dirpath, dirnames, files) in os.walk(root):
+            rel_dir = os.path.relpath(dirpath, self.storage.location)
+            for f in files:
+                yield os.path.join(rel_dir, f).replace(os.sep, '/')
+
+    def list_prefix_sizes(self, prefix):
+        for name in self.list_prefix(prefix):
+            yield name, os.path.getsize(self.storage.path(name))
+
+    def delete_prefix(self, prefix):
+        shutil.rmtree(self.storage.path(prefix), ignore_errors=True)
+
+    def local_path(self, name):
+        return self.storage.path(name)
+
+    def copy(self, src_name, dest_name):
+        # hard link where possible so shared content takes no extra space
+        src_path = self.storage.path(src_name)
+        dest_path = self.storage.path(dest_name)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        dest_dir = os.path.dirname(dest_path)
+        if not os.path.isdir(dest_dir):
+            try:
+                os.makedirs(dest_dir)
+            except OSError:
+                if not os.path.isdir(dest_dir):  # created concurrently
+                    raise
+        try:
+            os.link(src_path, dest_path)
+        except (OSError, AttributeError):
+            shutil.copyfile(src_path, dest_path)
+        return dest_name
+
+
+class S3ScormStorage(ScormStorage):
+    """
+    adapter for S3 storages exposing a `bucket`, either boto (s3boto) or boto3 (s3boto3)
+    """
+    @property
+    def bucket(self):
+        return self.storage.bucket
+
+    def _key_name(self, name):
+        location = getattr(self.storage, 'location', '')
+        return '/'.join((location.strip('/'), name)) if location else name
+
+    def _name(self, key_name):
+        location = getattr(self.storage, 'location', '')
+        return key_name[len(location.strip('/')) + 1:] if location else key_name
+
+    def list_prefix(self, prefix):
+        key_prefix = self._key_name(prefix).rstrip('/') + '/'
+        if hasattr(self.bucket, 'objects'):
+            keys = (obj.key for obj in self.bucket.objects.filter(Prefix=key_prefix))
+        else:
+            keys = (key.name for key in self.bucket.list(prefix=key_prefix))
+        for key_name in keys:
+            yield self._name(key_name)
+
+    def list_prefix_sizes(self, prefix):
+        # sizes come with the listing, without a request per object
+        key_prefix = self._key_name(prefix).rstrip('/') + '/'
+        if hasattr(self.bucket, 'objects'):
+            keys = ((obj.key, obj.size) for obj in self.bucket.objects.filter(Prefix=key_prefix))
+        else:
+            keys = ((key.name, key.size) for key in self.bucket.list(prefix=key_prefix))
+        for key_name, size in keys:
+            yield self._name(key_name), size
+
+    def copy(self, src_name, dest_name):
+        # server-side copy, no content passes through the LMS.  S3 doesn't copy the
+        # ACL, so copies get the storage's own, as saves do (e.g. public-read for storage.url)
+        src_key = self._key_name(src_name)
+        dest_key = self._key_name(dest_name)
+        acl = getattr(self.storage, 'default_acl', None)
+        if hasattr(self.bucket, 'copy'):
+            self.bucket.copy({'Bucket': self.bucket.name, 'Key': src_key}, dest_key,
+                             ExtraArgs={'ACL': acl} if acl else None)
+        else:
+            self.bucket.copy_key(dest_key, self.bucket.name, src_key,
+                                 headers={'x-amz-acl': acl} if acl else None)
+        return dest_name
+
+    def open_range(self, name, start, length):
+        # ranged GET, rather than downloading the whole object to seek in it
+        if not length:
+            return io.BytesIO(b'')
+        byte_range = 'bytes={}-{}'.format(start, start + length - 1)
+        if hasattr(self.bucket, 'Object'):
+            return self.bucket.Object(self._key_name(name)).get(Range=byte_range)['Body']
+        key = self.bucket.get_key(self._key_name(name))
+        key.open_read(headers={'Range': byte_range})
+        return key
+
+    def delete_many(self, names):
+        key_names = [self._key_name(name) for name in names]
+        for start in range(0, len(key_names), S3_DELETE_BATCH_SIZE):
+            batch = key_names[start:start + S3_DELETE_BATCH_SIZE]
+            if hasattr(self.bucket, 'delete_objects'):
+                self.bucket.delete_objects(Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True})
+            else:
+                self.bucket.delete_keys(batch, quiet=True)
+
+
+def _load_storage(storage_type):
+    mod, store_class = storage_type.rsplit('.', 1)
+    storage_module = importlib.import_module(mod)
+    storage_class = getattr(storage_module, store_class)
+    if storage_type.endswith('default_storage'):
+        return storage_class
+    return storage_class()
+
+
+def adapter_for(storage):
+    """
+    wrap a Django storage in the most capable adapter for it
+    """
+    if hasattr(storage, 'bucket'):
+        return S3ScormStorage(storage)
+    try:
+        storage.path('')
+    except (NotImplementedError, AttributeError):
+        return ScormStorage(storage)
+    return FileSystemScormStorage(storage)
+
+
+def get_storage(storage_type=DEFAULT_STORAGE_TYPE):
+    """
+    return the shared adapter for a storage class path, creating it on first use
+    """
+    try:
+        return _adapters[storage_type]
+    except KeyError:
+        pass
+    with _adapters_lock:
+        if storage_type not in _adapters:
+            _adapters[storage_type] = adapter_for(_load_storage(storage_type))
+        return _adapters[storage_type]
+
+
+def reset_storages():
+    with _adapters_lock:
+        _adapters.clear()
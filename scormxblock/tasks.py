@@ -0,0 +1,19 @@
+"""
+Celery tasks, found by task autodiscovery once `scormxblock` is in INSTALLED_APPS
+"""
+try:
+    from celery import shared_task
+except ImportError:
+    from celery.task import task as shared_task
+
+import jobs
+
+
+@shared_task(bind=True, name='scormxblock.tasks.import_package', max_retries=jobs.SAVE_RETRIES)
+def import_package(self, job_id, usage_id, user_id):
+    """
+    run a background package import, see jobs.py
+    """
+    def retry(delay):
+        raise self.retry(countdown=delay)
+    jobs.run_import(job_id, usage_id, user_id, self.request.retries, retry)
@@ -0,0 +1,57 @@
+"""
+Small process-wide cache shared by the settings, file manifest and launch context caches
+
+Entries are kept for `ttl` seconds, or until invalidated when no TTL is
+given.  The cache is cleared whenever it grows past `size` entries, which
+is cheaper than tracking recency and fine for the small working sets here.
+"""
+import threading
+import time
+
+
+class TTLCache(object):
+    """
+    thread-safe dict of built values with an optional TTL and hit/miss counters
+    """
+    def __init__(self, size=None):
+        self.size = size
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build, ttl=None):
+        """
+        return the value cached for `key`, calling `build()` to make it if missing or expired.
+        a `ttl` of 0 disables caching; None values are never cached
+        """
+        if ttl == 0:
+            return build()
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and (entry[0] is None or entry[0] > now):
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        value = build()
+        if value is None:
+            return value
+        with self._lock:
+            if self.size and len(self._entries) >= self.size:
+                self._entries.clear()
+            self._entries[key] = (None if ttl is None else now + ttl, value)
+        return value
+
+    def invalidate(self, match=None):
+        """
+        drop the entries whose key `match(key)` accepts, or all of them
+        """
+        with self._lock:
+            if match is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if match(key)]:
+                    del self._entries[key]
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
@@ -0,0 +1,198 @@
+"""
+Chunked, resumable package uploads
+
+Studio sends a package in chunks appended at an expected offset to a spool
+file under SCORM_UPLOAD_DIR, so a dropped connection only costs the chunk in
+flight.  Each chunk carries its CRC-32, and the whole file's CRC-32 is
+checked when the upload is finalized.  A sidecar JSON file records the
+declared size, the bytes received and the running CRC-32:
+
+    {"size": 1048576000, "received": 52428800, "crc32": 123456789,
+     "filename": "course.zip", "complete": false}
+
+The spool directory must be shared by Studio processes handling the same
+upload (a local directory on a single Studio host, or a shared volume).
+Appends and finalizing hold an exclusive lock on the spool file, so two
+requests for the same upload can't both write at the offset they checked.
+"""
+import contextlib
+import fcntl
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+import zlib
+
+
+DEFAULT_CHUNK_SIZE = 5 * 1024 * 1024
+COPY_CHUNK_SIZE = 64 * 1024
+# unfinished uploads older than this are removed
+MAX_AGE = 24 * 60 * 60
+UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def default_upload_dir():
+    return os.path.join(tempfile.gettempdir(), 'scormxblock-uploads')
+
+
+class UploadError(Exception):
+    """
+    a chunked upload request which can't be honoured; `status` is the HTTP status to answer with
+    """
+    def __init__(self, message, status=400, offset=None):
+        super(UploadError, self).__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def crc32(data, value=0):
+    return zlib.crc32(data, value) & 0xffffffff
+
+
+class ChunkedUpload(object):
+
+    def __init__(self, upload_dir, upload_id):
+        if not UPLOAD_ID.match(upload_id or ''):
+            raise UploadError('Invalid upload id')
+        self.upload_id = upload_id
+        self.path = os.path.join(upload_dir, upload_id + '.part')
+        self.meta_path = os.path.join(upload_dir, upload_id + '.json')
+        self._load_meta()
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path) as meta_file:
+                self.meta = json.load(meta_file)
+        except (IOError, ValueError):
+            raise UploadError('Unknown upload {}'.format(self.upload_id), status=404)
+
+    @classmethod
+    def create(cls, upload_dir, size, filename='', max_size=None):
+        """
+        start an upload of `size` bytes, refused if larger than `max_size`
+        """
+        if size < 0:
+            raise UploadError('Invalid upload size')
+        if max_size and size > max_size:
+            raise UploadError('Package is larger than the {} byte limit'.format(max_size), status=413)
+        if not os.path.isdir(upload_dir):
+            try:
+                os.makedirs(upload_dir)
+            except OSError:
+                if not os.path.isdir(upload_dir):  # created concurrently
+                    raise
+        sweep(upload_dir)
+        upload_id = uuid.uuid4().hex
+        open(os.path.join(upload_dir, upload_id + '.part'), 'wb').close()
+        cls._write_meta(os.path.join(upload_dir, upload_id + '.json'), {
+            'size': size, 'received': 0, 'crc32': 0, 'filename': filename, 'complete': False,
+        })
+        return cls(upload_dir, upload_id)
+
+    @staticmethod
+    def _write_meta(meta_path, meta):
+        # write then rename, so a crash never leaves a truncated sidecar
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.rename(tmp_path, meta_path)
+
+    @property
+    def offset(self):
+        return self.meta['received']
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        open the spool file with an exclusive lock, and the sidecar as it is under the lock
+        """
+        try:
+            part = open(self.path, 'r+b')
+        except IOError:
+            raise UploadError('Unknown upload {}'.format(self.upload_id), status=404)
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            self._load_meta()
+            yield part
+        finally:
+            # closing releases the lock
+            part.close()
+
+    def append(self, offset, stream, length, chunk_crc32):
+        """
+        append `length` bytes read from `stream` at `offset`, which must be the
+        number of bytes received so far; the chunk is dropped if its CRC-32 doesn't match
+        """
+        with self._locked() as part:
+            if self.meta['complete']:
+                raise UploadError('Upload is already complete', status=409, offset=self.offset)
+            if offset != self.offset:
+                raise UploadError('Expected offset {}'.format(self.offset), status=409, offset=self.offset)
+            if offset + length > self.meta['size']:
+                raise UploadError('Chunk goes past the declared upload size')
+
+            value = 0
+            running = self.meta['crc32']
+            received = 0
+            part.seek(offset)
+            part.truncate()
+            while received < length:
+                data = stream.read(min(COPY_CHUNK_SIZE, length - received))
+                if not data:
+                    break
+                part.write(data)
+                value = crc32(data, value)
+                running = crc32(data, running)
+                received += len(data)
+            if received != length or value != chunk_crc32:
+                part.truncate(offset)
+                raise UploadError('Chunk at offset {} was corrupted, send it again'.format(offset),
+                                  offset=self.offset)
+            part.flush()
+            self.meta.update(received=offset + length, crc32=running)
+            self._write_meta(self.meta_path, self.meta)
+            return self.offset
+
+    def finalize(self, file_crc32):
+        """
+        check that the whole file arrived intact
+        """
+        with self._locked():
+            if self.offset != self.meta['size']:
+                raise UploadError('Upload is incomplete, {} of {} bytes received'.format(
+                    self.offset, self.meta['size']), status=409, offset=self.offset)
+            if file_crc32 != self.meta['crc32']:
+                raise UploadError('Upload checksum mismatch')
+            self.meta['complete'] = True
+            self._write_meta(self.meta_path, self.meta)
+
+    def open(self):
+        """
+        return the uploaded file, once finalized
+        """
+        if not self.meta['complete']:
+            raise UploadError('Upload has not been finalized', status=409, offset=self.offset)
+        return open(self.path, 'rb')
+
+    def delete(self):
+        for path in (self.path, self.meta_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def sweep(upload_dir, max_age=MAX_AGE):
+    """
+    remove uploads not touched for `max_age` seconds
+    """
+    cutoff = time.time() - max_age
+    for name in os.listdir(upload_dir):
+        path = os.path.join(upload_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,13 @@
+"""
+URLs of the SCORM XBlock views, for the CMS URLconf:
+
+    url(r'^scormxblock/', include('scormxblock.urls')),
+"""
+from django.conf.urls import url
+
+import views
+
+
+urlpatterns = [
+    url(r'^import_status$', views.import_status, name='scormxblock_import_status'),
+]
@@ -0,0 +1,20 @@
+"""
+Django views of the SCORM XBlock, served by Studio once `scormxblock.urls`
+is included in the CMS URLconf (see README)
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+
+import jobs
+
+
+@login_required
+@require_GET
+@never_cache
+def import_status(request):
+    """
+    status of a background package import, polled by Studio, see jobs.py
+    """
+    return JsonResponse(jobs.get_status(request.GET.get('job_id')) or {'state': 'unknown'})
@@ -28,6 +28,8 @@ setup(
     description='XBlock to integrate SCORM content packages',
     packages=[
         'scormxblock',
+        'scormxblock.management',
+        'scormxblock.management.commands',
     ],
     install_requires=[
         'XBlock',
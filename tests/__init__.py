@@ -0,0 +1,26 @@
+"""
+Tests of the SCORM XBlock's handlers and its storage, import, state and serving code
+
+Run from the repository root, in an environment with the edx-platform
+packages the XBlock imports:
+
+    python -m unittest discover -s tests -t .
+"""
+import tempfile
+
+from django.conf import settings
+
+
+if not settings.configured:
+    settings.configure(
+        MEDIA_ROOT=tempfile.mkdtemp(prefix='scormxblock-tests-'),
+        MEDIA_URL='/media/',
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        XBLOCK_SETTINGS={'ScormXBlock': {}},
+        HTTPS='off',
+        ENV_TOKENS={'LMS_BASE': 'lms.example.com'},
+        FEATURES={},
+        ROOT_URLCONF='scormxblock.urls',
+    )
+    import django
+    django.setup()
@@ -0,0 +1,136 @@
+"""
+A SCORM XBlock in a minimal XBlock runtime, to call its views and handlers
+
+Every call gets a new block instance over the same field data, as every LMS
+or Studio request does, and the events the block publishes are recorded.
+Blocks built for Studio and the LMS share the settings scope fields; user
+state fields are kept per learner.
+"""
+import json
+import unittest
+import uuid
+
+from django.test.utils import override_settings
+from webob import Request
+from xblock.fields import ScopeIds
+from xblock.runtime import DictKeyValueStore, KvsFieldData, MemoryIdManager, Runtime
+
+from scormxblock import ScormXBlock, assets, launch
+
+from tests.utils import MANIFEST, make_zip
+
+
+USER_ID = 7
+PACKAGE = {'imsmanifest.xml': MANIFEST, 'index.html': 'lesson'}
+STUDIO_PARAMS = {
+    'display_name': 'SCORM',
+    'description': '',
+    'weight': '1',
+    'display_width': '800',
+    'display_height': '400',
+    'display_type': 'iframe',
+    'scorm_player': 'SCORM_PKG_INTERNAL',
+    'encoding': 'cp850',
+    'player_configuration': '',
+}
+
+
+class CourseKey(object):
+    org = 'Org'
+
+    def __unicode__(self):
+        return u'course-v1:Org+SCORM+Run'
+
+    __str__ = __unicode__
+
+
+class Location(object):
+
+    def __init__(self, block_id):
+        self.block_id = block_id
+        self.course_key = CourseKey()
+
+    def __unicode__(self):
+        return u'block-v1:Org+SCORM+Run+type@scormxblock+block@{}'.format(self.block_id)
+
+    __str__ = __unicode__
+
+
+class TestRuntime(Runtime):
+    """
+    runtime recording published events, with handler URLs /handler/<name>[/<suffix>]
+    """
+    course_id = CourseKey()
+    anonymous_student_id = 'anonymous-student'
+    get_real_user = None
+
+    def __init__(self, field_data, published):
+        ids = MemoryIdManager()
+        super(TestRuntime, self).__init__(ids, field_data, services={}, id_generator=ids)
+        self.published = published
+
+    def handler_url(self, block, handler_name, suffix='', query='', thirdparty=False):
+        url = u'/handler/{}'.format(handler_name)
+        if suffix:
+            url += u'/' + suffix
+        return url + (u'?' + query if query else u'')
+
+    def resource_url(self, resource):
+        return resource
+
+    def local_resource_url(self, block, uri):
+        return uri
+
+    def publish(self, block, event_type, event_data):
+        self.published.append((event_type, event_data))
+
+
+class BlockTestCase(unittest.TestCase):
+    """
+    test case with a SCORM block stored under a block id of its own.
+    `xblock_settings` are the platform XBLOCK_SETTINGS of the block
+    """
+    xblock_settings = {}
+
+    def setUp(self):
+        self.block_id = uuid.uuid4().hex
+        self.kvs = DictKeyValueStore()
+        self.published = []
+        xblock_settings = dict({'SCORM_SETTINGS_CACHE_TTL': 0}, **self.xblock_settings)
+        override = override_settings(XBLOCK_SETTINGS={'ScormXBlock': xblock_settings})
+        override.enable()
+        self.addCleanup(override.disable)
+        launch.launch_contexts.invalidate()
+        assets.file_manifests.invalidate()
+
+    def block(self, user_id=USER_ID):
+        runtime = TestRuntime(KvsFieldData(self.kvs), self.published)
+        block = ScormXBlock(runtime, scope_ids=ScopeIds(user_id, 'scormxblock', self.block_id, self.block_id))
+        block.location = Location(self.block_id)
+        block.url_name = self.block_id
+        return block
+
+    def grades(self):
+        return [event for event_type, event in self.published if event_type == 'grade']
+
+    def handle(self, handler, body=None, method='POST', suffix='', user_id=USER_ID, **kwargs):
+        if body is not None:
+            kwargs['body'] = body
+        request = Request.blank('/', method=method, **kwargs)
+        return self.block(user_id).handle(handler, request, suffix)
+
+    def call(self, handler, data, user_id=USER_ID):
+        """
+        call a JSON handler, return its decoded response
+        """
+        return json.loads(self.handle(handler, json.dumps(data), user_id=user_id).body)
+
+    def studio_submit(self, files=None, **params):
+        """
+        save the Studio form, with a package zip of `files` if given
+        """
+        post = dict(STUDIO_PARAMS, **params)
+        if files is not None:
+            post['file'] = ('package.zip', make_zip(files))
+        request = Request.blank('/', POST=post)
+        return json.loads(self.block().handle('studio_submit', request).body)
@@ -0,0 +1,173 @@
+"""
+In-memory S3 buckets in the shape of the boto and boto3 APIs the storage
+adapters use, and a Django storage over them exposing `bucket` like
+django-storages' s3boto and s3boto3 backends
+
+Buckets record the bulk requests made, so tests can check batching and that
+copies never read content through the LMS.
+"""
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+
+
+class FakeBucket(object):
+
+    name = 'scorm-bucket'
+
+    def __init__(self):
+        self.data = {}
+        self.delete_requests = []
+        self.copies = []
+        self.copy_acls = []
+        self.ranges = []
+
+    def _range(self, key, byte_range):
+        self.ranges.append((key, byte_range))
+        start, stop = byte_range[len('bytes='):].split('-')
+        return self.data[key][int(start):int(stop) + 1]
+
+
+class Boto3Object(object):
+
+    def __init__(self, bucket, key):
+        self.bucket = bucket
+        self.key = key
+
+    @property
+    def size(self):
+        return len(self.bucket.data[self.key])
+
+    def get(self, Range=None):
+        data = self.bucket._range(self.key, Range) if Range else self.bucket.data[self.key]
+        return {'Body': io.BytesIO(data)}
+
+
+class Boto3Objects(object):
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def filter(self, Prefix=''):
+        return [Boto3Object(self.bucket, key) for key in sorted(self.bucket.data) if key.startswith(Prefix)]
+
+
+class Boto3Bucket(FakeBucket):
+    """
+    the parts of a boto3 `s3.Bucket` resource the adapters use
+    """
+    def __init__(self):
+        super(Boto3Bucket, self).__init__()
+        self.objects = Boto3Objects(self)
+
+    def Object(self, key):
+        return Boto3Object(self, key)
+
+    def copy(self, source, key, ExtraArgs=None):
+        self.copies.append((source['Key'], key))
+        self.copy_acls.append((ExtraArgs or {}).get('ACL'))
+        self.data[key] = self.data[source['Key']]
+
+    def delete_objects(self, Delete):
+        keys = [obj['Key'] for obj in Delete['Objects']]
+        self.delete_requests.append(keys)
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class BotoKey(object):
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self._fh = None
+
+    @property
+    def size(self):
+        return len(self.bucket.data[self.name])
+
+    def open_read(self, headers=None):
+        byte_range = (headers or {}).get('Range')
+        data = self.bucket._range(self.name, byte_range) if byte_range else self.bucket.data[self.name]
+        self._fh = io.BytesIO(data)
+
+    def read(self, size=0):
+        if self._fh is None:
+            self.open_read()
+        return self._fh.read(size or -1)
+
+    def close(self):
+        self._fh = None
+
+
+class BotoBucket(FakeBucket):
+    """
+    the parts of a boto `Bucket` the adapters use
+    """
+    def list(self, prefix=''):
+        return [BotoKey(self, key) for key in sorted(self.data) if key.startswith(prefix)]
+
+    def get_key(self, name):
+        return BotoKey(self, name) if name in self.data else None
+
+    def copy_key(self, new_key_name, src_bucket_name, src_key_name, headers=None):
+        self.copies.append((src_key_name, new_key_name))
+        self.copy_acls.append((headers or {}).get('x-amz-acl'))
+        self.data[new_key_name] = self.data[src_key_name]
+
+    def delete_keys(self, keys, quiet=False):
+        self.delete_requests.append(list(keys))
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class FakeS3Storage(Storage):
+    """
+    Django storage over a fake bucket; like S3 storages it overwrites on save
+    and has no local paths
+    """
+    def __init__(self, bucket, location='', default_acl=None):
+        self.bucket = bucket
+        self.location = location
+        self.default_acl = default_acl
+        self.opened = []
+
+    def _key(self, name):
+        return '/'.join((self.location, name)) if self.location else name
+
+    def _open(self, name, mode='rb'):
+        self.opened.append(name)
+        return ContentFile(self.bucket.data[self._key(name)], name=name)
+
+    def _save(self, name, content):
+        content.seek(0)
+        self.bucket.data[self._key(name)] = content.read()
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def exists(self, name):
+        return self._key(name) in self.bucket.data
+
+    def delete(self, name):
+        self.bucket.data.pop(self._key(name), None)
+
+    def size(self, name):
+        return len(self.bucket.data[self._key(name)])
+
+    def url(self, name):
+        return 'https://{}.s3.amazonaws.com/{}'.format(self.bucket.name, self._key(name))
+
+    def listdir(self, path):
+        prefix = self._key(path).rstrip('/') + '/'
+        dirs, files = set(), []
+        for key in self.bucket.data:
+            if key.startswith(prefix):
+                rest = key[len(prefix):]
+                if '/' in rest:
+                    dirs.add(rest.split('/', 1)[0])
+                else:
+                    files.append(rest)
+        return sorted(dirs), sorted(files)
@@ -0,0 +1,94 @@
+"""
+Tests of the cached staff access checks
+"""
+import sys
+import types
+import unittest
+
+from django.core.cache import cache
+
+from scormxblock import access
+
+
+COURSE_KEY = u'course-v1:Org+SCORM+Run'
+
+
+class User(object):
+    def __init__(self, user_id, authenticated=True):
+        self.id = user_id
+        self.authenticated = authenticated
+
+    def is_authenticated(self):
+        return self.authenticated
+
+
+class InstructorAccessTest(unittest.TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.request = {}
+        request_data = access.request_data
+        access.request_data = lambda key: self.request.setdefault(key, {})
+        self.addCleanup(setattr, access, 'request_data', request_data)
+
+        # the LMS role check, answering from self.instructors
+        self.instructors = set()
+        self.checks = []
+        courseware = types.ModuleType('courseware')
+        courseware.access = types.ModuleType('courseware.access')
+        courseware.access.has_access = self.has_access
+        for name, module in (('courseware', courseware), ('courseware.access', courseware.access)):
+            self.addCleanup(sys.modules.pop, name, None)
+            sys.modules[name] = module
+
+    def has_access(self, user, action, course_key):
+        self.checks.append((user.id, action, course_key))
+        return user.id in self.instructors
+
+    def test_checked_once_per_request(self):
+        self.instructors.add(1)
+        self.assertTrue(access.has_instructor_access(User(1), COURSE_KEY))
+        cache.clear()
+        self.assertTrue(access.has_instructor_access(User(1), COURSE_KEY))
+        self.assertEqual(self.checks, [(1, 'instructor', COURSE_KEY)])
+
+    def test_cached_across_requests(self):
+        self.assertFalse(access.has_instructor_access(User(1), COURSE_KEY))
+        self.request.clear()
+        self.instructors.add(1)
+        self.assertFalse(access.has_instructor_access(User(1), COURSE_KEY))
+        self.assertEqual(len(self.checks), 1)
+
+    def test_ttl_zero_skips_django_cache(self):
+        access.has_instructor_access(User(1), COURSE_KEY, ttl=0)
+        self.request.clear()
+        self.instructors.add(1)
+        self.assertTrue(access.has_instructor_access(User(1), COURSE_KEY, ttl=0))
+
+    def test_role_change_invalidates(self):
+        self.assertFalse(access.has_instructor_access(User(1), COURSE_KEY))
+        self.assertFalse(access.has_instructor_access(User(2), COURSE_KEY))
+        self.instructors.update((1, 2))
+        role = type('CourseAccessRole', (object,), {'user_id': 1, 'course_id': COURSE_KEY})()
+        access._invalidate_on_role_change(None, role)
+        self.assertTrue(access.has_instructor_access(User(1), COURSE_KEY))
+        self.assertFalse(access.has_instructor_access(User(2), COURSE_KEY))
+
+    def test_signals_connected_when_ready(self):
+        from django.db.models.signals import post_delete
+        from student.models import CourseAccessRole
+        access.connect_signals()
+        self.assertTrue(post_delete.disconnect(sender=CourseAccessRole,
+                                               dispatch_uid='scormxblock_staff_access_delete_invalidation'))
+        access.connect_signals()
+
+    def test_per_course(self):
+        self.instructors.add(1)
+        access.has_instructor_access(User(1), COURSE_KEY)
+        access.has_instructor_access(User(1), u'course-v1:Org+Other+Run')
+        self.assertEqual(len(self.checks), 2)
+
+    def test_anonymous(self):
+        self.assertFalse(access.has_instructor_access(None, COURSE_KEY))
+        self.assertFalse(access.has_instructor_access(User(None, authenticated=False), COURSE_KEY))
+        self.assertEqual(self.checks, [])
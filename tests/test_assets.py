@@ -0,0 +1,227 @@
+"""
+Tests of package_asset responses: validators, conditional and range requests,
+precompressed variants, web server handoff, archive members and the file
+manifest cache
+"""
+import gzip
+import io
+import zipfile
+
+from webob import Request
+
+from scormxblock import archive, assets, importer, precompress, storage as scorm_storage
+
+from tests import s3
+from tests.utils import MANIFEST, FileSystemTestCase, open_zip
+
+
+PAGE = '<html>' + 'SCORM lesson ' * 500 + '</html>'
+FILES = {'imsmanifest.xml': MANIFEST, 'index.html': PAGE, 'img/logo.png': 'PNG' * 10}
+DEST = 'scorms/block'
+
+
+class AssetTestCase(FileSystemTestCase):
+
+    def get(self, path, files=None, **kwargs):
+        headers = kwargs.pop('headers', {})
+        request = Request.blank('/' + path, headers=headers)
+        return assets.asset_response(request, self.storage, DEST, path,
+                                     self.files if files is None else files, **kwargs)
+
+
+class ExtractedAssetTest(AssetTestCase):
+
+    def setUp(self):
+        super(ExtractedAssetTest, self).setUp()
+        importer.PackageImporter(self.storage, open_zip(FILES), DEST, 'cp850',
+                                 precompressor=precompress.Precompressor([precompress.GZIP])).run()
+        self.files = importer.load_file_manifest(self.storage, DEST)
+
+    def test_full_response(self):
+        response = self.get('index.html')
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.body, PAGE)
+        self.assertEqual(response.content_type, 'text/html')
+        self.assertEqual(response.etag, self.files['index.html']['sha1'])
+        self.assertEqual(response.cache_control.no_cache, '*')
+
+    def test_immutable(self):
+        response = self.get('index.html', immutable=True)
+        self.assertEqual(response.cache_control.max_age, assets.IMMUTABLE_MAX_AGE)
+
+    def test_not_modified(self):
+        etag = self.files['index.html']['sha1']
+        response = self.get('index.html', headers={'If-None-Match': '"{}"'.format(etag)})
+        self.assertEqual(response.status_int, 304)
+        self.assertEqual(response.body, b'')
+
+    def test_range(self):
+        response = self.get('index.html', headers={'Range': 'bytes=6-10'})
+        self.assertEqual(response.status_int, 206)
+        self.assertEqual(response.body, PAGE[6:11])
+        self.assertEqual(str(response.content_range), 'bytes 6-10/{}'.format(len(PAGE)))
+
+    def test_suffix_range(self):
+        response = self.get('index.html', headers={'Range': 'bytes=-7'})
+        self.assertEqual(response.body, PAGE[-7:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get('index.html', headers={'Range': 'bytes={}-'.format(len(PAGE) + 10)})
+        self.assertEqual(response.status_int, 416)
+        self.assertEqual(response.headers['Content-Range'], 'bytes */{}'.format(len(PAGE)))
+
+    def test_stale_if_range_gets_everything(self):
+        response = self.get('index.html', headers={'Range': 'bytes=0-5', 'If-Range': '"stale"'})
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.body, PAGE)
+
+    def test_gzip_variant(self):
+        response = self.get('index.html', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.content_encoding, 'gzip')
+        self.assertEqual(response.etag, self.files['index.html']['sha1'] + '-gzip')
+        self.assertIn('Accept-Encoding', response.vary)
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(response.body)).read(), PAGE)
+
+    def test_no_variant_without_accept_encoding(self):
+        response = self.get('index.html')
+        self.assertIsNone(response.content_encoding)
+        self.assertIn('Accept-Encoding', response.vary)
+
+    def test_not_found(self):
+        for path in ('missing.html', importer.FILE_MANIFEST_FILENAME, importer.INDEX_FILENAME,
+                     '../other/index.html', ''):
+            self.assertEqual(self.get(path).status_int, 404, path)
+
+    def test_without_file_manifest(self):
+        response = self.get('img/logo.png', files={})
+        self.assertEqual(response.status_int, 404)
+
+        # packages imported before file manifests were kept are validated by date
+        self.storage.delete(importer.file_manifest_name(DEST))
+        response = assets.asset_response(Request.blank('/img/logo.png'), self.storage, DEST, 'img/logo.png')
+        self.assertEqual(response.body, 'PNG' * 10)
+        self.assertIsNotNone(response.last_modified)
+        request = Request.blank('/img/logo.png', headers={'If-Modified-Since': response.headers['Last-Modified']})
+        response = assets.asset_response(request, self.storage, DEST, 'img/logo.png')
+        self.assertEqual(response.status_int, 304)
+
+    def test_accel_redirect(self):
+        response = self.get('img/logo.png', accel_redirect='/scorm-protected/')
+        self.assertEqual(response.headers['X-Accel-Redirect'], '/scorm-protected/{}/img/logo.png'.format(DEST))
+        self.assertEqual(response.body, b'')
+
+    def test_accel_redirect_leaves_variant_to_nginx(self):
+        response = self.get('index.html', accel_redirect='/scorm-protected/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['X-Accel-Redirect'], '/scorm-protected/{}/index.html'.format(DEST))
+        self.assertIsNone(response.content_encoding)
+        self.assertEqual(response.etag, self.files['index.html']['sha1'])
+        self.assertIn('Accept-Encoding', response.vary)
+
+    def test_sendfile(self):
+        response = self.get('img/logo.png', sendfile=True)
+        self.assertEqual(response.headers['X-Sendfile'], self.storage.local_path(DEST + '/img/logo.png'))
+
+
+class S3AssetTest(AssetTestCase):
+
+    def setUp(self):
+        self.bucket = s3.Boto3Bucket()
+        self.django_storage = s3.FakeS3Storage(self.bucket, location='media')
+        self.storage = scorm_storage.adapter_for(self.django_storage)
+        self.files = importer.PackageImporter(self.storage, open_zip(FILES), DEST, 'cp850').run()
+        del self.django_storage.opened[:]
+
+    def test_range_is_ranged_get(self):
+        response = self.get('index.html', headers={'Range': 'bytes=6-10'})
+        self.assertEqual(response.status_int, 206)
+        self.assertEqual(response.body, PAGE[6:11])
+        self.assertEqual(self.bucket.ranges, [('media/{}/index.html'.format(DEST), 'bytes=6-10')])
+        # the object is never downloaded whole to seek in it
+        self.assertEqual(self.django_storage.opened, [])
+
+    def test_full_response(self):
+        self.assertEqual(self.get('index.html').body, PAGE)
+        self.assertEqual(self.bucket.ranges, [])
+
+
+class FileManifestCacheTest(FileSystemTestCase):
+
+    def setUp(self):
+        super(FileManifestCacheTest, self).setUp()
+        self.cache = assets.FileManifestCache()
+
+    def import_package(self, dest, content):
+        importer.PackageImporter(self.storage, open_zip(dict(FILES, **{'index.html': content})), dest, 'cp850').run()
+
+    def test_versioned_package_cached(self):
+        self.import_package(DEST + '/v1', 'first')
+        self.assertEqual(self.cache.get(self.storage, DEST + '/v1', 'v1')['index.html']['size'], 5)
+        self.storage.delete(importer.file_manifest_name(DEST + '/v1'))
+        self.assertEqual(self.cache.get(self.storage, DEST + '/v1', 'v1')['index.html']['size'], 5)
+
+    def test_unversioned_package_cached_per_import(self):
+        # a package re-imported in place, e.g. by Studio in a warm LMS process
+        self.import_package(DEST, 'first')
+        self.assertEqual(self.cache.get(self.storage, DEST, '', 'p1')['index.html']['size'], 5)
+        self.import_package(DEST, 'second!')
+        self.assertEqual(self.cache.get(self.storage, DEST, '', 'p1')['index.html']['size'], 5)
+        # published, so the block names the new package
+        self.assertEqual(self.cache.get(self.storage, DEST, '', 'p2')['index.html']['size'], 7)
+
+    def test_unversioned_package_ttl(self):
+        self.import_package(DEST, 'first')
+        self.assertEqual(self.cache.get(self.storage, DEST, '', 'p1', ttl=0)['index.html']['size'], 5)
+        self.import_package(DEST, 'second!')
+        self.assertEqual(self.cache.get(self.storage, DEST, '', 'p1', ttl=0)['index.html']['size'], 7)
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+
+class ArchiveAssetTest(AssetTestCase):
+
+    def setUp(self):
+        super(ArchiveAssetTest, self).setUp()
+        # members compressed or not, as the zip tool decided
+        out = io.BytesIO()
+        zip_file = zipfile.ZipFile(out, 'w')
+        zip_file.writestr(zipfile.ZipInfo('imsmanifest.xml'), MANIFEST, zipfile.ZIP_DEFLATED)
+        zip_file.writestr(zipfile.ZipInfo('index.html'), PAGE, zipfile.ZIP_DEFLATED)
+        zip_file.writestr(zipfile.ZipInfo('img/logo.png'), 'PNG' * 10, zipfile.ZIP_STORED)
+        zip_file.close()
+        out.seek(0)
+        self.files = archive.ArchiveImporter(self.storage, zipfile.ZipFile(out), out, DEST, 'cp850').run()
+
+    def test_stored_member(self):
+        response = self.get('img/logo.png')
+        self.assertEqual(response.body, 'PNG' * 10)
+        self.assertEqual(response.etag, self.files['img/logo.png']['sha1'])
+        self.assertEqual(response.vary, None)
+
+    def test_stored_member_range(self):
+        response = self.get('img/logo.png', headers={'Range': 'bytes=3-5'})
+        self.assertEqual(response.status_int, 206)
+        self.assertEqual(response.body, 'PNG')
+
+    def test_deflated_member_inflated(self):
+        response = self.get('index.html', headers={'Range': 'bytes=100-199'})
+        self.assertEqual(response.status_int, 206)
+        self.assertEqual(response.body, PAGE[100:200])
+        self.assertIn('Accept-Encoding', response.vary)
+
+    def test_deflated_member_as_gzip(self):
+        response = self.get('index.html', headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-10'})
+        # ranges of the gzip stream aren't supported
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.accept_ranges, 'none')
+        self.assertEqual(response.content_length, len(response.body))
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(response.body)).read(), PAGE)
+
+    def test_not_modified(self):
+        etag = self.files['index.html']['sha1'] + '-gzip'
+        response = self.get('index.html', headers={'Accept-Encoding': 'gzip', 'If-None-Match': '"{}"'.format(etag)})
+        self.assertEqual(response.status_int, 304)
+
+    def test_never_handed_over(self):
+        response = self.get('img/logo.png', accel_redirect='/scorm-protected/', sendfile=True)
+        self.assertNotIn('X-Accel-Redirect', response.headers)
+        self.assertNotIn('X-Sendfile', response.headers)
+        self.assertEqual(response.body, 'PNG' * 10)
@@ -0,0 +1,94 @@
+"""
+Tests of the handlers behind the inline SCORM 1.2 API: scorm_get_values,
+scorm_commit, scorm_get_value and scorm_set_value
+"""
+import json
+
+from tests.blocks import PACKAGE, USER_ID, BlockTestCase
+
+
+class ScormCommitTest(BlockTestCase):
+
+    def test_batch_applied_and_saved_once(self):
+        result = self.call('scorm_commit', {'values': {
+            'cmi.core.lesson_status': 'passed',
+            'cmi.core.score.raw': '80',
+            'cmi.suspend_data': 'page=3',
+        }})
+        self.assertEqual(result, {'result': 'success', 'lesson_score': 80.0})
+        block = self.block()
+        self.assertEqual(block.lesson_status, 'passed')
+        self.assertEqual(block.lesson_score, 80.0)
+        self.assertEqual(block.raw_scorm_status_version, 1)
+        self.assertEqual(json.loads(block.raw_scorm_status)['scos']['sco']['data']['cmi.suspend_data'], 'page=3')
+        self.assertEqual(self.grades(), [{'value': 0.8, 'max_value': 1}])
+
+    def test_values_without_score_or_status(self):
+        self.assertEqual(self.call('scorm_commit', {'values': {'cmi.suspend_data': 'x'}}), {'result': 'success'})
+        self.assertEqual(self.grades(), [])
+
+    def test_later_batches_add_to_earlier_ones(self):
+        self.call('scorm_commit', {'values': {'cmi.core.score.raw': '40', 'cmi.suspend_data': 'a'}})
+        self.call('scorm_commit', {'values': {'cmi.core.score.raw': '90'}})
+        block = self.block()
+        self.assertEqual(block.scorm_state.sco_data('sco'), {'cmi.core.score.raw': '90', 'cmi.suspend_data': 'a'})
+        self.assertEqual(self.grades(), [{'value': 0.4, 'max_value': 1}, {'value': 0.9, 'max_value': 1}])
+
+    def test_unchanged_grade_not_published_again(self):
+        self.call('scorm_commit', {'values': {'cmi.core.score.raw': '50'}})
+        self.call('scorm_commit', {'values': {'cmi.core.score.raw': '50', 'cmi.core.lesson_status': 'incomplete'}})
+        self.assertEqual(len(self.grades()), 1)
+
+    def test_invalid_batch(self):
+        for data in ({}, {'values': ['cmi.core.score.raw', '80']}, {'values': 'x'}):
+            self.assertEqual(self.call('scorm_commit', data)['result'], 'failure')
+        self.assertEqual(self.block().raw_scorm_status_version, 0)
+
+    def test_empty_final_commit(self):
+        self.assertEqual(self.call('scorm_commit', {'values': {}, 'final': True}), {'result': 'success'})
+        self.assertEqual(self.block().raw_scorm_status_version, 0)
+
+    def test_learners_kept_apart(self):
+        self.call('scorm_commit', {'values': {'cmi.core.score.raw': '80'}})
+        self.call('scorm_commit', {'values': {'cmi.core.score.raw': '30'}}, user_id=USER_ID + 1)
+        self.assertEqual(self.block().lesson_score, 80.0)
+        self.assertEqual(self.block(USER_ID + 1).lesson_score, 30.0)
+
+    def test_first_sco_of_package(self):
+        self.studio_submit(PACKAGE)
+        self.call('scorm_commit', {'values': {'cmi.core.score.raw': '80'}})
+        self.assertEqual(self.block().scorm_state.cmi_value('cmi.core.score.raw', 'i1'), '80')
+
+
+class ScormGetValuesTest(BlockTestCase):
+
+    def test_prime_data_model(self):
+        self.call('scorm_commit', {'values': {'cmi.core.lesson_status': 'incomplete', 'cmi.suspend_data': 'x'}})
+        values = self.call('scorm_get_values', {})['values']
+        self.assertEqual(values['cmi.suspend_data'], 'x')
+        self.assertEqual(values['cmi.core.lesson_status'], 'incomplete')
+        self.assertEqual(values['cmi.core.student_id'], USER_ID)
+        self.assertEqual(values['cmi.core.credit'], 'credit')
+
+    def test_new_learner(self):
+        values = self.call('scorm_get_values', {})['values']
+        self.assertEqual(values['cmi.core.lesson_status'], 'not attempted')
+        self.assertNotIn('cmi.suspend_data', values)
+
+
+class SingleValueTest(BlockTestCase):
+
+    def test_set_and_get(self):
+        self.assertEqual(self.call('scorm_set_value', {'name': 'cmi.core.score.raw', 'value': '75'}),
+                         {'result': 'success', 'lesson_score': 75.0})
+        self.assertEqual(self.call('scorm_get_value', {'name': 'cmi.core.score.raw'}), {'value': '75'})
+        self.assertEqual(self.call('scorm_get_value', {'name': 'cmi.core.lesson_location'}), {'value': ''})
+
+    def test_lesson_status_defaults_to_block_status(self):
+        self.assertEqual(self.call('scorm_get_value', {'name': 'cmi.core.lesson_status'}), {'value': 'not attempted'})
+
+    def test_other_sco(self):
+        block = self.block()
+        block.scorm_state.set_sco_values('sco2', {'cmi.core.score.raw': '10'})
+        block.save()
+        self.assertEqual(self.call('scorm_get_value', {'name': 'cmi.core.score.raw', 'sco': 'sco2'}), {'value': '10'})
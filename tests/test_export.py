@@ -0,0 +1,95 @@
+"""
+Tests of the learner status export rows and writers
+"""
+import io
+import json
+import unittest
+
+from scormxblock import export, state
+
+from tests.utils import StudentModule
+
+
+STATUS = {
+    'scos': {
+        'sco1': {'data': {'cmi.core.score.raw': '80', 'cmi.core.total_time': '0001:30:00'}},
+        'sco2': {'data': {'cmi.score.scaled': '0.5', 'cmi.total_time': 'PT10M30S'}},
+        'sco3': {'data': {'cmi.core.total_time': 'not a time'}},
+    },
+}
+
+
+class ParseTimespanTest(unittest.TestCase):
+
+    def test_scorm_12(self):
+        self.assertEqual(export.parse_timespan('0001:30:05.5'), 5405.5)
+        self.assertEqual(export.parse_timespan('12:00:00'), 43200)
+
+    def test_scorm_2004(self):
+        self.assertEqual(export.parse_timespan('PT1H2M3.5S'), 3723.5)
+        self.assertEqual(export.parse_timespan('P1DT1S'), 86401)
+        self.assertEqual(export.parse_timespan('P1Y1M'), (365 + 30) * 86400)
+
+    def test_invalid(self):
+        for value in (None, '', 'P', 'PT', '1:2', 'PT1X', 'soon'):
+            self.assertIsNone(export.parse_timespan(value), value)
+
+
+class StatusRowTest(unittest.TestCase):
+
+    def test_row(self):
+        module = StudentModule({'raw_scorm_status': json.dumps(STATUS), 'lesson_status': 'passed', 'lesson_score': 65.0})
+        self.assertEqual(export.status_row(module), {
+            'username': 'learner',
+            'user_id': 7,
+            'block_id': module.module_state_key,
+            'lesson_status': 'passed',
+            'lesson_score': 65.0,
+            'sco_scores': {'sco1': 80.0, 'sco2': 50.0, 'sco3': None},
+            'total_time': 5400 + 630,
+            'modified': '2018-03-01T12:30:00',
+        })
+
+    def test_published_score(self):
+        # a player score of 85 graded on a block of weight 2, the SCOs themselves unscored
+        module = StudentModule({'raw_scorm_status': json.dumps({'score': '85', 'scos': {}}), 'lesson_score': 0.0,
+                                'published_grade_value': 1.7, 'published_grade_max': 2.0})
+        self.assertEqual(export.status_row(module)['lesson_score'], 85.0)
+
+    def test_unpublished_score(self):
+        for fields in ({'lesson_score': 40.0}, {'lesson_score': 40.0, 'published_grade_value': 0.0,
+                                                'published_grade_max': 0.0}):
+            self.assertEqual(export.status_row(StudentModule(fields))['lesson_score'], 40.0)
+
+    def test_compressed_status(self):
+        stored = state.encode(json.dumps(STATUS), compress=True)
+        row = export.status_row(StudentModule({'raw_scorm_status': stored}))
+        self.assertEqual(row['sco_scores']['sco1'], 80.0)
+
+    def test_empty_or_invalid_state(self):
+        for fields in ({}, 'not json', '[1]', None):
+            row = export.status_row(StudentModule(fields))
+            self.assertEqual((row['lesson_status'], row['sco_scores'], row['total_time']),
+                             ('not attempted', {}, None))
+
+
+class WriterTest(unittest.TestCase):
+
+    def rows(self):
+        module = StudentModule({'raw_scorm_status': json.dumps(STATUS), 'lesson_status': u'pass\xe9'})
+        return [export.status_row(module)]
+
+    def test_jsonl(self):
+        out = io.BytesIO()
+        export.write_jsonl(self.rows(), out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['sco_scores']['sco2'], 50.0)
+
+    def test_csv(self):
+        out = io.BytesIO()
+        export.write_csv(self.rows(), out)
+        header, row = out.getvalue().splitlines()
+        self.assertEqual(header.split(','), list(export.CSV_FIELDS))
+        self.assertIn(u'pass\xe9'.encode('utf-8'), row)
+        self.assertIn('""sco1"": 80.0', row)
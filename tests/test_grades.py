@@ -0,0 +1,107 @@
+"""
+Tests of grade publishing: skipped identical grades, the publish window
+holding back changed grades, and publishing only on completion
+"""
+import json
+
+from tests.blocks import BlockTestCase
+
+
+def grade(value):
+    return {'value': value, 'max_value': 1}
+
+
+class GradeWindowTest(BlockTestCase):
+
+    xblock_settings = {'SCORM_GRADE_PUBLISH_WINDOW': 60}
+
+    def commit(self, score=None, status=None, final=False):
+        values = {}
+        if score is not None:
+            values['cmi.core.score.raw'] = score
+        if status is not None:
+            values['cmi.core.lesson_status'] = status
+        return self.call('scorm_commit', {'values': values, 'final': final})
+
+    def test_changed_grade_held_within_window(self):
+        self.commit(score='40')
+        self.commit(score='50')
+        self.commit(score='60')
+        self.assertEqual(self.grades(), [grade(0.4)])
+        self.assertEqual(self.block().held_grade_score, 60.0)
+
+    def test_final_commit_publishes_held_grade(self):
+        self.commit(score='40')
+        self.commit(score='70')
+        self.commit(final=True)
+        self.assertEqual(self.grades(), [grade(0.4), grade(0.7)])
+        self.assertIsNone(self.block().held_grade_score)
+        # nothing is left to publish
+        self.commit(final=True)
+        self.assertEqual(len(self.grades()), 2)
+
+    def test_next_visit_publishes_held_grade(self):
+        self.commit(score='40')
+        self.commit(score='70')
+        self.call('scorm_get_values', {})
+        self.assertEqual(self.grades(), [grade(0.4), grade(0.7)])
+
+    def test_student_view_publishes_held_grade(self):
+        self.commit(score='40')
+        self.commit(score='70')
+        self.block().student_view({})
+        self.assertEqual(self.grades(), [grade(0.4), grade(0.7)])
+        self.assertIsNone(self.block().held_grade_score)
+
+    def test_completion_published_at_once(self):
+        self.commit(score='40')
+        self.commit(score='80', status='passed')
+        self.assertEqual(self.grades(), [grade(0.4), grade(0.8)])
+
+    def test_grade_back_to_published_one_drops_held_grade(self):
+        self.commit(score='40')
+        self.commit(score='70')
+        self.commit(score='40')
+        self.assertIsNone(self.block().held_grade_score)
+        self.commit(final=True)
+        self.assertEqual(self.grades(), [grade(0.4)])
+
+
+class RawStatusGradeWindowTest(BlockTestCase):
+
+    xblock_settings = {'SCORM_GRADE_PUBLISH_WINDOW': 60}
+
+    def set_status(self, score):
+        # an SSLA style status: the lesson score comes from the player, SCOs have no raw score
+        status = {'status': 'incomplete', 'score': score,
+                  'scos': {'sco1': {'data': {'cmi.core.lesson_status': 'incomplete'}}}}
+        self.handle('set_raw_scorm_status', POST={'data': json.dumps(status)})
+
+    def test_held_player_score_published(self):
+        self.set_status('50')
+        self.set_status('85')
+        self.assertEqual(self.grades(), [grade(0.5)])
+        # the player's score is kept and held, not the rollup of unscored SCOs
+        self.assertEqual(self.block().lesson_score, 85.0)
+        self.handle('get_raw_scorm_status', method='GET')
+        self.assertEqual(self.grades(), [grade(0.5), grade(0.85)])
+
+    def test_held_score_after_patch(self):
+        self.set_status('50')
+        block = self.block()
+        self.handle('patch_raw_scorm_status', json.dumps({
+            'version': block.raw_scorm_status_version,
+            'ops': [{'op': 'replace', 'path': '/score', 'value': '90'}]}))
+        self.block().student_view({})
+        self.assertEqual(self.grades(), [grade(0.5), grade(0.9)])
+
+
+class CompletionOnlyTest(BlockTestCase):
+
+    xblock_settings = {'SCORM_GRADE_PUBLISH_ON_COMPLETION_ONLY': True}
+
+    def test_published_once_complete(self):
+        self.call('scorm_commit', {'values': {'cmi.core.score.raw': '40'}})
+        self.assertEqual(self.grades(), [])
+        self.call('scorm_commit', {'values': {'cmi.core.lesson_status': 'failed'}})
+        self.assertEqual(self.grades(), [grade(0.4)])
@@ -0,0 +1,95 @@
+"""
+Tests of the learner names cached per request and in the Django cache
+"""
+import unittest
+
+from django.core.cache import cache
+
+from scormxblock import identity
+
+
+class Profile(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class User(object):
+    def __init__(self, name, first_name='', last_name=''):
+        self.profile = Profile(name)
+        self.first_name = first_name
+        self.last_name = last_name
+
+
+class IdentityOfTest(unittest.TestCase):
+
+    def test_profile_name(self):
+        self.assertEqual(identity.identity_of(User(u'Ada King Lovelace')),
+                         {'name': u'Ada King Lovelace', 'reversed_name': u'King Lovelace, Ada'})
+
+    def test_user_names_preferred(self):
+        self.assertEqual(identity.identity_of(User(u'x', u'Ada', u'Lovelace'))['reversed_name'], u'Lovelace, Ada')
+
+    def test_no_profile(self):
+        student = User(u'x')
+        student.profile = None
+        self.assertEqual(identity.identity_of(student), identity.EMPTY_IDENTITY)
+
+
+class GetIdentityTest(unittest.TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # stands in for the platform's request cache, cleared by each test as a new request would be
+        self.request = {}
+        request_data = identity.request_data
+        identity.request_data = lambda key: self.request.setdefault(key, {})
+        self.addCleanup(setattr, identity, 'request_data', request_data)
+        self.lookups = []
+
+    def get_student(self, name=u'Ada Lovelace'):
+        def get_student():
+            self.lookups.append(name)
+            return User(name)
+        return get_student
+
+    def test_looked_up_once_per_request(self):
+        self.assertEqual(identity.get_identity(1, self.get_student())['name'], u'Ada Lovelace')
+        cache.clear()
+        self.assertEqual(identity.get_identity(1, self.get_student())['name'], u'Ada Lovelace')
+        self.assertEqual(len(self.lookups), 1)
+
+    def test_cached_across_requests(self):
+        identity.get_identity(1, self.get_student())
+        self.request.clear()
+        self.assertEqual(identity.get_identity(1, self.get_student(u'Other Name'))['name'], u'Ada Lovelace')
+        self.assertEqual(len(self.lookups), 1)
+
+    def test_ttl_zero_skips_django_cache(self):
+        identity.get_identity(1, self.get_student(), ttl=0)
+        self.request.clear()
+        self.assertEqual(identity.get_identity(1, self.get_student(u'Other Name'), ttl=0)['name'], u'Other Name')
+        self.assertIsNone(cache.get(identity.CACHE_KEY.format(1)))
+
+    def test_invalidate(self):
+        identity.get_identity(1, self.get_student())
+        identity.get_identity(2, self.get_student())
+        identity.invalidate(1)
+        self.assertEqual(identity.get_identity(1, self.get_student(u'New Name'))['name'], u'New Name')
+        self.assertEqual(identity.get_identity(2, self.get_student(u'New Name'))['name'], u'Ada Lovelace')
+
+    def test_profile_save_invalidates(self):
+        identity.get_identity(1, self.get_student())
+        profile = type('UserProfile', (object,), {'user_id': 1})()
+        identity._invalidate_on_profile_save(None, profile)
+        self.assertIsNone(cache.get(identity.CACHE_KEY.format(1)))
+
+    def test_unknown_user_not_cached(self):
+        self.assertEqual(identity.get_identity(1, lambda: None), identity.EMPTY_IDENTITY)
+        self.assertEqual(identity.get_identity(1, self.get_student())['name'], u'Ada Lovelace')
+
+    def test_signals_connected_when_ready(self):
+        from django.contrib.auth.models import User
+        from django.db.models.signals import post_save
+        identity.connect_signals()
+        self.assertTrue(post_save.disconnect(sender=User, dispatch_uid='scormxblock_identity_user_invalidation'))
+        identity.connect_signals()
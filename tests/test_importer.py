@@ -0,0 +1,260 @@
+"""
+Tests of package imports: re-uploads, crash recovery, versions, shared blobs and archives
+"""
+import gzip
+import io
+import struct
+import zipfile
+
+from scormxblock import archive, importer, storage as scorm_storage
+
+from tests.utils import MANIFEST, FileSystemTestCase, make_zip, open_zip
+
+
+V1 = {'imsmanifest.xml': MANIFEST, 'index.html': 'index 1', 'a.js': 'a', 'b.css': 'b'}
+V2 = {'imsmanifest.xml': MANIFEST, 'index.html': 'index 2', 'a.js': 'a', 'c.css': 'c'}
+
+
+class RecordingStorage(scorm_storage.FileSystemScormStorage):
+    """
+    records saves and copies; fails every save after the first `fail_after`
+    """
+    fail_after = None
+
+    def __init__(self, storage):
+        super(RecordingStorage, self).__init__(storage)
+        self.saved = []
+        self.copied = []
+
+    def save(self, name, content):
+        if self.fail_after is not None and len(self.saved) >= self.fail_after:
+            raise IOError('storage went away')
+        self.saved.append(name)
+        return super(RecordingStorage, self).save(name, content)
+
+    def copy(self, src_name, dest_name):
+        self.copied.append((src_name, dest_name))
+        return super(RecordingStorage, self).copy(src_name, dest_name)
+
+
+class ImporterTestCase(FileSystemTestCase):
+
+    def setUp(self):
+        super(ImporterTestCase, self).setUp()
+        self.storage = RecordingStorage(self.storage.storage)
+
+    def run_import(self, files, dest='scorms/block', **kwargs):
+        package = importer.PackageImporter(self.storage, open_zip(files), dest, 'cp850', **kwargs)
+        result = package.run()
+        return package, result
+
+    def stored(self, dest='scorms/block'):
+        names = [name for name in self.storage.list_prefix(dest)
+                 if not name.endswith(importer.FILE_MANIFEST_FILENAME)]
+        return dict((name[len(dest) + 1:], self.storage.read(name)) for name in names)
+
+
+class PackageImporterTest(ImporterTestCase):
+
+    def test_first_import(self):
+        package, files = self.run_import(V1)
+        self.assertEqual(self.stored(), V1)
+        self.assertEqual(sorted(files), sorted(V1))
+        self.assertEqual(files['a.js']['size'], 1)
+        self.assertEqual(importer.load_file_manifest(self.storage, 'scorms/block'), files)
+
+    def test_reupload_writes_only_changes(self):
+        self.run_import(V1)
+        del self.storage.saved[:]
+        self.run_import(V2)
+        self.assertEqual(sorted(self.storage.saved), ['scorms/block/c.css', 'scorms/block/index.html'])
+        self.assertEqual(self.stored(), V2)
+
+    def test_same_package_writes_nothing(self):
+        self.run_import(V1)
+        del self.storage.saved[:]
+        self.run_import(V1)
+        self.assertEqual(self.storage.saved, [])
+
+    def test_interrupted_reupload_is_redone(self):
+        self.run_import(V1)
+        self.storage.fail_after = len(self.storage.saved) + 1
+        with self.assertRaises(IOError):
+            self.run_import(V2)
+        # the old manifest no longer describes what is stored
+        self.assertIsNone(importer.load_file_manifest(self.storage, 'scorms/block'))
+
+        self.storage.fail_after = None
+        self.run_import(V1)
+        self.assertEqual(self.stored(), V1)
+
+    def test_interrupted_first_import_is_redone(self):
+        self.storage.fail_after = 1
+        with self.assertRaises(IOError):
+            self.run_import(V1)
+        self.storage.fail_after = None
+        self.run_import(V1)
+        self.assertEqual(self.stored(), V1)
+        # saves replaced the leftovers instead of storing next to them under new names
+        self.assertEqual(len(list(self.storage.list_prefix('scorms/block'))), len(V1) + 1)
+
+    def test_package_without_file_manifest_is_replaced(self):
+        self.storage.write('scorms/block/imsmanifest.xml', MANIFEST)
+        self.storage.write('scorms/block/old.html', 'old')
+        self.run_import(V1)
+        self.assertEqual(self.stored(), V1)
+
+    def test_member_paths_kept_inside_package(self):
+        self.run_import(dict(V1, **{'../escape.html': 'x', '/abs.html': 'y'}))
+        self.assertEqual(self.stored(), dict(V1, **{'abs.html': 'y'}))
+        self.assertFalse(self.storage.exists('scorms/escape.html'))
+
+    def test_versioned(self):
+        first, files = self.run_import(V1, versioned=True)
+        self.assertEqual(first.package_dest, 'scorms/block/' + first.version)
+        self.assertEqual(first.version, importer.package_version_id(files))
+        del self.storage.saved[:]
+
+        second, files = self.run_import(V2, versioned=True, base_dest=first.package_dest)
+        self.assertNotEqual(second.version, first.version)
+        # files unchanged from the base version are copied within storage
+        self.assertEqual(sorted(dest for src, dest in self.storage.copied),
+                         [second.package_dest + '/a.js', second.package_dest + '/imsmanifest.xml'])
+        self.assertEqual(sorted(self.storage.saved),
+                         [second.package_dest + '/c.css', second.package_dest + '/index.html'])
+        self.assertEqual(self.stored(second.package_dest), V2)
+        self.assertEqual(self.stored(first.package_dest), V1)
+
+    def test_prune_versions(self):
+        versions = [self.run_import(files, versioned=True)[0].version for files in (V1, V2)]
+        importer.prune_versions(self.storage, 'scorms/block', versions[1:])
+        self.assertEqual(self.stored('scorms/block/' + versions[0]), {})
+        self.assertEqual(self.stored('scorms/block/' + versions[1]), V2)
+
+
+class SharedBlobsTest(ImporterTestCase):
+
+    def test_identical_members_stored_once(self):
+        files = {'imsmanifest.xml': MANIFEST, 'index.html': 'same', 'copy.html': 'same'}
+        self.run_import(files, shared_dir='scorms/_shared', concurrency=2)
+        self.assertEqual(self.stored(), files)
+        blobs = [name for name in self.storage.saved if name.startswith('scorms/_shared/')]
+        self.assertEqual(len(blobs), 2)
+
+    def test_unreferenced_blobs(self):
+        self.run_import({'imsmanifest.xml': MANIFEST, 'index.html': 'kept'}, shared_dir='scorms/_shared')
+        self.run_import({'imsmanifest.xml': MANIFEST, 'index.html': 'gone'}, dest='scorms/orphan',
+                        shared_dir='scorms/_shared')
+        unreferenced = list(importer.unreferenced_blobs(self.storage, 'scorms', 'scorms/_shared',
+                                                        exclude={'orphan'}, min_age=0))
+        self.assertEqual(len(unreferenced), 1)
+        name, size = unreferenced[0]
+        self.assertEqual(self.storage.read(name), 'gone')
+        # recent blobs may belong to an import in progress
+        self.assertEqual(list(importer.unreferenced_blobs(self.storage, 'scorms', 'scorms/_shared',
+                                                          exclude={'orphan'})), [])
+
+
+def _declare_size(data, member, size):
+    """
+    rewrite the uncompressed size a zip declares for `member` in its local and central headers
+    """
+    data = bytearray(data)
+    for signature, name_offset, size_offset in ((b'PK\x03\x04', 30, 22), (b'PK\x01\x02', 46, 24)):
+        position = data.find(signature)
+        while position >= 0:
+            if data[position + name_offset:position + name_offset + len(member)] == member:
+                struct.pack_into('<L', data, position + size_offset, size)
+            position = data.find(signature, position + 4)
+    return bytes(data)
+
+
+class LimitsTest(ImporterTestCase):
+
+    def package(self, files, data=None, **kwargs):
+        zip_file = zipfile.ZipFile(io.BytesIO(data or make_zip(files)))
+        return importer.PackageImporter(self.storage, zip_file, 'scorms/block', 'cp850', **kwargs)
+
+    def test_max_size(self):
+        with self.assertRaises(importer.PackageImportError):
+            self.package(V1, max_size=10).check_limits()
+
+    def test_max_member_size(self):
+        with self.assertRaises(importer.PackageImportError):
+            self.package(dict(V1, **{'big.html': 'x' * 100}), max_member_size=50).check_limits()
+
+    def test_member_inflating_past_declared_size(self):
+        data = _declare_size(make_zip(dict(V1, **{'bomb.html': '\0' * 200000})), b'bomb.html', 100)
+        package = self.package(None, data, max_size=100000)
+        package.check_limits()
+        with self.assertRaises(importer.PackageImportError):
+            package.run()
+        self.assertEqual(self.storage.saved, [])
+
+
+class ArchiveImporterTest(ImporterTestCase):
+
+    def archive_package(self, files, compression, **kwargs):
+        upload = io.BytesIO(make_zip(files, compression))
+        return archive.ArchiveImporter(self.storage, zipfile.ZipFile(upload), upload, 'scorms/block', 'cp850',
+                                       **kwargs)
+
+    def run_archive(self, files, compression):
+        return self.archive_package(files, compression).run()
+
+    def test_stored_members(self):
+        content = ''.join(chr(i % 256) for i in range(5000))
+        files = self.run_archive({'imsmanifest.xml': MANIFEST, 'data.bin': content}, zipfile.ZIP_STORED)
+        self.assertEqual(self.storage.saved, [archive.archive_name('scorms/block')])
+        entry = files['data.bin']
+        self.assertTrue(archive.is_archive_entry(entry))
+        self.assertEqual(b''.join(archive.iter_member(self.storage, 'scorms/block', entry)), content)
+        self.assertEqual(b''.join(archive.iter_member(self.storage, 'scorms/block', entry, 100, 300)),
+                         content[100:300])
+
+    def test_deflated_members(self):
+        content = 'SCORM ' * 20000
+        files = self.run_archive({'imsmanifest.xml': MANIFEST, 'index.html': content}, zipfile.ZIP_DEFLATED)
+        entry = files['index.html']
+        self.assertEqual(entry['method'], archive.DEFLATED)
+        self.assertEqual(b''.join(archive.iter_member(self.storage, 'scorms/block', entry)), content)
+        self.assertEqual(b''.join(archive.iter_member(self.storage, 'scorms/block', entry, 70000, 70010)),
+                         content[70000:70010])
+
+        gzipped = b''.join(archive.iter_member_gzip(self.storage, 'scorms/block', entry))
+        self.assertEqual(len(gzipped), archive.gzip_size(entry))
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(gzipped)).read(), content)
+
+    def test_same_archive_not_stored_again(self):
+        self.run_archive(V1, zipfile.ZIP_DEFLATED)
+        del self.storage.saved[:]
+        self.run_archive(V1, zipfile.ZIP_DEFLATED)
+        self.assertEqual(self.storage.saved, [])
+
+    def test_extracted_over_archive(self):
+        self.run_archive(V1, zipfile.ZIP_DEFLATED)
+        self.run_import(V1)
+        self.assertEqual(self.stored(), V1)
+
+    def test_archive_version_apart_from_extracted(self):
+        extracted = self.run_import(V1, versioned=True)[0]
+        stored = self.archive_package(V1, zipfile.ZIP_DEFLATED, versioned=True)
+        stored.run()
+        self.assertNotEqual(stored.version, extracted.version)
+        self.assertEqual(self.stored(extracted.package_dest), V1)
+        self.assertTrue(self.storage.exists(archive.archive_name(stored.package_dest)))
+
+        # an archive has no extracted files to copy into a new version
+        del self.storage.copied[:]
+        package = self.run_import(V2, versioned=True, base_dest=stored.package_dest)[0]
+        self.assertEqual(self.storage.copied, [])
+        self.assertEqual(self.stored(package.package_dest), V2)
+
+    def test_unversioned_archive_keeps_versions(self):
+        version = self.run_import(V1, versioned=True)[0].version
+        self.run_import(V2)
+        self.run_archive(V2, zipfile.ZIP_DEFLATED)
+        # the extracted package is replaced by the archive, the version directory is left alone
+        self.assertFalse(self.storage.exists('scorms/block/index.html'))
+        self.assertTrue(self.storage.exists(archive.archive_name('scorms/block')))
+        self.assertEqual(self.stored('scorms/block/' + version), V1)
@@ -0,0 +1,138 @@
+"""
+Tests of background package import jobs and the import_status view
+"""
+import json
+
+from django.core.cache import cache
+from django.test import RequestFactory
+
+from scormxblock import jobs, views
+
+from tests.blocks import PACKAGE, USER_ID, BlockTestCase
+
+
+class Store(object):
+    """
+    the Studio modulestore, over the field data of a block test case
+    """
+    def __init__(self, test):
+        self.test = test
+        self.updates = []
+
+    def get_item(self, usage_key):
+        return self.test.block()
+
+    def update_item(self, block, user_id):
+        block.save()
+        self.updates.append(user_id)
+
+
+class Pool(object):
+    """
+    a thread pool recording the jobs it is given instead of running them
+    """
+    def __init__(self):
+        self.jobs = []
+
+    def apply_async(self, func, args):
+        self.jobs.append(args)
+
+
+class ImportJobTest(BlockTestCase):
+
+    xblock_settings = {'SCORM_IMPORT_EXECUTOR': 'thread'}
+
+    def setUp(self):
+        super(ImportJobTest, self).setUp()
+        cache.clear()
+        self.store = Store(self)
+        self.pool = Pool()
+        for name, value in (('_thread_pool', lambda: self.pool), ('_modulestore', lambda: self.store)):
+            self.addCleanup(setattr, jobs, name, getattr(jobs, name))
+            setattr(jobs, name, value)
+        self.retries = []
+
+    def submit(self, files=PACKAGE):
+        result = self.studio_submit(files)
+        self.assertEqual(result['result'], 'pending')
+        self.assertEqual(self.pool.jobs[-1], (result['job_id'], unicode(self.block().location), USER_ID))
+        return result['job_id']
+
+    def run_job(self, job_id, attempt=0):
+        jobs.run_import(job_id, unicode(self.block().location), USER_ID, attempt, self.retries.append)
+
+    def test_import(self):
+        job_id = self.submit()
+        self.assertFalse(self.block().scorm_file)
+        self.assertEqual(jobs.get_status(job_id)['state'], jobs.PENDING)
+        self.run_job(job_id)
+        self.assertEqual(jobs.get_status(job_id)['state'], jobs.SUCCEEDED)
+        block = self.block()
+        self.assertTrue(block.scorm_file.endswith('/' + self.block_id))
+        self.assertEqual(block.package_index['launch'], 'index.html')
+        self.assertEqual(self.store.updates, [USER_ID])
+
+    def test_studio_edits_kept(self):
+        job_id = self.submit()
+        block = self.block()
+        block.display_name = 'Renamed while importing'
+        block.save()
+        self.run_job(job_id)
+        block = self.block()
+        self.assertEqual(block.display_name, 'Renamed while importing')
+        self.assertTrue(block.scorm_file)
+
+    def test_block_not_saved_yet(self):
+        job_id = self.submit()
+        block = self.block()
+        block.import_job_id = 'an earlier job'
+        block.save()
+        self.run_job(job_id)
+        # run again later, not waited for
+        self.assertEqual(self.retries, [jobs.SAVE_RETRY_DELAY])
+        self.assertEqual(jobs.get_status(job_id)['state'], jobs.PENDING)
+        self.assertEqual(self.store.updates, [])
+
+        self.run_job(job_id, attempt=jobs.SAVE_RETRIES)
+        self.assertEqual(len(self.retries), 1)
+        self.assertEqual(jobs.get_status(job_id)['state'], jobs.FAILED)
+
+    def test_replaced_by_later_upload(self):
+        first = self.submit()
+        self.submit()
+        self.run_job(first, attempt=jobs.SAVE_RETRIES)
+        self.assertEqual(jobs.get_status(first)['state'], jobs.FAILED)
+        self.assertFalse(self.block().scorm_file)
+
+    def test_invalid_package_fails(self):
+        job_id = self.submit()
+        # e.g. the stored upload was lost
+        self.block().scorm_storage.delete(jobs.upload_name(self.block().scorm_storage_dir, job_id))
+        self.run_job(job_id)
+        self.assertEqual(jobs.get_status(job_id)['state'], jobs.FAILED)
+        self.assertEqual(self.store.updates, [])
+
+
+class User(object):
+    is_authenticated = True
+
+
+class ImportStatusViewTest(BlockTestCase):
+
+    def get(self, job_id):
+        request = RequestFactory().get('/scormxblock/import_status', {'job_id': job_id})
+        request.user = User()
+        return views.import_status(request)
+
+    def test_status(self):
+        jobs.set_status('job1', jobs.RUNNING, jobs.UPLOADING, 12, 340)
+        response = self.get('job1')
+        self.assertEqual(json.loads(response.content),
+                         {'state': 'running', 'stage': 'uploading', 'done': 12, 'total': 340, 'error': None})
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_unknown_job(self):
+        self.assertEqual(json.loads(self.get('missing').content), {'state': 'unknown'})
+
+    def test_url_given_to_studio(self):
+        self.assertIn('data-import-status-url="/import_status"', self.block().studio_view().content)
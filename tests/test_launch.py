@@ -0,0 +1,93 @@
+"""
+Tests of the launch contexts cached for student_view
+"""
+import unittest
+
+from scormxblock import launch
+from scormxblock.ttlcache import TTLCache
+
+from tests.blocks import PACKAGE, BlockTestCase
+
+
+class LaunchContextTest(BlockTestCase):
+
+    xblock_settings = {'SCORM_LAUNCH_CONTEXT_CACHE_TTL': 300}
+
+    def render(self):
+        return self.block().student_view({}).content
+
+    def misses(self):
+        return launch.launch_contexts.stats()['misses']
+
+    def test_built_once(self):
+        misses = self.misses()
+        self.render()
+        self.render()
+        self.assertEqual(self.misses(), misses + 1)
+
+    def test_studio_changes_picked_up(self):
+        self.render()
+        self.studio_submit(PACKAGE, player_configuration='{"initial_html": "start.html"}')
+        content = self.render()
+        self.assertIn('/{}/start.html'.format(self.block_id), content)
+        self.studio_submit(player_configuration='{"initial_html": "other.html"}')
+        self.assertIn('/{}/other.html'.format(self.block_id), self.render())
+
+    def test_other_blocks_kept(self):
+        self.render()
+        other = ('example.com', u'block-v1:Org+SCORM+Run+type@scormxblock+block@other', 0, False)
+        launch.launch_contexts.get(other, lambda: {'attrs': ''}, 300)
+        launch.launch_contexts.invalidate(unicode(self.block().location))
+        misses = self.misses()
+        launch.launch_contexts.get(other, lambda: {'attrs': ''}, 300)
+        self.assertEqual(self.misses(), misses)
+        self.render()
+        self.assertEqual(self.misses(), misses + 1)
+
+
+class UncachedLaunchContextTest(BlockTestCase):
+
+    xblock_settings = {'SCORM_LAUNCH_CONTEXT_CACHE_TTL': 0}
+
+    def test_not_cached(self):
+        size = launch.launch_contexts.stats()['size']
+        self.block().student_view({})
+        self.assertEqual(launch.launch_contexts.stats()['size'], size)
+
+
+class DataAttrsTest(unittest.TestCase):
+
+    def test_escaped(self):
+        self.assertEqual(launch.data_attrs([('player_url', u'/p?a=1&b="2"'), ('width', 800)]),
+                         u'data-player_url="/p?a=1&amp;b=&quot;2&quot;" data-width="800"')
+
+
+class TTLCacheTest(unittest.TestCase):
+
+    def test_expiry(self):
+        cache = TTLCache()
+        cache.get('a', lambda: 1, ttl=-1)
+        self.assertEqual(cache.get('a', lambda: 2, ttl=-1), 2)
+        self.assertEqual(cache.get('b', lambda: 1), 1)
+        self.assertEqual(cache.get('b', lambda: 2), 1)
+
+    def test_none_not_cached(self):
+        cache = TTLCache()
+        cache.get('a', lambda: None)
+        self.assertEqual(cache.get('a', lambda: 1), 1)
+
+    def test_cleared_when_full(self):
+        cache = TTLCache(size=2)
+        cache.get('a', lambda: 1)
+        cache.get('b', lambda: 1)
+        cache.get('c', lambda: 1)
+        self.assertEqual(cache.stats(), {'hits': 0, 'misses': 3, 'size': 1})
+
+    def test_invalidate(self):
+        cache = TTLCache()
+        for key in ('a1', 'a2', 'b1'):
+            cache.get(key, lambda: 1)
+        cache.invalidate(lambda key: key.startswith('a'))
+        self.assertEqual(cache.stats()['size'], 1)
+        cache.invalidate()
+        self.assertEqual(cache.stats()['size'], 0)
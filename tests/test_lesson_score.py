@@ -0,0 +1,61 @@
+"""
+Tests of lesson scores rolled up by the raw SCORM status handlers
+"""
+import json
+
+from tests.blocks import BlockTestCase
+
+
+def status(**scores):
+    return {'status': 'incomplete', 'scos': dict(
+        (sco_id, {'data': {'cmi.core.score.raw': score}}) for sco_id, score in scores.items())}
+
+
+class LessonScoreTest(BlockTestCase):
+
+    xblock_settings = {'SCORM_SCORE_ROLLUP': 'average'}
+
+    def set_status(self, data):
+        self.handle('set_raw_scorm_status', POST={'data': json.dumps(data)})
+
+    def patch_status(self, ops):
+        version = self.block().raw_scorm_status_version
+        self.handle('patch_raw_scorm_status', json.dumps({'version': version, 'ops': ops}))
+
+    def test_snapshot(self):
+        self.set_status(status(a='100', b='50'))
+        self.assertEqual(self.block().lesson_score, 75.0)
+        self.assertEqual(self.grades()[-1], {'value': 0.75, 'max_value': 1})
+
+    def test_snapshot_without_a_sco_forgets_its_score(self):
+        self.set_status(status(a='100', b='50'))
+        self.set_status(status(b='50'))
+        self.assertEqual(self.block().lesson_score, 50.0)
+
+    def test_patch_rolls_up_changed_scos(self):
+        self.set_status(status(a='100', b='50'))
+        self.patch_status([{'op': 'replace', 'path': '/scos/b/data/cmi.core.score.raw', 'value': '100'}])
+        self.assertEqual(self.block().lesson_score, 100.0)
+        self.patch_status([{'op': 'remove', 'path': '/scos/a'}])
+        self.assertEqual(self.block().lesson_score, 100.0)
+        self.patch_status([{'op': 'add', 'path': '/scos/c', 'value': {'data': {'cmi.core.score.raw': '40'}}}])
+        self.assertEqual(self.block().lesson_score, 70.0)
+
+    def test_patch_replacing_scos(self):
+        self.set_status(status(a='100', b='50'))
+        self.patch_status([{'op': 'replace', 'path': '/scos', 'value': status(c='20')['scos']}])
+        self.assertEqual(self.block().lesson_score, 20.0)
+
+
+class PlayerScoreTest(BlockTestCase):
+
+    def test_player_score_preferred_without_policy(self):
+        self.handle('set_raw_scorm_status', POST={'data': json.dumps(dict(status(a='100'), score='30'))})
+        self.assertEqual(self.grades(), [{'value': 0.3, 'max_value': 1}])
+        self.assertEqual(self.block().lesson_score, 30.0)
+
+    def test_player_score_without_sco_scores(self):
+        data = {'status': 'incomplete', 'score': '85', 'scos': {'sco1': {'data': {}}}}
+        self.handle('set_raw_scorm_status', POST={'data': json.dumps(data)})
+        self.assertEqual(self.block().lesson_score, 85.0)
+        self.assertEqual(self.grades(), [{'value': 0.85, 'max_value': 1}])
@@ -0,0 +1,146 @@
+"""
+Tests of imsmanifest.xml parsing into the package index
+"""
+import unittest
+
+from scormxblock import manifest
+
+from tests.utils import MANIFEST
+
+
+SCORM_12 = '''<?xml version="1.0"?>
+<manifest identifier="course" xmlns="http://www.imsproject.org/xsd/imscp_rootv1p1p2"
+    xmlns:adlcp="http://www.adlnet.org/xsd/adlcp_rootv1p2">
+  <metadata><schema>ADL SCORM</schema><schemaversion>1.2</schemaversion></metadata>
+  <organizations default="org2">
+    <organization identifier="org1">
+      <item identifier="other" identifierref="r3"><title>Other organization</title></item>
+    </organization>
+    <organization identifier="org2">
+      <item identifier="module">
+        <title>Module</title>
+        <item identifier="i1" identifierref="r1" parameters="?page=1">
+          <title> Lesson 1 </title>
+          <adlcp:masteryscore>80</adlcp:masteryscore>
+        </item>
+        <item identifier="i2" identifierref="r2"><title>Glossary</title></item>
+        <item identifier="i3" identifierref="r3"><title>Quiz</title></item>
+      </item>
+    </organization>
+  </organizations>
+  <resources>
+    <resource identifier="r1" type="webcontent" adlcp:scormtype="sco" href="lesson/index.html"/>
+    <resource identifier="r2" type="webcontent" adlcp:scormtype="asset" href="glossary.html"/>
+    <resource identifier="r3" type="webcontent" adlcp:scormType="SCO" href="quiz.html"/>
+  </resources>
+</manifest>'''
+
+SCORM_2004 = '''<manifest identifier="course" xmlns="http://www.imsglobal.org/xsd/imscp_v1p1"
+    xmlns:adlcp="http://www.adlnet.org/xsd/adlcp_v1p3" xmlns:imsss="http://www.imsglobal.org/xsd/imsss">
+  <metadata><schemaversion>2004 4th Edition</schemaversion></metadata>
+  <organizations default="org">
+    <organization identifier="org">
+      <item identifier="i1" identifierref="r1">
+        <title>Lesson</title>
+        <imsss:sequencing>
+          <imsss:objectives>
+            <imsss:primaryObjective objectiveID="passed" satisfiedByMeasure="true">
+              <imsss:minNormalizedMeasure>0.7</imsss:minNormalizedMeasure>
+            </imsss:primaryObjective>
+          </imsss:objectives>
+          <imsss:rollupRules objectiveMeasureWeight="0.25"/>
+        </imsss:sequencing>
+      </item>
+      <item identifier="i2" identifierref="r2"><title>Test</title></item>
+    </organization>
+  </organizations>
+  <resources>
+    <resource identifier="r1" adlcp:scormType="sco" href="a.html"/>
+    <resource identifier="r2" adlcp:scormType="sco" href="b.html"/>
+  </resources>
+</manifest>'''
+
+XML_BASE = '''<manifest identifier="m" xmlns="http://www.imsproject.org/xsd/imscp_rootv1p1p2"
+    xmlns:adlcp="http://www.adlnet.org/xsd/adlcp_rootv1p2">
+  <organizations default="o"><organization identifier="o">
+    <item identifier="i1" identifierref="r1"><title>One</title></item>
+    <item identifier="i2" identifierref="r2"><title>Two</title></item>
+  </organization></organizations>
+  <resources xml:base="content/">
+    <resource identifier="r1" adlcp:scormtype="sco" xml:base="unit1/" href="index.html"/>
+    <resource identifier="r2" adlcp:scormtype="sco" href="unit2/index.html"/>
+  </resources>
+</manifest>'''
+
+# ids which a dict doesn't keep in document order
+NO_ORGANIZATION = '''<manifest identifier="m" xmlns="http://www.imsproject.org/xsd/imscp_rootv1p1p2">
+  <organizations/>
+  <resources>
+    <resource identifier="zz" href="start.html"/>
+    <resource identifier="b" href="second.html"/>
+    <resource identifier="a" href="third.html"/>
+    <resource identifier="m"/>
+  </resources>
+</manifest>'''
+
+
+class ParseManifestTest(unittest.TestCase):
+
+    def test_scorm_12(self):
+        index = manifest.parse_manifest(SCORM_12)
+        self.assertEqual(index['scorm_version'], manifest.SCORM_12)
+        self.assertEqual(index['launch'], 'lesson/index.html?page=1')
+        # the default organization, with assets left out of the SCOs
+        self.assertEqual(index['scos'], [
+            {'id': 'i1', 'title': 'Lesson 1', 'href': 'lesson/index.html?page=1',
+             'mastery_score': 80.0, 'weight': 1.0},
+            {'id': 'i3', 'title': 'Quiz', 'href': 'quiz.html', 'mastery_score': None, 'weight': 1.0},
+        ])
+
+    def test_scorm_2004(self):
+        index = manifest.parse_manifest(SCORM_2004)
+        self.assertEqual(index['scorm_version'], manifest.SCORM_2004)
+        self.assertEqual(index['launch'], 'a.html')
+        first, second = index['scos']
+        self.assertAlmostEqual(first['mastery_score'], 70.0)
+        self.assertEqual(first['weight'], 0.25)
+        self.assertIsNone(second['mastery_score'])
+        self.assertEqual(second['weight'], 1.0)
+
+    def test_version_from_namespace(self):
+        self.assertEqual(manifest.parse_manifest(SCORM_2004.replace('2004 4th Edition', ''))['scorm_version'],
+                         manifest.SCORM_2004)
+        self.assertEqual(manifest.parse_manifest(XML_BASE)['scorm_version'], manifest.SCORM_12)
+
+    def test_xml_base(self):
+        index = manifest.parse_manifest(XML_BASE)
+        self.assertEqual([sco['href'] for sco in index['scos']],
+                         ['content/unit1/index.html', 'content/unit2/index.html'])
+        self.assertEqual(index['launch'], 'content/unit1/index.html')
+
+    def test_without_organization(self):
+        for _ in range(3):
+            index = manifest.parse_manifest(NO_ORGANIZATION)
+            self.assertEqual(index['scos'], [])
+            self.assertEqual(index['launch'], 'start.html')
+
+    def test_single_organization(self):
+        index = manifest.parse_manifest(MANIFEST)
+        self.assertEqual(index['launch'], 'index.html')
+        self.assertEqual([sco['id'] for sco in index['scos']], ['i1'])
+
+    def test_no_resources(self):
+        index = manifest.parse_manifest('<manifest identifier="m"/>')
+        self.assertEqual((index['launch'], index['scos']), (None, []))
+
+    def test_invalid_manifests(self):
+        for xml in ('<manifest', '<package identifier="m"/>', ''):
+            with self.assertRaises(manifest.ManifestError):
+                manifest.parse_manifest(xml)
+
+
+class AssetStatsTest(unittest.TestCase):
+
+    def test_asset_stats(self):
+        self.assertEqual(manifest.asset_stats({'a.html': {'size': 10}, 'b.js': {'size': 5}}),
+                         {'asset_count': 2, 'asset_size': 15})
@@ -0,0 +1,107 @@
+"""
+Tests of finding and deleting orphaned package directories
+"""
+import json
+import os
+import time
+
+from django.core.files.base import ContentFile
+
+from scormxblock import jobs, orphans
+
+from tests.blocks import Location
+from tests.utils import FileSystemTestCase
+
+
+class Block(object):
+    def __init__(self, block_id, scorm_file=None):
+        self.location = Location(block_id)
+        self.scorm_file = scorm_file
+
+
+class PackageDirsTest(FileSystemTestCase):
+
+    def test_referenced_dir(self):
+        for url in ('/media/scorms/source', '/media/scorms/source/0123456789ab',
+                    'https://bucket.s3.amazonaws.com/scorms/source/0123456789ab',
+                    'https://s3.amazonaws.com/bucket/scorms/source?Signature=x'):
+            self.assertEqual(orphans.referenced_dir(url, 'scorms'), 'source', url)
+        self.assertEqual(orphans.referenced_dir('/media/a/b/scorms/c/source', 'a/b/scorms/c/'), 'source')
+        for url in (None, '', '/media/scorms', '/media/other/source'):
+            self.assertIsNone(orphans.referenced_dir(url, 'scorms'), url)
+
+    def test_block_package_dirs(self):
+        self.assertEqual(orphans.block_package_dirs(Block('b1'), 'scorms'), set(['b1']))
+        self.assertEqual(orphans.block_package_dirs(Block('b1', '/media/scorms/b1/v1'), 'scorms'), set(['b1']))
+        # e.g. a duplicated block, or library content used in a course
+        self.assertEqual(orphans.block_package_dirs(Block('copy', '/media/scorms/source/v1'), 'scorms'),
+                         set(['copy', 'source']))
+
+    def test_package_dirs(self):
+        for name in ('scorms/b/index.html', 'scorms/a/index.html', 'scorms/_shared/x'):
+            self.storage.save(name, ContentFile('x'))
+        self.assertEqual(orphans.package_dirs(self.storage, 'scorms', keep=('_shared',)), ['a', 'b'])
+        self.assertEqual(orphans.package_dirs(self.storage, 'missing'), [])
+
+
+class SweepTest(FileSystemTestCase):
+
+    def setUp(self):
+        super(SweepTest, self).setUp()
+        for dirname, count in (('a', 3), ('live', 1), ('c', 2)):
+            for i in range(count):
+                self.storage.save('scorms/{}/{}.html'.format(dirname, i), ContentFile('12345'))
+
+    def sweep(self, **kwargs):
+        return list(orphans.sweep(self.storage, 'scorms', set(['live']), batch_size=2, **kwargs))
+
+    def test_sweep(self):
+        self.assertEqual(self.sweep(), [{'dirname': 'a', 'files': 3, 'bytes': 15},
+                                        {'dirname': 'c', 'files': 2, 'bytes': 10}])
+        self.assertEqual(orphans.package_dirs(self.storage, 'scorms'), ['live'])
+
+    def test_dry_run(self):
+        self.assertEqual([result['dirname'] for result in self.sweep(dry_run=True)], ['a', 'c'])
+        self.assertEqual(orphans.package_dirs(self.storage, 'scorms'), ['a', 'c', 'live'])
+
+    def test_listed_dirnames_only(self):
+        # a directory stored after the listing may belong to a block created meanwhile
+        self.assertEqual([result['dirname'] for result in self.sweep(dirnames=['a', 'live'])], ['a'])
+        self.assertIn('c', orphans.package_dirs(self.storage, 'scorms'))
+
+    def test_checkpoint(self):
+        path = os.path.join(self.root, 'checkpoint.json')
+        self.sweep(checkpoint_path=path)
+        with open(path) as checkpoint_file:
+            self.assertEqual(json.load(checkpoint_file), {'scorms': 'c'})
+
+        # a resumed run skips the directories already done
+        with open(path, 'w') as checkpoint_file:
+            json.dump({'scorms': 'a'}, checkpoint_file)
+        self.storage.save('scorms/a/index.html', ContentFile('x'))
+        self.storage.save('scorms/c/index.html', ContentFile('x'))
+        self.assertEqual([result['dirname'] for result in self.sweep(checkpoint_path=path)], ['c'])
+        self.assertIn('a', orphans.package_dirs(self.storage, 'scorms'))
+
+
+class StaleUploadsTest(FileSystemTestCase):
+
+    def upload(self, job_id, age):
+        name = jobs.upload_name('scorms', job_id)
+        self.storage.save(name, ContentFile('12345'))
+        modified = time.time() - age
+        os.utime(self.storage.local_path(name), (modified, modified))
+        return name
+
+    def test_sweep(self):
+        # e.g. a thread job lost with its Studio process, and a job still running
+        stale = self.upload('stale', jobs.UPLOAD_MAX_AGE + 60)
+        running = self.upload('running', 60)
+        self.assertEqual(orphans.sweep_stale_uploads(self.storage, 'scorms', dry_run=True), {'files': 1, 'bytes': 5})
+        self.assertTrue(self.storage.exists(stale))
+        self.assertEqual(orphans.sweep_stale_uploads(self.storage, 'scorms'), {'files': 1, 'bytes': 5})
+        self.assertFalse(self.storage.exists(stale))
+        self.assertTrue(self.storage.exists(running))
+
+    def test_no_uploads(self):
+        self.assertEqual(orphans.sweep_stale_uploads(self.storage, 'scorms'), {'files': 0, 'bytes': 0})
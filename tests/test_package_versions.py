@@ -0,0 +1,168 @@
+"""
+Tests of package uploads and rollbacks in studio_submit with SCORM_USE_PACKAGE_VERSIONING
+"""
+from django.test.utils import override_settings
+
+from scormxblock import ScormXBlock, archive, importer, storage as scorm_storage
+
+from tests.blocks import PACKAGE, BlockTestCase
+
+
+V1 = dict(PACKAGE, **{'index.html': 'lesson 1'})
+V2 = dict(PACKAGE, **{'index.html': 'lesson 2'})
+V3 = dict(PACKAGE, **{'index.html': 'lesson 3'})
+
+
+class PackageVersioningTest(BlockTestCase):
+
+    xblock_settings = {'SCORM_USE_PACKAGE_VERSIONING': True, 'SCORM_PKG_VERSIONS_TO_KEEP': 2}
+
+    def setUp(self):
+        super(PackageVersioningTest, self).setUp()
+        self.storage = scorm_storage.get_storage()
+
+    def stored_versions(self):
+        block = self.block()
+        return sorted(name for name in self.storage.list_dirs(block._package_path())
+                      if self.storage.exists(importer.file_manifest_name(block._package_path(name))))
+
+    def launched(self):
+        # the content learners get, read from where scorm_file points
+        block = self.block()
+        return self.storage.read(block._package_path(block.package_version) + '/index.html')
+
+    def test_upload_switches_version(self):
+        self.assertEqual(self.studio_submit(V1), {'result': 'success'})
+        first = self.block()
+        self.assertTrue(first.package_version)
+        self.assertTrue(first.scorm_file.endswith('/{}/{}'.format(self.block_id, first.package_version)))
+        self.assertEqual(first.package_index['package_id'], first.package_version)
+
+        self.studio_submit(V2)
+        second = self.block()
+        self.assertNotEqual(second.package_version, first.package_version)
+        self.assertEqual(second.package_versions, [first.package_version, second.package_version])
+        self.assertEqual(self.launched(), 'lesson 2')
+
+    def test_same_package_keeps_version(self):
+        self.studio_submit(V1)
+        version = self.block().package_version
+        self.studio_submit(V1)
+        self.assertEqual(self.block().package_versions, [version])
+
+    def test_rollback(self):
+        self.studio_submit(V1)
+        first = self.block().package_version
+        self.studio_submit(V2)
+        self.assertEqual(self.studio_submit(package_version=first), {'result': 'success'})
+        block = self.block()
+        self.assertEqual(block.package_version, first)
+        self.assertEqual(block.package_index['package_id'], first)
+        self.assertEqual(self.launched(), 'lesson 1')
+        # the version rolled back to is now the most recent one
+        self.assertEqual(block.package_versions[-1], first)
+
+    def test_rollback_to_unknown_version(self):
+        self.studio_submit(V1)
+        version = self.block().package_version
+        result = self.studio_submit(package_version='0123456789ab')
+        self.assertEqual(result['result'], 'failure')
+        self.assertEqual(self.block().package_version, version)
+
+    def test_saving_form_keeps_version(self):
+        self.studio_submit(V1)
+        version = self.block().package_version
+        self.studio_submit(display_name='Renamed')
+        self.assertEqual(self.block().package_version, version)
+        self.studio_submit(display_name='Renamed again', package_version=version)
+        self.assertEqual(self.block().package_versions, [version])
+
+    def test_old_versions_pruned(self):
+        for files in (V1, V2, V3):
+            self.studio_submit(files)
+        block = self.block()
+        self.assertEqual(len(block.package_versions), 2)
+        self.assertEqual(self.stored_versions(), sorted(block.package_versions))
+
+    def test_at_least_two_versions_kept(self):
+        xblock_settings = dict(self.xblock_settings, SCORM_PKG_VERSIONS_TO_KEEP=1, SCORM_SETTINGS_CACHE_TTL=0)
+        with override_settings(XBLOCK_SETTINGS={'ScormXBlock': xblock_settings}):
+            for files in (V1, V2, V3):
+                self.studio_submit(files)
+            self.assertEqual(len(self.stored_versions()), 2)
+
+    def test_versioning_turned_off(self):
+        self.studio_submit(V1)
+        self.studio_submit(V2)
+        with override_settings(XBLOCK_SETTINGS={'ScormXBlock': {'SCORM_SETTINGS_CACHE_TTL': 0}}):
+            self.studio_submit(V3)
+            block = self.block()
+        self.assertEqual(block.package_version, '')
+        self.assertEqual(block.package_versions, [])
+        self.assertTrue(block.scorm_file.endswith('/' + self.block_id))
+        # nothing is published here, so no stored version is still in use
+        self.assertEqual(self.stored_versions(), [])
+        self.assertEqual(self.storage.read(block._package_path() + '/index.html'), 'lesson 3')
+
+    def test_archive_keeps_published_version(self):
+        self.studio_submit(V1)
+        published = self.block().package_version
+        original = ScormXBlock._published_package_version
+        ScormXBlock._published_package_version = lambda block: published
+        self.addCleanup(setattr, ScormXBlock, '_published_package_version', original)
+
+        xblock_settings = {'SCORM_PKG_STORAGE_MODE': 'archive', 'SCORM_SETTINGS_CACHE_TTL': 0}
+        with override_settings(XBLOCK_SETTINGS={'ScormXBlock': xblock_settings}):
+            self.studio_submit(V2)
+        block = self.block()
+        self.assertEqual(block.package_version, '')
+        self.assertTrue(self.storage.exists(archive.archive_name(block._package_path())))
+        # learners keep the published version until the block is published again
+        self.assertEqual(self.stored_versions(), [published])
+        self.assertEqual(self.storage.read(block._package_path(published) + '/index.html'), 'lesson 1')
+
+
+class PackageAssetTest(BlockTestCase):
+
+    xblock_settings = {'SCORM_USE_PACKAGE_VERSIONING': True, 'SCORM_SERVE_PACKAGES': True}
+
+    def get(self, suffix):
+        return self.handle('package_asset', method='GET', suffix=suffix)
+
+    def test_launch_url_names_version(self):
+        self.studio_submit(V1)
+        block = self.block()
+        self.assertEqual(block._launch_context(None, False)['scorm_file'],
+                         '/handler/package_asset/' + block.package_version)
+
+    def test_current_version_immutable(self):
+        self.studio_submit(V1)
+        response = self.get(self.block().package_version + '/index.html')
+        self.assertEqual(response.body, 'lesson 1')
+        self.assertIn('immutable', response.cache_control.header_value)
+
+    def test_other_version_revalidated(self):
+        self.studio_submit(V1)
+        first = self.block().package_version
+        self.studio_submit(V2)
+        # e.g. a page opened before the upload, its URLs must not be cached with the new content
+        response = self.get(first + '/index.html')
+        self.assertEqual(response.body, 'lesson 2')
+        self.assertEqual(response.cache_control.header_value, 'private, no-cache')
+
+    def test_unversioned_package_revalidated(self):
+        with override_settings(XBLOCK_SETTINGS={'ScormXBlock': {'SCORM_SERVE_PACKAGES': True,
+                                                               'SCORM_SETTINGS_CACHE_TTL': 0}}):
+            self.studio_submit(V1)
+            block = self.block()
+            package_id = block.package_index['package_id']
+            self.assertEqual(block._launch_context(None, False)['scorm_file'],
+                             '/handler/package_asset/' + package_id)
+            response = self.get(package_id + '/index.html')
+        self.assertEqual(response.body, 'lesson 1')
+        self.assertEqual(response.cache_control.header_value, 'private, no-cache')
+
+    def test_missing_file(self):
+        self.studio_submit(V1)
+        self.assertEqual(self.get(self.block().package_version).status_int, 404)
+        self.assertEqual(self.get(self.block().package_version + '/missing.html').status_int, 404)
@@ -0,0 +1,116 @@
+"""
+Tests of the raw SCORM status handlers used by players like SSLA:
+get_raw_scorm_status, set_raw_scorm_status and patch_raw_scorm_status
+"""
+import json
+
+from tests.blocks import BlockTestCase
+
+
+STATUS = {
+    'status': 'incomplete',
+    'score': '',
+    'scos': {
+        'sco1': {'data': {'cmi.core.lesson_status': 'incomplete', 'cmi.suspend_data': 'a'}},
+    },
+}
+
+
+class RawStatusTestCase(BlockTestCase):
+
+    def set_status(self, status):
+        return self.handle('set_raw_scorm_status', POST={'data': json.dumps(status)})
+
+    def patch_status(self, ops, version=None):
+        if version is None:
+            version = self.block().raw_scorm_status_version
+        return self.handle('patch_raw_scorm_status', json.dumps({'version': version, 'ops': ops}))
+
+    def stored(self):
+        return json.loads(self.block().scorm_state.serialize())
+
+
+class GetRawStatusTest(RawStatusTestCase):
+
+    def test_etag(self):
+        self.set_status(STATUS)
+        response = self.handle('get_raw_scorm_status', method='GET')
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(json.loads(response.body)['scos']['sco1']['data']['cmi.suspend_data'], 'a')
+        self.assertEqual(response.headers['X-Scorm-Status-Version'], '1')
+
+        response = self.handle('get_raw_scorm_status', method='GET', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_int, 304)
+        self.assertEqual(response.body, b'')
+
+        self.patch_status([{'op': 'replace', 'path': '/status', 'value': 'completed'}])
+        response = self.handle('get_raw_scorm_status', method='GET', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_int, 200)
+
+
+class PatchRawStatusTest(RawStatusTestCase):
+
+    def setUp(self):
+        super(PatchRawStatusTest, self).setUp()
+        self.set_status(STATUS)
+
+    def test_patch(self):
+        response = self.patch_status([
+            {'op': 'replace', 'path': '/scos/sco1/data/cmi.suspend_data', 'value': 'b'},
+            {'op': 'replace', 'path': '/status', 'value': 'passed'},
+        ], version=1)
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(json.loads(response.body), {'result': 'success', 'version': 2})
+        self.assertEqual(response.headers['X-Scorm-Status-Version'], '2')
+        self.assertEqual(self.stored()['scos']['sco1']['data']['cmi.suspend_data'], 'b')
+        self.assertEqual(self.block().lesson_status, 'passed')
+
+    def test_stale_version_conflicts(self):
+        # e.g. a second tab saved a snapshot since this client last read the status
+        self.set_status(dict(STATUS, status='completed'))
+        response = self.patch_status([{'op': 'replace', 'path': '/status', 'value': 'failed'}], version=1)
+        self.assertEqual(response.status_int, 409)
+        self.assertEqual(json.loads(response.body), {'result': 'conflict', 'version': 2})
+        self.assertEqual(response.headers['X-Scorm-Status-Version'], '2')
+        self.assertEqual(self.stored()['status'], 'completed')
+        self.assertEqual(self.block().raw_scorm_status_version, 2)
+
+        # a client which read the current version again succeeds
+        self.assertEqual(self.patch_status([{'op': 'replace', 'path': '/status', 'value': 'failed'}],
+                                           version=2).status_int, 200)
+
+    def test_every_save_bumps_version(self):
+        for version in (1, 2, 3):
+            response = self.patch_status([{'op': 'add', 'path': '/scos/sco1/data/cmi.core.lesson_location',
+                                           'value': str(version)}], version=version)
+            self.assertEqual(json.loads(response.body)['version'], version + 1)
+
+    def test_invalid_delta(self):
+        for body in ('not json', json.dumps({'ops': []}), json.dumps({'version': 'x', 'ops': []}),
+                     json.dumps({'version': 1}), json.dumps({'version': 1, 'ops': 3})):
+            response = self.handle('patch_raw_scorm_status', body)
+            self.assertEqual(response.status_int, 400, body)
+        self.assertEqual(self.block().raw_scorm_status_version, 1)
+
+    def test_invalid_operations_change_nothing(self):
+        for ops in ([{'op': 'move', 'path': '/status'}],
+                    [{'op': 'replace', 'path': '/scos/sco1', 'value': 'x'}],
+                    [{'op': 'replace', 'path': '/status', 'value': 'passed'}, {'path': '/status'}],
+                    # valid operations on SCO data, followed by an invalid one
+                    [{'op': 'replace', 'path': '/scos/sco1/data/cmi.suspend_data', 'value': 'PARTIAL'},
+                     {'op': 'move', 'path': '/x'}]):
+            response = self.patch_status(ops, version=1)
+            self.assertEqual(response.status_int, 400, ops)
+        self.assertEqual(self.stored(), STATUS)
+        self.assertEqual(self.block().raw_scorm_status_version, 1)
+
+
+class SetRawStatusTest(RawStatusTestCase):
+
+    def test_snapshot_replaces_status(self):
+        self.set_status(STATUS)
+        response = self.set_status({'status': 'passed', 'scos': {'sco2': {'data': {}}}})
+        self.assertEqual(response.headers['X-Scorm-Status-Version'], '2')
+        block = self.block()
+        self.assertEqual(block.lesson_status, 'passed')
+        self.assertEqual(sorted(block.scorm_state.scos), ['sco2'])
@@ -0,0 +1,88 @@
+"""
+Tests of grades recomputed from stored learner state
+"""
+import json
+import unittest
+
+from scormxblock import regrade, rollup
+
+from tests.utils import StudentModule
+
+
+class Block(object):
+    location = u'block-v1:Org+SCORM+Run+type@scormxblock+block@b1'
+    weight = 2
+    score_rollup_policy = None
+    package_index = {'scos': [{'id': 'a', 'weight': 3.0}, {'id': 'b', 'weight': 1.0}]}
+
+
+def module(status, grade=None, max_grade=None, **fields):
+    row = StudentModule(dict(fields, raw_scorm_status=json.dumps(status)))
+    row.grade = grade
+    row.max_grade = max_grade
+    return row
+
+
+SCORES = {'scos': {'a': {'data': {'cmi.core.score.raw': '100'}}, 'b': {'data': {'cmi.core.score.raw': '20'}}}}
+
+
+class BlockGradingTest(unittest.TestCase):
+
+    def test_average_by_default(self):
+        lesson_score, engine, value, max_value = regrade.BlockGrading(Block()).grade(
+            json.loads(module(SCORES).state))
+        self.assertEqual(lesson_score, 60.0)
+        self.assertEqual((value, max_value), (1.2, 2))
+
+    def test_policy(self):
+        fields = json.loads(module(SCORES).state)
+        self.assertEqual(regrade.BlockGrading(Block(), rollup.WEIGHTED).grade(fields)[0], 80.0)
+        self.assertEqual(regrade.BlockGrading(Block(), rollup.MIN).grade(fields)[0], 20.0)
+
+    def test_player_score_preferred_without_policy(self):
+        fields = json.loads(module(dict(SCORES, score='90')).state)
+        self.assertEqual(regrade.BlockGrading(Block()).grade(fields)[2], 1.8)
+        self.assertEqual(regrade.BlockGrading(Block(), rollup.BEST).grade(fields)[2], 2.0)
+
+    def test_no_score(self):
+        fields = json.loads(module({'scos': {}}).state)
+        self.assertEqual(regrade.BlockGrading(Block()).grade(fields)[2:], (None, None))
+
+
+class RegradeModuleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.grading = regrade.BlockGrading(Block())
+
+    def test_changed_grade(self):
+        row = module(SCORES, grade=0.5, max_grade=2, held_grade_score=70.0)
+        result, fields = regrade._regraded(row, self.grading)
+        self.assertEqual(result, {
+            'username': 'learner',
+            'block_id': Block.location,
+            'old_grade': 0.5,
+            'old_max_grade': 2,
+            'grade': 1.2,
+            'max_grade': 2,
+        })
+        self.assertEqual(fields['lesson_score'], 60.0)
+        self.assertEqual(fields['published_grade_value'], 1.2)
+        self.assertEqual(fields['score_rollup']['scores'], {'a': 100.0, 'b': 20.0})
+        # a grade held back before the regrade is stale now
+        self.assertIsNone(fields['held_grade_score'])
+
+    def test_unchanged_grade(self):
+        self.assertEqual(regrade._regraded(module(SCORES, grade=1.2 + 1e-9, max_grade=2), self.grading),
+                         (None, None))
+        self.assertIsNone(regrade.regrade_module(module(SCORES, grade=1.2, max_grade=2), self.grading))
+
+    def test_never_graded(self):
+        self.assertEqual(regrade._regraded(module(SCORES), self.grading)[0]['old_grade'], None)
+        self.assertEqual(regrade._regraded(module({'scos': {}}), self.grading), (None, None))
+
+    def test_dry_run_writes_nothing(self):
+        row = module(SCORES, grade=0.5, max_grade=2)
+        state = row.state
+        result = regrade.regrade_module(row, self.grading, dry_run=True)
+        self.assertEqual(result['grade'], 1.2)
+        self.assertEqual(row.state, state)
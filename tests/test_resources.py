@@ -0,0 +1,86 @@
+"""
+Tests of the process-wide resource and template cache
+"""
+import unittest
+
+from django.test.utils import override_settings
+
+from scormxblock import resources
+
+from tests.blocks import BlockTestCase
+
+
+CSS = 'static/css/scormxblock.css'
+TEMPLATE = 'static/html/studio.html'
+
+
+class LoadCountingMixin(object):
+    """
+    counts resource reads, and lets tests change the installed package version
+    """
+    version = '1.0'
+
+    def setUp(self):
+        super(LoadCountingMixin, self).setUp()
+        self.loads = []
+        load_resource = resources._load_resource
+        package_version = resources.package_version
+
+        def counting_load(path):
+            self.loads.append(path)
+            return load_resource(path)
+
+        resources._load_resource = counting_load
+        resources.package_version = lambda: self.version
+        self.addCleanup(setattr, resources, '_load_resource', load_resource)
+        self.addCleanup(setattr, resources, 'package_version', package_version)
+        resources.clear_cache()
+        self.addCleanup(resources.clear_cache)
+
+
+class ResourceCacheTest(LoadCountingMixin, unittest.TestCase):
+
+    def test_loaded_once_per_version(self):
+        data = resources.resource_string(CSS)
+        self.assertEqual(resources.resource_string(CSS), data)
+        self.assertEqual(self.loads, [CSS])
+
+    def test_template_compiled_once_per_version(self):
+        template = resources.get_template(TEMPLATE)
+        self.assertIs(resources.get_template(TEMPLATE), template)
+        self.assertEqual(self.loads, [TEMPLATE])
+
+    def test_version_change_reloads(self):
+        template = resources.get_template(TEMPLATE)
+        resources.resource_string(CSS)
+        # e.g. the package upgraded under a running process
+        self.version = '1.1'
+        self.assertIsNot(resources.get_template(TEMPLATE), template)
+        resources.resource_string(CSS)
+        self.assertEqual(self.loads, [TEMPLATE, CSS, TEMPLATE, CSS])
+
+    def test_use_cache_false(self):
+        resources.resource_string(CSS)
+        template = resources.get_template(TEMPLATE)
+        resources.resource_string(CSS, use_cache=False)
+        self.assertIsNot(resources.get_template(TEMPLATE, use_cache=False), template)
+        self.assertEqual(self.loads, [CSS, TEMPLATE, CSS, TEMPLATE])
+
+
+class CacheResourcesSettingTest(LoadCountingMixin, BlockTestCase):
+
+    xblock_settings = {'SCORM_CACHE_RESOURCES': False}
+
+    def test_setting_bypasses_cache(self):
+        block = self.block()
+        block.resource_string(CSS)
+        block.resource_string(CSS)
+        self.assertEqual(self.loads, [CSS, CSS])
+        self.assertEqual(resources._resource_cache, {})
+
+    def test_cached_by_default(self):
+        with override_settings(XBLOCK_SETTINGS={'ScormXBlock': {'SCORM_SETTINGS_CACHE_TTL': 0}}):
+            block = self.block()
+            block.resource_string(CSS)
+            block.resource_string(CSS)
+        self.assertEqual(self.loads, [CSS])
@@ -0,0 +1,104 @@
+"""
+Tests of the lesson score rollup policies
+"""
+import random
+import unittest
+
+from scormxblock import rollup
+
+
+class ScoScoreTest(unittest.TestCase):
+
+    def test_score_elements(self):
+        self.assertEqual(rollup.sco_score({'cmi.core.score.raw': '80'}), 80.0)
+        self.assertEqual(rollup.sco_score({'cmi.score.raw': '70'}), 70.0)
+        self.assertEqual(rollup.sco_score({'cmi.score.scaled': '0.5'}), 50.0)
+
+    def test_unscored(self):
+        self.assertIsNone(rollup.sco_score({}))
+        self.assertIsNone(rollup.sco_score({'cmi.core.score.raw': ''}))
+
+
+class ChooseScoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = rollup.ScoreRollup()
+        self.engine.update_all({'a': 100.0, 'b': 50.0})
+
+    def test_player_score_preferred(self):
+        self.assertEqual(rollup.choose_score('90', self.engine, None), '90')
+
+    def test_configured_policy_wins(self):
+        self.assertEqual(rollup.choose_score('90', self.engine, rollup.AVERAGE), 75.0)
+
+    def test_rollup_without_player_score(self):
+        self.assertEqual(rollup.choose_score('', self.engine, None), 75.0)
+        self.assertEqual(rollup.choose_score('', rollup.ScoreRollup(), None), '')
+
+
+class PolicyTest(unittest.TestCase):
+
+    weights = {'a': 1.0, 'b': 3.0, 'c': 1.0}
+
+    def score(self, policy, scores, weights=None):
+        engine = rollup.ScoreRollup(None, policy, weights)
+        engine.update_all(scores)
+        return engine.score
+
+    def test_average(self):
+        self.assertEqual(self.score(rollup.AVERAGE, {'a': 100.0, 'b': 50.0}), 75.0)
+        # declared SCOs without a score count as 0
+        self.assertAlmostEqual(self.score(rollup.AVERAGE, {'a': 90.0}, self.weights), 30.0)
+
+    def test_weighted(self):
+        self.assertEqual(self.score(rollup.WEIGHTED, {'a': 100.0, 'b': 50.0, 'c': 0.0}, self.weights), 50.0)
+
+    def test_min(self):
+        self.assertEqual(self.score(rollup.MIN, {'a': 100.0, 'b': 50.0}), 50.0)
+        self.assertEqual(self.score(rollup.MIN, {'a': 100.0, 'b': 50.0}, self.weights), 0.0)
+
+    def test_best(self):
+        self.assertEqual(self.score(rollup.BEST, {'a': 100.0, 'b': 50.0}), 100.0)
+        self.assertEqual(self.score(rollup.BEST, {}), 0.0)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            rollup.ScoreRollup(None, 'median')
+
+
+class IncrementalTest(unittest.TestCase):
+
+    weights = {'a': 2.0, 'b': 1.0, 'c': 1.0}
+
+    def test_matches_rebuild(self):
+        # stored running totals give the same score as a rollup from scratch
+        rand = random.Random(7)
+        for policy in rollup.POLICIES:
+            data = None
+            scores = {}
+            for step in range(200):
+                sco_id = rand.choice('abcdef')
+                score = rand.choice([None, 0.0, 25.0, 50.0, 100.0])
+                engine = rollup.ScoreRollup(data, policy, self.weights)
+                engine.update(sco_id, score)
+                data = engine.to_dict()
+                if score is None:
+                    scores.pop(sco_id, None)
+                else:
+                    scores[sco_id] = score
+
+                fresh = rollup.ScoreRollup(None, policy, self.weights)
+                fresh.update_all(scores)
+                self.assertAlmostEqual(engine.score, fresh.score, msg='{} at step {}'.format(policy, step))
+
+    def test_policy_change_rebuilds(self):
+        engine = rollup.ScoreRollup(None, rollup.AVERAGE)
+        engine.update_all({'a': 100.0, 'b': 20.0})
+        engine = rollup.ScoreRollup(engine.to_dict(), rollup.MIN)
+        self.assertEqual(engine.score, 20.0)
+
+    def test_unscored_undeclared_sco_forgotten(self):
+        engine = rollup.ScoreRollup(None, rollup.AVERAGE)
+        engine.update_all({'a': 100.0, 'b': 20.0})
+        engine.update('b', None)
+        self.assertEqual(engine.score, 100.0)
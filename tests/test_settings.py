@@ -0,0 +1,76 @@
+"""
+Tests of the resolved XBlock settings cache
+"""
+from django.test.utils import override_settings
+
+from scormxblock import settings as scorm_settings
+
+from tests.blocks import BlockTestCase
+
+
+class SettingsCacheTest(BlockTestCase):
+
+    xblock_settings = {'SCORM_SETTINGS_CACHE_TTL': 300, 'SCORM_PKG_STORAGE_DIR': 'scorms',
+                       'SCORM_PLAYER_BACKENDS': {'ssla': {'name': 'SSLA', 'configuration': {'a': [1]}}}}
+
+    def setUp(self):
+        super(SettingsCacheTest, self).setUp()
+        scorm_settings.resolved_settings_cache.invalidate()
+        self.addCleanup(scorm_settings.resolved_settings_cache.invalidate)
+
+    def test_resolved_once(self):
+        block = self.block()
+        self.assertEqual(block.settings['SCORM_PKG_STORAGE_DIR'], 'scorms')
+        stats = scorm_settings.settings_cache_stats()
+        block.settings
+        self.assertEqual(scorm_settings.settings_cache_stats()['hits'], stats['hits'] + 1)
+
+        # platform settings only change with a restart, which clears the cache anyway
+        with override_settings(XBLOCK_SETTINGS={'ScormXBlock': dict(self.xblock_settings, SCORM_PKG_STORAGE_DIR='x')}):
+            self.assertEqual(self.block().settings['SCORM_PKG_STORAGE_DIR'], 'scorms')
+            scorm_settings.resolved_settings_cache.invalidate()
+            self.assertEqual(self.block().settings['SCORM_PKG_STORAGE_DIR'], 'x')
+
+    def test_invalidate_one_domain(self):
+        self.block().settings
+        scorm_settings.resolved_settings_cache.invalidate('other.example.com')
+        self.assertEqual(scorm_settings.settings_cache_stats()['size'], 1)
+        scorm_settings.resolved_settings_cache.invalidate(self.block()._site_domain())
+        self.assertEqual(scorm_settings.settings_cache_stats()['size'], 0)
+
+    def test_siteconfiguration_save_clears_cache(self):
+        if not scorm_settings.has_siteconfiguration:
+            self.skipTest('SiteConfiguration is not installed')
+        from django.db.models.signals import post_save
+        from openedx.core.djangoapps.site_configuration.models import SiteConfiguration
+        scorm_settings.connect_signals()
+        self.block().settings
+        instance = type('SiteConfiguration', (object,), {'site': None})()
+        post_save.send(SiteConfiguration, instance=instance, created=False)
+        self.assertEqual(scorm_settings.settings_cache_stats()['size'], 0)
+
+    def test_read_only(self):
+        resolved = self.block().settings
+        with self.assertRaises(TypeError):
+            resolved['SCORM_PKG_STORAGE_DIR'] = 'other'
+        with self.assertRaises(TypeError):
+            resolved['SCORM_PLAYER_BACKENDS']['ssla'].update(name='changed')
+        self.assertEqual(resolved['SCORM_PLAYER_BACKENDS']['ssla']['configuration']['a'], (1,))
+        # copies may be changed
+        backends = dict(resolved['SCORM_PLAYER_BACKENDS'])
+        backends['other'] = {}
+
+    def test_platform_settings_untouched(self):
+        resolved = scorm_settings.ConfigurationSettingsMixin._resolve_settings(self.xblock_settings, 'Org')
+        resolved['SCORM_PLAYER_BACKENDS']['ssla']['name'] = 'changed'
+        self.assertEqual(self.xblock_settings['SCORM_PLAYER_BACKENDS']['ssla']['name'], 'SSLA')
+
+
+class UncachedSettingsTest(BlockTestCase):
+
+    xblock_settings = {'SCORM_SETTINGS_CACHE_TTL': 0}
+
+    def test_no_caching(self):
+        size = scorm_settings.settings_cache_stats()['size']
+        self.assertEqual(self.block().settings['SCORM_SETTINGS_CACHE_TTL'], 0)
+        self.assertEqual(scorm_settings.settings_cache_stats()['size'], size)
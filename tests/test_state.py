@@ -0,0 +1,147 @@
+"""
+Tests of the raw SCORM status store: compression and patching
+"""
+import json
+import unittest
+
+from scormxblock import state
+
+
+STATUS = {
+    'status': 'incomplete',
+    'score': '',
+    'scos': {
+        'sco1': {'data': {'cmi.core.lesson_status': 'passed', 'cmi.suspend_data': 'x' * 400}},
+        'sco2': {'data': {'cmi.core.score.raw': '40'}},
+    },
+}
+
+
+class CompressionTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        text = json.dumps(STATUS)
+        stored = state.encode(text, compress=True)
+        self.assertTrue(state.is_compressed(stored))
+        self.assertLess(len(stored), len(text))
+        self.assertEqual(json.loads(state.decode(stored)), STATUS)
+
+    def test_small_status_not_compressed(self):
+        text = json.dumps({'status': 'incomplete'})
+        self.assertEqual(state.encode(text, compress=True), text)
+
+    def test_plain_status_decoded_as_is(self):
+        text = json.dumps(STATUS)
+        self.assertEqual(state.decode(text), text)
+
+    def test_corrupt_status_reads_empty(self):
+        self.assertEqual(state.decode(state.COMPRESSED_PREFIX + 'not base64!'), '{}')
+
+    def test_sizes(self):
+        stored, plain, compressed = state.sizes(json.dumps(STATUS))
+        self.assertEqual(stored, plain)
+        self.assertLess(compressed, plain)
+
+    def test_stored_in_configured_encoding(self):
+        text = json.dumps(STATUS)
+        status = state.ScormState(text, compress=True)
+        self.assertTrue(status.needs_migration)
+        self.assertTrue(state.is_compressed(status.stored()))
+
+        status = state.ScormState(status.stored(), compress=False)
+        self.assertEqual(status.get('status'), 'incomplete')
+        self.assertTrue(status.needs_migration)
+        self.assertEqual(json.loads(status.stored()), STATUS)
+        self.assertFalse(status.dirty)
+
+
+class ScormStateTest(unittest.TestCase):
+
+    def test_invalid_json_reads_empty(self):
+        self.assertEqual(state.ScormState('not json').data, {})
+        self.assertEqual(state.ScormState('[1, 2]').data, {})
+
+    def test_set_sco_values(self):
+        status = state.ScormState(json.dumps(STATUS))
+        status.set_sco_values('sco3', {'cmi.core.score.raw': '90'})
+        self.assertTrue(status.dirty)
+        self.assertEqual(json.loads(status.serialize())['scos']['sco3'], {'data': {'cmi.core.score.raw': '90'}})
+
+    def test_cmi_value(self):
+        status = state.ScormState(json.dumps(STATUS))
+        self.assertEqual(status.cmi_value('cmi.core.score.raw', 'sco2'), '40')
+        self.assertEqual(status.cmi_value('cmi.core.score.raw', 'sco1', 'unset'), 'unset')
+
+    def test_etag_follows_content(self):
+        status = state.ScormState(json.dumps(STATUS))
+        etag = status.etag()
+        self.assertEqual(state.ScormState(json.dumps(STATUS)).etag(), etag)
+        status.set('status', 'completed')
+        self.assertNotEqual(status.etag(), etag)
+
+
+class PatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.status = state.ScormState(json.dumps(STATUS))
+
+    def test_replace_add_remove(self):
+        self.status.patch([
+            {'op': 'replace', 'path': '/scos/sco1/data/cmi.suspend_data', 'value': 'short'},
+            {'op': 'add', 'path': '/scos/sco3/data/cmi.core.score.raw', 'value': '70'},
+            {'op': 'remove', 'path': '/scos/sco2'},
+            {'op': 'replace', 'path': '/status', 'value': 'completed'},
+        ])
+        data = json.loads(self.status.serialize())
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['scos']['sco1']['data']['cmi.suspend_data'], 'short')
+        self.assertEqual(data['scos']['sco3'], {'data': {'cmi.core.score.raw': '70'}})
+        self.assertNotIn('sco2', data['scos'])
+        self.assertTrue(self.status.dirty)
+
+    def test_escaped_pointer(self):
+        self.status.patch([{'op': 'add', 'path': '/scos/a~1b~0c/data/x', 'value': '1'}])
+        self.assertIn('a/b~c', self.status.scos)
+
+    def test_remove_missing_is_ignored(self):
+        self.status.patch([{'op': 'remove', 'path': '/scos/none/data/x'}])
+        self.assertEqual(self.status.data, STATUS)
+
+    def test_invalid_operations(self):
+        for ops in ([{'path': '/status'}],
+                    [{'op': 'replace', 'path': 'status', 'value': 'x'}],
+                    [{'op': 'replace', 'path': '/status'}],
+                    [{'op': 'add', 'path': 3, 'value': 'x'}]):
+            with self.assertRaises(state.PatchError):
+                self.status.patch(ops)
+
+    def test_invalid_operation_after_valid_ones(self):
+        with self.assertRaises(state.PatchError):
+            self.status.patch([{'op': 'replace', 'path': '/scos/sco1/data/cmi.suspend_data', 'value': 'PARTIAL'},
+                               {'op': 'add', 'path': '/scos/sco2/data/cmi.core.score.raw', 'value': '90'},
+                               {'op': 'move', 'path': '/x'}])
+        self.assertEqual(self.status.data, STATUS)
+        self.assertFalse(self.status.dirty)
+
+    def test_malformed_scos_rejected(self):
+        for ops in ([{'op': 'replace', 'path': '/scos', 'value': [1]}],
+                    [{'op': 'replace', 'path': '/scos/sco1', 'value': 'x'}],
+                    [{'op': 'replace', 'path': '/scos/sco1/data', 'value': 3}]):
+            with self.assertRaises(state.PatchError):
+                self.status.patch(ops)
+            # nothing was applied
+            self.assertEqual(self.status.data, STATUS)
+            self.assertFalse(self.status.dirty)
+
+    def test_malformed_then_fixed_in_one_patch(self):
+        self.status.patch([{'op': 'replace', 'path': '/scos', 'value': []},
+                           {'op': 'replace', 'path': '/scos', 'value': {'sco9': {'data': {}}}}])
+        self.assertEqual(self.status.scos, {'sco9': {'data': {}}})
+
+    def test_patched_scos(self):
+        self.assertEqual(state.patched_scos([
+            {'op': 'replace', 'path': '/scos/sco1/data/cmi.suspend_data', 'value': ''},
+            {'op': 'remove', 'path': '/scos/sco2'},
+            {'op': 'replace', 'path': '/status', 'value': 'completed'},
+        ]), {'sco1', 'sco2'})
+        self.assertIsNone(state.patched_scos([{'op': 'replace', 'path': '/scos', 'value': {}}]))
@@ -0,0 +1,189 @@
+"""
+Tests of the storage adapters
+"""
+import os
+import unittest
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+from scormxblock import storage as scorm_storage
+
+from tests import s3
+from tests.utils import FileSystemTestCase
+
+
+class AdapterForTest(FileSystemTestCase):
+
+    def test_file_system_storage(self):
+        self.assertIsInstance(self.storage, scorm_storage.FileSystemScormStorage)
+
+    def test_s3_storages(self):
+        for bucket in (s3.BotoBucket(), s3.Boto3Bucket()):
+            adapter = scorm_storage.adapter_for(s3.FakeS3Storage(bucket))
+            self.assertIsInstance(adapter, scorm_storage.S3ScormStorage)
+
+    def test_get_storage_reuses_adapters(self):
+        storage_type = 'django.core.files.storage.FileSystemStorage'
+        self.addCleanup(scorm_storage.reset_storages)
+        adapter = scorm_storage.get_storage(storage_type)
+        self.assertIs(scorm_storage.get_storage(storage_type), adapter)
+        scorm_storage.reset_storages()
+        self.assertIsNot(scorm_storage.get_storage(storage_type), adapter)
+
+
+class StorageContractMixin(object):
+    """
+    behaviour every adapter must have; `self.storage` is the adapter under test
+    """
+    def put(self, name, data):
+        self.storage.write(name, data)
+
+    def test_write_replaces(self):
+        self.put('pkg/a.html', b'one')
+        self.put('pkg/a.html', b'two')
+        self.assertEqual(self.storage.read('pkg/a.html'), b'two')
+
+    def test_list_prefix(self):
+        for name in ('pkg/a.html', 'pkg/sub/b.js', 'pkg2/c.html'):
+            self.put(name, b'x')
+        self.assertEqual(sorted(self.storage.list_prefix('pkg')), ['pkg/a.html', 'pkg/sub/b.js'])
+
+    def test_list_prefix_sizes(self):
+        self.put('pkg/a.html', b'abc')
+        self.put('pkg/sub/b.js', b'abcdef')
+        self.assertEqual(sorted(self.storage.list_prefix_sizes('pkg')), [('pkg/a.html', 3), ('pkg/sub/b.js', 6)])
+
+    def test_list_dirs(self):
+        for name in ('root/one/a.html', 'root/two/b/c.html', 'root/file.txt'):
+            self.put(name, b'x')
+        self.assertEqual(sorted(self.storage.list_dirs('root')), ['one', 'two'])
+
+    def test_copy(self):
+        self.put('pkg/a.html', b'content')
+        self.put('other/a.html', b'old')
+        self.storage.copy('pkg/a.html', 'other/a.html')
+        self.assertEqual(self.storage.read('other/a.html'), b'content')
+        self.assertEqual(self.storage.read('pkg/a.html'), b'content')
+
+    def test_open_range(self):
+        self.put('pkg/archive.zip', b'0123456789')
+        fh = self.storage.open_range('pkg/archive.zip', 3, 4)
+        try:
+            self.assertEqual(fh.read(), b'3456')
+        finally:
+            fh.close()
+
+    def test_delete_many(self):
+        names = ['pkg/{}.html'.format(i) for i in range(5)]
+        for name in names:
+            self.put(name, b'x')
+        self.storage.delete_many(names[:3])
+        self.assertEqual(sorted(self.storage.list_prefix('pkg')), names[3:])
+
+    def test_delete_prefix(self):
+        self.put('pkg/a.html', b'x')
+        self.put('pkg/sub/b.html', b'x')
+        self.put('keep/c.html', b'x')
+        self.storage.delete_prefix('pkg')
+        self.assertEqual(list(self.storage.list_prefix('pkg')), [])
+        self.assertTrue(self.storage.exists('keep/c.html'))
+
+    def test_save_many(self):
+        saved = []
+        items = [('pkg/{}.html'.format(i), lambda i=i: ContentFile(b'file %d' % i)) for i in range(6)]
+        names = self.storage.save_many(items, concurrency=3, on_saved=lambda name, stored: saved.append(name))
+        self.assertEqual(names, [name for name, open_content in items])
+        self.assertEqual(sorted(saved), sorted(names))
+        self.assertEqual(self.storage.read('pkg/4.html'), b'file 4')
+
+
+class GenericStorageTest(StorageContractMixin, FileSystemTestCase):
+    """
+    the Storage API only adapter, over a file system storage
+    """
+    def setUp(self):
+        super(GenericStorageTest, self).setUp()
+        self.storage = scorm_storage.ScormStorage(FileSystemStorage(location=self.root))
+
+    def test_no_local_path(self):
+        self.assertIsNone(self.storage.local_path('pkg/a.html'))
+
+
+class FileSystemStorageTest(StorageContractMixin, FileSystemTestCase):
+
+    def test_local_path(self):
+        self.assertEqual(self.storage.local_path('pkg/a.html'), os.path.join(self.root, 'pkg', 'a.html'))
+
+    def test_copy_hard_links(self):
+        self.put('pkg/a.html', b'content')
+        self.storage.copy('pkg/a.html', 'new/dir/a.html')
+        src = os.stat(os.path.join(self.root, 'pkg', 'a.html'))
+        dest = os.stat(os.path.join(self.root, 'new', 'dir', 'a.html'))
+        self.assertEqual((src.st_dev, src.st_ino), (dest.st_dev, dest.st_ino))
+
+    def test_delete_prefix_removes_directories(self):
+        self.put('pkg/sub/b.html', b'x')
+        self.storage.delete_prefix('pkg')
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'pkg')))
+
+
+class S3StorageMixin(StorageContractMixin):
+
+    bucket_class = None
+
+    def setUp(self):
+        self.bucket = self.bucket_class()
+        self.django_storage = s3.FakeS3Storage(self.bucket, location='media')
+        self.storage = scorm_storage.adapter_for(self.django_storage)
+
+    def test_keys_under_location(self):
+        self.put('pkg/a.html', b'x')
+        self.assertEqual(list(self.bucket.data), ['media/pkg/a.html'])
+        self.assertEqual(list(self.storage.list_prefix('pkg')), ['pkg/a.html'])
+
+    def test_delete_many_batches(self):
+        names = ['pkg/{}.html'.format(i) for i in range(2 * scorm_storage.S3_DELETE_BATCH_SIZE + 1)]
+        for name in names:
+            self.bucket.data['media/' + name] = b'x'
+        self.storage.delete_many(names)
+        self.assertEqual([len(keys) for keys in self.bucket.delete_requests],
+                         [scorm_storage.S3_DELETE_BATCH_SIZE, scorm_storage.S3_DELETE_BATCH_SIZE, 1])
+        self.assertEqual(self.bucket.delete_requests[0][0], 'media/pkg/0.html')
+        self.assertEqual(self.bucket.data, {})
+
+    def test_delete_many_nothing(self):
+        self.storage.delete_many([])
+        self.assertEqual(self.bucket.delete_requests, [])
+
+    def test_copy_server_side(self):
+        self.put('pkg/a.html', b'content')
+        self.storage.copy('pkg/a.html', 'other/a.html')
+        self.assertEqual(self.bucket.copies, [('media/pkg/a.html', 'media/other/a.html')])
+        self.assertEqual(self.bucket.copy_acls, [None])
+        self.assertEqual(self.django_storage.opened, [])
+
+    def test_copy_keeps_storage_acl(self):
+        self.django_storage.default_acl = 'public-read'
+        self.put('pkg/a.html', b'content')
+        self.storage.copy('pkg/a.html', 'other/a.html')
+        self.assertEqual(self.bucket.copy_acls, ['public-read'])
+
+    def test_open_range_is_ranged_get(self):
+        self.put('pkg/archive.zip', b'0123456789')
+        self.storage.open_range('pkg/archive.zip', 2, 5).read()
+        self.assertEqual(self.bucket.ranges, [('media/pkg/archive.zip', 'bytes=2-6')])
+        self.assertEqual(self.django_storage.opened, [])
+
+    def test_open_empty_range(self):
+        self.put('pkg/archive.zip', b'0123456789')
+        self.assertEqual(self.storage.open_range('pkg/archive.zip', 2, 0).read(), b'')
+        self.assertEqual(self.bucket.ranges, [])
+
+
+class BotoStorageTest(S3StorageMixin, unittest.TestCase):
+    bucket_class = s3.BotoBucket
+
+
+class Boto3StorageTest(S3StorageMixin, unittest.TestCase):
+    bucket_class = s3.Boto3Bucket
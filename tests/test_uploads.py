@@ -0,0 +1,143 @@
+"""
+Tests of chunked, resumable package uploads
+"""
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from scormxblock import uploads
+
+
+DATA = b''.join(chr(i % 251) for i in range(10000))
+
+
+class ChunkedUploadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp(prefix='scormxblock-uploads-')
+        self.addCleanup(shutil.rmtree, self.upload_dir, True)
+        self.upload = uploads.ChunkedUpload.create(self.upload_dir, len(DATA), 'course.zip')
+
+    def append(self, start, stop, crc=None, upload=None):
+        chunk = DATA[start:stop]
+        crc = uploads.crc32(chunk) if crc is None else crc
+        return (upload or self.upload).append(start, io.BytesIO(chunk), len(chunk), crc)
+
+    def assertUploadError(self, status, offset, call, *args, **kwargs):
+        with self.assertRaises(uploads.UploadError) as context:
+            call(*args, **kwargs)
+        self.assertEqual(context.exception.status, status)
+        self.assertEqual(context.exception.offset, offset)
+
+    def test_complete_upload(self):
+        self.assertEqual(self.append(0, 4000), 4000)
+        self.assertEqual(self.append(4000, 10000), 10000)
+        self.upload.finalize(uploads.crc32(DATA))
+        with self.upload.open() as fh:
+            self.assertEqual(fh.read(), DATA)
+
+    def test_resume_from_another_process(self):
+        self.append(0, 4000)
+        resumed = uploads.ChunkedUpload(self.upload_dir, self.upload.upload_id)
+        self.assertEqual(resumed.offset, 4000)
+        self.assertEqual(resumed.meta['filename'], 'course.zip')
+        self.append(4000, 10000, upload=resumed)
+        resumed.finalize(uploads.crc32(DATA))
+
+    def test_wrong_offset(self):
+        self.append(0, 4000)
+        self.assertUploadError(409, 4000, self.append, 3000, 5000)
+        # a retried chunk which did arrive is reported, not appended twice
+        self.assertUploadError(409, 4000, self.append, 0, 4000)
+        self.assertEqual(self.upload.offset, 4000)
+
+    def test_concurrent_appends_at_one_offset(self):
+        # e.g. a chunk retried while the first request for it is still being written
+        chunk = DATA[:4000]
+        first_read = threading.Event()
+        release = threading.Event()
+
+        class SlowStream(io.BytesIO):
+            def read(self, size=-1):
+                first_read.set()
+                release.wait(5)
+                return io.BytesIO.read(self, size)
+
+        results = []
+
+        def append(stream):
+            upload = uploads.ChunkedUpload(self.upload_dir, self.upload.upload_id)
+            try:
+                results.append(upload.append(0, stream, len(chunk), uploads.crc32(chunk)))
+            except uploads.UploadError as e:
+                results.append((e.status, e.offset))
+
+        slow = threading.Thread(target=append, args=(SlowStream(chunk),))
+        slow.start()
+        first_read.wait(5)
+        retried = threading.Thread(target=append, args=(io.BytesIO(chunk),))
+        retried.start()
+        # the retry waits for the lock, then finds the chunk already appended
+        retried.join(0.2)
+        self.assertTrue(retried.is_alive())
+        release.set()
+        slow.join(5)
+        retried.join(5)
+        self.assertEqual(results, [4000, (409, 4000)])
+        self.assertEqual(os.path.getsize(self.upload.path), 4000)
+
+    def test_declared_size_limit(self):
+        self.assertUploadError(413, None, uploads.ChunkedUpload.create, self.upload_dir, 1001, max_size=1000)
+        self.assertUploadError(400, None, uploads.ChunkedUpload.create, self.upload_dir, -1)
+        self.assertEqual(uploads.ChunkedUpload.create(self.upload_dir, 1000, max_size=1000).offset, 0)
+
+    def test_corrupted_chunk_dropped(self):
+        self.append(0, 4000)
+        self.assertUploadError(400, 4000, self.append, 4000, 8000, crc=12345)
+        self.assertEqual(os.path.getsize(self.upload.path), 4000)
+        self.assertEqual(self.append(4000, 10000), 10000)
+        self.upload.finalize(uploads.crc32(DATA))
+
+    def test_short_chunk_dropped(self):
+        chunk = DATA[:4000]
+        self.assertUploadError(400, 0, self.upload.append, 0, io.BytesIO(chunk[:1000]), 4000,
+                               uploads.crc32(chunk))
+        self.assertEqual(self.upload.offset, 0)
+
+    def test_chunk_past_declared_size(self):
+        self.assertUploadError(400, None, self.upload.append, 0, io.BytesIO(DATA + b'x'), len(DATA) + 1, 0)
+
+    def test_finalize_incomplete(self):
+        self.append(0, 4000)
+        self.assertUploadError(409, 4000, self.upload.finalize, uploads.crc32(DATA))
+
+    def test_finalize_checksum_mismatch(self):
+        self.append(0, 10000)
+        self.assertUploadError(400, None, self.upload.finalize, uploads.crc32(DATA) ^ 1)
+        self.assertUploadError(409, 10000, self.upload.open)
+
+    def test_no_appends_once_complete(self):
+        self.append(0, 10000)
+        self.upload.finalize(uploads.crc32(DATA))
+        self.assertUploadError(409, 10000, self.append, 10000, 10000)
+
+    def test_unknown_and_invalid_ids(self):
+        self.assertUploadError(404, None, uploads.ChunkedUpload, self.upload_dir, 'a' * 32)
+        self.assertUploadError(400, None, uploads.ChunkedUpload, self.upload_dir, '../../etc/passwd')
+
+    def test_delete(self):
+        self.upload.delete()
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_sweep(self):
+        old = uploads.ChunkedUpload.create(self.upload_dir, 10)
+        past = time.time() - uploads.MAX_AGE - 60
+        for path in (old.path, old.meta_path):
+            os.utime(path, (past, past))
+        uploads.sweep(self.upload_dir)
+        self.assertEqual(sorted(os.listdir(self.upload_dir)),
+                         sorted(os.path.basename(path) for path in (self.upload.path, self.upload.meta_path)))
@@ -0,0 +1,67 @@
+"""
+Helpers shared by the tests
+"""
+import datetime
+import io
+import json
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from django.core.files.storage import FileSystemStorage
+
+from scormxblock import storage as scorm_storage
+
+
+MANIFEST = '''<manifest identifier="m" xmlns="http://www.imsproject.org/xsd/imscp_rootv1p1p2"
+    xmlns:adlcp="http://www.adlnet.org/xsd/adlcp_rootv1p2">
+  <metadata><schemaversion>1.2</schemaversion></metadata>
+  <organizations default="o"><organization identifier="o">
+    <item identifier="i1" identifierref="r1"><title>Lesson 1</title></item>
+  </organization></organizations>
+  <resources><resource identifier="r1" adlcp:scormtype="sco" href="index.html"/></resources>
+</manifest>'''
+
+
+def make_zip(files, compression=zipfile.ZIP_DEFLATED):
+    """
+    return the bytes of a zip holding {name: content}
+    """
+    out = io.BytesIO()
+    zip_file = zipfile.ZipFile(out, 'w', compression)
+    for name, content in sorted(files.items()):
+        zip_file.writestr(name, content)
+    zip_file.close()
+    return out.getvalue()
+
+
+def open_zip(files, compression=zipfile.ZIP_DEFLATED):
+    return zipfile.ZipFile(io.BytesIO(make_zip(files, compression)))
+
+
+class FileSystemTestCase(unittest.TestCase):
+    """
+    test case with a FileSystemStorage adapter over a temporary directory
+    """
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='scormxblock-tests-')
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.storage = scorm_storage.adapter_for(FileSystemStorage(location=self.root, base_url='/media/'))
+
+
+class Student(object):
+    username = 'learner'
+
+
+class StudentModule(object):
+    """
+    a courseware StudentModule row holding the user state `fields`
+    """
+    def __init__(self, fields, row_id=1):
+        self.id = row_id
+        self.student = Student()
+        self.student_id = 7
+        self.module_state_key = u'block-v1:Org+SCORM+Run+type@scormxblock+block@b1'
+        self.modified = datetime.datetime(2018, 3, 1, 12, 30)
+        self.state = json.dumps(fields) if isinstance(fields, dict) else fields